@@ -0,0 +1,7 @@
+# benchmarks/__main__.py
+
+import sys
+
+from benchmarks.modelo import main
+
+sys.exit(main())
@@ -0,0 +1,194 @@
+# benchmarks/concurrencia.py
+
+# Many simultaneous punchers (processes x threads, each with its own connection)
+# racing on the same employees: today's flow through register_punch and manual
+# punches on shared past days through register_manual_punch. Afterwards the
+# database must hold exactly the punches whose call succeeded (no duplicates, no
+# lost writes), today's punches must follow the punch flow (a day may hold several
+# shifts, but never e.g. two 'Entrada' in a row) and daily_totals must match the
+# punches. Exits with 1 otherwise.
+#
+#   python -m benchmarks.concurrencia --processes 4 --threads 8 --employees 20
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.modelo import percentiles
+from db import close_db, connect_db, set_db_path
+from models.fichaje import (
+    PUNCH_TYPES, SQL_ALL_PUNCHES, daily_total_row, init_db, register_manual_punch, register_punch,
+    validate_punch_flow
+)
+from models.logica_contador import OFF
+from models.tiempo import SECONDS_PER_DAY, format_date
+
+MANUAL_DAYS: int = 5
+# (phase, employee_id, date, punch type, succeeded, nanoseconds, error)
+Attempt = Tuple[str, int, str, str, bool, int, str]
+
+
+def _puncher(employee_ids: List[int], days: List[str], seed: int, start_at: float, attempts: List[Attempt]):
+    """One thread: every punch of today's flow and of the manual days, for each employee, in random order."""
+    rng = random.Random(seed)
+    today = date.today().strftime("%Y-%m-%d")
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    for employee_id in rng.sample(employee_ids, len(employee_ids)):
+        for punch_type in PUNCH_TYPES:
+            attempts.append(_attempt("register_punch", employee_id, today, punch_type,
+                                     lambda: register_punch(punch_type, employee_id)))
+        for day in rng.sample(days, len(days)):
+            punch_type = rng.choice(PUNCH_TYPES)
+            hour = f"{rng.randint(7, 19):02d}:{rng.randint(0, 59):02d}"
+            attempts.append(_attempt("register_manual_punch", employee_id, day, punch_type,
+                                     lambda: register_manual_punch(day, punch_type, hour, employee_id)))
+
+
+def _attempt(phase: str, employee_id: int, day: str, punch_type: str, call) -> Attempt:
+    start = time.perf_counter_ns()
+    try:
+        call()
+    except Exception as e:
+        return (phase, employee_id, day, punch_type, False, time.perf_counter_ns() - start, str(e))
+    return (phase, employee_id, day, punch_type, True, time.perf_counter_ns() - start, "")
+
+
+def _run_process(args: Tuple[str, int, List[int], List[str], int, float]) -> List[Attempt]:
+    """Worker process: `threads` punchers, each with its own connection to the database at path."""
+    path, threads, employee_ids, days, seed, start_at = args
+    set_db_path(path)
+    attempts: List[Attempt] = []
+    workers = [threading.Thread(target=_puncher, args=(employee_ids, days, seed * 1000 + i, start_at, attempts))
+               for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    close_db()
+    return attempts
+
+
+def check_database(attempts: List[Attempt]) -> Dict[str, int]:
+    """Compares the stored punches and totals with the attempts that succeeded."""
+    conn = connect_db()
+    stored = Counter()
+    exact = Counter()
+    days: Dict[Tuple[int, int], List[Tuple[str, int]]] = {}
+    for employee_id, tipo, ts in conn.execute(SQL_ALL_PUNCHES):
+        stored[(employee_id, format_date(ts), tipo)] += 1
+        exact[(employee_id, ts, tipo)] += 1
+        days.setdefault((employee_id, ts // SECONDS_PER_DAY), []).append((tipo, ts))
+    succeeded = Counter((employee_id, day, tipo) for _, employee_id, day, tipo, ok, _, _ in attempts if ok)
+
+    # Today only holds register_punch punches: replayed in stored order they must all be valid
+    invalid_flow = 0
+    today = date.today().strftime("%Y-%m-%d")
+    for (employee_id, dia), punches in days.items():
+        if format_date(dia * SECONDS_PER_DAY) != today:
+            continue
+        state = OFF
+        for tipo, _ in punches:
+            try:
+                state = validate_punch_flow(state, tipo)
+            except Exception:
+                invalid_flow += 1
+
+    totals = {(row[0], row[1]): row for row in conn.execute(
+        "SELECT employee_id, dia, worked_seconds, break_seconds, complete FROM daily_totals")}
+    expected_totals = {key: daily_total_row(key[0], punches) for key, punches in days.items()}
+    return {
+        "duplicates": sum(count - 1 for count in exact.values() if count > 1),
+        "invalid_flow": invalid_flow,
+        "lost_writes": sum(max(count - stored[key], 0) for key, count in succeeded.items()),
+        "phantom_writes": sum(max(count - succeeded[key], 0) for key, count in stored.items()),
+        "wrong_totals": sum(1 for key in set(totals) | set(expected_totals)
+                            if totals.get(key) != expected_totals.get(key)),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.concurrencia",
+                                     description="Fichajes simultáneos: sin duplicados ni escrituras perdidas.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Hilos (conexiones) por proceso")
+    parser.add_argument("--employees", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="Fichero JSON de resultados (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    employee_ids = list(range(1, args.employees + 1))
+    days = [(date.today() - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(1, MANUAL_DAYS + 1)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "concurrencia.db")
+        set_db_path(path)
+        init_db()
+        close_db()
+
+        start_at = time.time() + 1.0  # Every puncher starts at the same moment
+        jobs = [(path, args.threads, employee_ids, days, args.seed + i, start_at) for i in range(args.processes)]
+        started = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            attempts = [attempt for chunk in pool.map(_run_process, jobs) for attempt in chunk]
+        elapsed = time.perf_counter() - started - max(start_at - time.time(), 0)
+
+        set_db_path(path)
+        integrity = check_database(attempts)
+        close_db()
+
+    results: Dict[str, Dict] = {}
+    for phase in ("register_punch", "register_manual_punch"):
+        phase_attempts = [attempt for attempt in attempts if attempt[0] == phase]
+        errors = Counter(attempt[6].split(" para la fecha")[0] for attempt in phase_attempts if not attempt[4])
+        results[phase] = {
+            "attempts": len(phase_attempts),
+            "succeeded": sum(1 for attempt in phase_attempts if attempt[4]),
+            "latency": percentiles([attempt[5] for attempt in phase_attempts]),
+            "errors": dict(errors.most_common()),
+        }
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "processes": args.processes,
+            "threads": args.threads,
+            "employees": args.employees,
+            "seconds": round(elapsed, 2),
+            "unit": "us",
+        },
+        "results": results,
+        "integrity": integrity,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    # At least one shift started per employee today, and nothing duplicated, lost or out of flow
+    with_entrada = {employee_id for phase, employee_id, _, tipo, ok, _, _ in attempts
+                    if phase == "register_punch" and ok and tipo == PUNCH_TYPES[0]}
+    if any(integrity.values()) or len(with_entrada) != len(employee_ids):
+        print(f"ERROR DE INTEGRIDAD: {integrity}, {len(with_entrada)} empleados con entrada hoy "
+              f"(esperados {len(employee_ids)})", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# benchmarks/datos.py
+
+# Synthetic fichajes.db generator for the benchmarks: years of history for one or
+# more employees with realistic hours plus the irregular days real data contains
+# (forgotten punches, unclosed breaks, out-of-flow punches, split shifts, several
+# breaks, weekend work).
+
+import argparse
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from db import connect_db, set_db_path
+from models.fichaje import SQL_ENSURE_EMPLOYEE, SQL_INSERT_PUNCH, fill_daily_totals, init_db
+from models.tiempo import day_number, SECONDS_PER_DAY
+
+# Share of working days that are irregular / skipped, and of weekend days worked
+ODD_DAY_RATIO: float = 0.06
+ABSENT_DAY_RATIO: float = 0.04
+WEEKEND_WORK_RATIO: float = 0.02
+
+
+class SyntheticHistory(NamedTuple):
+    """What generate_history() wrote."""
+    path: Path
+    first_day: date
+    last_day: date
+    employees: int
+    punches: int
+    days: int
+
+
+def _normal_day(rng: random.Random, start: int) -> List[Tuple[int, str]]:
+    """Entrada 7:30-9:30, lunch of 30-75 min around 13:00-14:30 and about 8 h of work."""
+    entrada = start + rng.randint(7 * 3600 + 1800, 9 * 3600 + 1800)
+    lunch = start + rng.randint(13 * 3600, 14 * 3600 + 1800)
+    back = lunch + rng.randint(30, 75) * 60
+    fin = back + 8 * 3600 - (lunch - entrada) + rng.randint(-45, 45) * 60
+    return [(entrada, "Entrada"), (lunch, "Ir a comer"), (back, "Salida comida"), (fin, "Fin jornada")]
+
+
+def _odd_day(rng: random.Random, start: int) -> List[Tuple[int, str]]:
+    """A normal day with one of the irregularities seen in real terminals."""
+    day = _normal_day(rng, start)
+    kind = rng.randrange(8)
+    if kind == 0:
+        return day[:3]  # Forgot 'Fin jornada'
+    if kind == 1:
+        return [day[0], day[3]]  # No lunch break
+    if kind == 2:
+        return day[:1]  # Only 'Entrada'
+    if kind == 3:
+        return [day[0], day[1], day[3]]  # Break never closed
+    if kind == 4:
+        return [day[0], day[2], day[3]]  # 'Salida comida' without 'Ir a comer' (out of flow)
+    if kind == 5:
+        return [day[0], (day[0][0] + 3600, "Entrada"), day[3]]  # Second 'Entrada' (manual, out of flow)
+    if kind == 6:
+        # Split shift: the morning ends at lunch with 'Fin jornada', a new 'Entrada' after it
+        return [day[0], (day[1][0], "Fin jornada"), (day[2][0], "Entrada"), day[3]]
+    # A second break in the afternoon
+    coffee = day[2][0] + (day[3][0] - day[2][0]) // 2
+    return day[:3] + [(coffee, "Ir a comer"), (coffee + 900, "Salida comida"), day[3]]
+
+
+def generate_history(path: Union[str, Path], years: float = 10, employees: int = 1, seed: int = 1,
+                     end: Optional[date] = None) -> SyntheticHistory:
+    """
+    Creates (or replaces) a database at path with `years` of punches per employee
+    ending yesterday (or at `end`), and leaves connect_db() pointing at it.
+    The same seed always produces the same data.
+    """
+    path = Path(path)
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+    set_db_path(path)
+    init_db()
+
+    rng = random.Random(seed)
+    last_day = end or date.today() - timedelta(days=1)
+    first_day = last_day - timedelta(days=int(years * 365.25) - 1)
+    first_start = day_number(first_day) * SECONDS_PER_DAY
+    n_days = (last_day - first_day).days + 1
+
+    rows: List[Tuple[int, int, str]] = []
+    for employee_id in range(1, employees + 1):
+        for i in range(n_days):
+            weekday = (first_day.weekday() + i) % 7
+            if weekday >= 5 and rng.random() >= WEEKEND_WORK_RATIO:
+                continue
+            if weekday < 5 and rng.random() < ABSENT_DAY_RATIO:
+                continue
+            start = first_start + i * SECONDS_PER_DAY
+            day = _odd_day(rng, start) if rng.random() < ODD_DAY_RATIO else _normal_day(rng, start)
+            rows.extend((employee_id, ts, tipo) for ts, tipo in day)
+
+    with connect_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(SQL_ENSURE_EMPLOYEE, [(emp, f"Empleado {emp}") for emp in range(1, employees + 1)])
+        conn.executemany(SQL_INSERT_PUNCH, rows)
+        fill_daily_totals(conn)
+    init_db()  # As on the app's next start: extends the balance ledgers through today
+    conn.execute("PRAGMA optimize")
+    return SyntheticHistory(path, first_day, last_day, employees, len(rows), n_days)
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.datos historico.db --years 10 --employees 5
+    parser = argparse.ArgumentParser(description="Genera una base de datos de fichajes sintética.")
+    parser.add_argument("path")
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--employees", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    history = generate_history(args.path, args.years, args.employees, args.seed)
+    print(f"{history.path}: {history.punches} fichajes, {history.employees} empleados, "
+          f"{history.first_day} a {history.last_day}")
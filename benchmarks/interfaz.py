@@ -0,0 +1,310 @@
+# benchmarks/interfaz.py
+
+# End-to-end latency of UnifiedPunchApp interactions, run headless (Qt offscreen
+# platform) against a synthetic database. Each interaction is timed from the call
+# that starts it until the window is idle again (DB worker drained, refresh applied,
+# pending chart draw done), with a per-stage breakdown taken from the methods it runs.
+# It also counts the live counter's timer wake-ups (gui/reloj.py) per hour with a
+# shift running and the window visible or hidden, and with no shift running.
+#
+#   python -m benchmarks.interfaz -o interfaz.json
+#   python -m benchmarks.interfaz --latency-ms 500 --baseline interfaz.json
+
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # Before any Qt import: no display needed
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from PySide6.QtCore import QDate, QEventLoop
+from PySide6.QtWidgets import QApplication, QMessageBox
+
+from benchmarks.datos import generate_history
+from benchmarks.modelo import DEFAULT_MAX_REGRESSION, compare, percentiles
+from db import close_db
+from models.fichaje import PUNCH_TYPES, delete_punch_by_date_type
+
+DEFAULT_ITERATIONS: int = 40
+DEFAULT_WAKEUP_SECONDS: float = 5.0
+# Methods whose time is reported as a stage: name -> attribute path on the widget
+STAGES: Dict[str, str] = {
+    "snapshot_apply": "_apply_snapshot",
+    "today_widgets": "_apply_today_punches",
+    "table_update": "update_table",
+    "summary_update": "update_weekly_summary",
+    "chart_update": "chart.update",
+    "chart_draw": "chart.canvas.draw",
+}
+
+
+class StageTimer:
+    """Wraps widget methods (instance attributes only) and accumulates their time per stage."""
+
+    def __init__(self):
+        self.current: Dict[str, int] = defaultdict(int)
+
+    def wrap(self, owner, attribute: str, stage: str):
+        original: Callable = getattr(owner, attribute)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.current[stage] += time.perf_counter_ns() - start
+
+        setattr(owner, attribute, timed)
+
+    def take(self) -> Dict[str, int]:
+        stages, self.current = dict(self.current), defaultdict(int)
+        return stages
+
+
+def _resolve(widget, path: str):
+    owner = widget
+    *parents, attribute = path.split(".")
+    for name in parents:
+        owner = getattr(owner, name)
+    return owner, attribute
+
+
+class GuiBench:
+    """A shown UnifiedPunchApp plus the helpers to drive it and wait until it is idle."""
+
+    def __init__(self, app: QApplication, latency_ms: int):
+        from gui.app_unificada import UnifiedPunchApp
+
+        self.app = app
+        self.widget = UnifiedPunchApp()
+        self.widget.db_worker.latency_ms = latency_ms
+        self.widget.resize(1200, 900)
+        self.widget.show()
+        self.widget.ensure_fully_loaded()
+        self.wait_idle()
+
+        self.timer = StageTimer()
+        for stage, path in STAGES.items():
+            self.timer.wrap(*_resolve(self.widget, path), stage)
+        # The DB worker's share is the time its thread spends running the queued calls
+        self.timer.wrap(self.widget.db_worker, "_execute", "db_worker")
+
+    def is_idle(self) -> bool:
+        w = self.widget
+        return (w.db_worker.is_idle() and not w._refresh_pending and not w._refresh_in_flight
+                and not getattr(w.chart.canvas, "_draw_pending", False))
+
+    def wait_idle(self):
+        while not self.is_idle():
+            self.app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+        self.app.processEvents()
+
+    def measure(self, action: Callable[[], object]) -> Dict[str, int]:
+        """Runs action, waits until idle and returns the total and per-stage nanoseconds."""
+        self.timer.take()
+        start = time.perf_counter_ns()
+        action()
+        handler = time.perf_counter_ns() - start
+        self.wait_idle()
+        total = time.perf_counter_ns() - start
+        stages = self.timer.take()
+        stages["gui_handler"] = handler
+        stages["total"] = total
+        return stages
+
+
+def _clear_today():
+    today = date.today().strftime("%Y-%m-%d")
+    for punch_type in PUNCH_TYPES:
+        delete_punch_by_date_type(today, punch_type)
+
+
+def run_scenarios(bench: GuiBench, history, iterations: int, seed: int) -> Dict[str, List[Dict[str, int]]]:
+    """Runs every interaction `iterations` times and returns the raw samples per scenario."""
+    rng = random.Random(seed)
+    w = bench.widget
+    samples: Dict[str, List[Dict[str, int]]] = defaultdict(list)
+
+    # Quick punch buttons: a full day of punches per round (today is cleared outside the timing)
+    for _ in range(max(iterations // 4, 1)):
+        _clear_today()
+        w.refresh()
+        bench.wait_idle()
+        for punch_type in PUNCH_TYPES:
+            samples["execute_punch"].append(bench.measure(lambda: w._execute_punch(punch_type)))
+    _clear_today()
+
+    # Week changes through the date selector (random weeks of the history)
+    span = (history.last_day - history.first_day).days
+    for _ in range(iterations):
+        day = history.first_day + timedelta(days=rng.randint(0, span))
+        samples["week_change"].append(bench.measure(
+            lambda: w.date_selector.setDate(QDate(day.year, day.month, day.day))))
+
+    # Inline edits of the 'Out 2' cell ('Fin jornada' after lunch) of the displayed week's Monday:
+    # delete, then set again
+    model = w.table_model
+    cell = model.index(0, 5)
+    for i in range(iterations):
+        if model.data(cell):
+            samples["table_edit_delete"].append(bench.measure(lambda: model.setData(cell, "")))
+        hour = f"{17 + i % 3:02d}:{rng.randint(0, 59):02d}"
+        samples["table_edit_set"].append(bench.measure(lambda: model.setData(cell, hour)))
+
+    # Chart redraw on its own: in-place update plus the idle draw it schedules
+    hours = list(w.daily_hours)
+    for _ in range(iterations):
+        rng.shuffle(hours)
+        samples["chart_redraw"].append(bench.measure(lambda: w.chart.update(
+            w.chart.day_labels, hours, w.daily_goals, sum(w.daily_goals))))
+    return samples
+
+
+def check_malformed_edit(bench: GuiBench) -> bool:
+    """
+    An inline edit with a malformed time ('9:05') is refused: setData returns False,
+    nothing is written and the edited row keeps its values.
+    """
+    model = bench.widget.table_model
+    row = [model.data(model.index(0, column)) for column in range(model.columnCount())]
+    accepted = model.setData(model.index(0, 5), "9:05")
+    bench.wait_idle()
+    return not accepted and row == [model.data(model.index(0, column)) for column in range(model.columnCount())]
+
+
+def check_refresh_queries(bench: GuiBench) -> int:
+    """SQL statements of a steady-state refresh of the current week (at most REFRESH_QUERY_BUDGET)."""
+    w = bench.widget
+    today = date.today()
+    w.date_selector.setDate(QDate(today.year, today.month, today.day))
+    bench.wait_idle()
+    w.refresh()
+    bench.wait_idle()
+    return w.last_refresh_query_count
+
+
+def _wakeups_during(bench: GuiBench, seconds: float) -> Dict[str, float]:
+    ticker = bench.widget.ticker
+    before = ticker.wakeups
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        bench.app.processEvents()
+        time.sleep(0.005)
+    wakeups = ticker.wakeups - before
+    return {"seconds": seconds, "wakeups": wakeups, "per_hour": round(wakeups * 3600 / seconds, 1)}
+
+
+def measure_wakeups(bench: GuiBench, seconds: float) -> Dict[str, Dict[str, float]]:
+    """
+    Counter wake-ups over `seconds` in each state. Idle, the clock ticks once a minute:
+    its rate only means something with --wakeup-seconds of a few minutes.
+    """
+    w = bench.widget
+    _clear_today()
+    w._execute_punch(PUNCH_TYPES[0])
+    bench.wait_idle()
+    wakeups = {"working_visible": _wakeups_during(bench, seconds)}
+    w.hide()
+    wakeups["working_hidden"] = _wakeups_during(bench, seconds)
+    w.show()
+    _clear_today()
+    w.refresh()
+    bench.wait_idle()
+    wakeups["idle_visible"] = _wakeups_during(bench, seconds)
+    return wakeups
+
+
+def summarize(samples: Dict[str, List[Dict[str, int]]]) -> Dict[str, Dict]:
+    """Percentiles of the total and of every stage seen in a scenario (missing = 0)."""
+    results: Dict[str, Dict] = {}
+    for scenario, runs in samples.items():
+        stage_names = sorted({stage for run in runs for stage in run} - {"total"})
+        results[scenario] = {
+            "total": percentiles([run["total"] for run in runs]),
+            "stages": {stage: percentiles([run.get(stage, 0) for run in runs]) for stage in stage_names},
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.interfaz",
+                                     description="Latencia de la interfaz (sin pantalla, QT_QPA_PLATFORM=offscreen).")
+    parser.add_argument("--years", type=float, default=10, help="Años de historial sintético")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--latency-ms", type=int, default=0, help="Latencia artificial de cada acceso a la BD")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--wakeup-seconds", type=float, default=DEFAULT_WAKEUP_SECONDS,
+                        help="Segundos de cada medida de despertares del contador (0 = no medir)")
+    parser.add_argument("-o", "--output", help="Fichero JSON de resultados (por defecto stdout)")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION)
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication([])
+    # Error dialogs would block a headless run; print them instead
+    QMessageBox.warning = QMessageBox.critical = staticmethod(
+        lambda parent, title, text, *rest: print(f"{title}: {text}", file=sys.stderr))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = generate_history(Path(tmp) / "bench_gui.db", args.years, 1, args.seed)
+        bench = GuiBench(app, args.latency_ms)
+        try:
+            results = summarize(run_scenarios(bench, history, args.iterations, args.seed))
+            malformed_edit_refused = check_malformed_edit(bench)
+            refresh_queries = check_refresh_queries(bench)
+            wakeups = measure_wakeups(bench, args.wakeup_seconds) if args.wakeup_seconds > 0 else {}
+        finally:
+            bench.widget.shutdown()
+            close_db()
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "qt_platform": os.environ["QT_QPA_PLATFORM"],
+            "platform": platform.platform(),
+            "days": history.days,
+            "punches": history.punches,
+            "iterations": args.iterations,
+            "latency_ms": args.latency_ms,
+            "unit": "us",
+        },
+        "results": results,
+        "wakeups": wakeups,
+        "checks": {"malformed_edit_refused": malformed_edit_refused, "refresh_queries": refresh_queries},
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if not malformed_edit_refused:
+        print("ERROR: la edición con una hora mal formada ('9:05') no se ha rechazado", file=sys.stderr)
+        return 1
+    from gui.app_unificada import REFRESH_QUERY_BUDGET
+    if refresh_queries > REFRESH_QUERY_BUDGET:
+        print(f"ERROR: un refresco ha hecho {refresh_queries} consultas (máximo {REFRESH_QUERY_BUDGET})", file=sys.stderr)
+        return 1
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["results"]
+        regressions = compare({name: stats["total"] for name, stats in results.items()},
+                              {name: stats["total"] for name, stats in baseline.items()}, args.max_regression)
+        for line in regressions:
+            print(f"REGRESIÓN {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+# benchmarks/modelo.py
+
+# Model-layer benchmarks on synthetic histories. Every scenario is timed call by
+# call and summarized with percentiles; the result is written as JSON so runs can
+# be compared, and --baseline makes the run fail when a scenario got slower.
+#
+#   python -m benchmarks --scale 10y -o resultados.json
+#   python -m benchmarks --scale 10y --baseline resultados.json
+
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from benchmarks.datos import SyntheticHistory, generate_history
+from db import close_db
+from models.fichaje import (
+    DEFAULT_EMPLOYEE_ID, PUNCH_TYPES, calculate_worked_hours, delete_punch_by_date_type, get_balance,
+    get_daily_punches, get_daily_totals, get_punches_range, get_total_worked_seconds, register_punch
+)
+from models.informes import worked_hours_frame
+from models.logica_contador import calculate_accumulated_time_and_state, evaluate_day
+from models.tiempo import day_start
+
+# (years of history, employees) generated for each --scale
+SCALES: Dict[str, tuple] = {
+    "small": (1, 1),
+    "10y": (10, 1),
+    "large": (10, 20),
+}
+DEFAULT_ITERATIONS: int = 300
+WARMUP_ITERATIONS: int = 20
+# A scenario fails the baseline check when its p50 grows more than this (0.25 = +25 %)
+DEFAULT_MAX_REGRESSION: float = 0.25
+
+
+class Scenario(NamedTuple):
+    """A benchmark: setup() builds the argument list, run(arg) is the timed call."""
+    name: str
+    setup: Callable[[SyntheticHistory, random.Random, int], List[Any]]
+    run: Callable[[Any], Any]
+
+
+def _random_days(history: SyntheticHistory, rng: random.Random, n: int) -> List[str]:
+    span = (history.last_day - history.first_day).days
+    return [(history.first_day + timedelta(days=rng.randint(0, span))).strftime("%Y-%m-%d") for _ in range(n)]
+
+
+def _day_punch_lists(history: SyntheticHistory, rng: random.Random, n: int) -> List[list]:
+    """Punch lists of random days (read once, outside the timed part)."""
+    return [get_daily_punches(day) for day in _random_days(history, rng, n)]
+
+
+def _ranges(history: SyntheticHistory, rng: random.Random, n: int, length: int) -> List[tuple]:
+    starts = _random_days(history, rng, n)
+    return [(start, (datetime.strptime(start, "%Y-%m-%d") + timedelta(days=length - 1)).strftime("%Y-%m-%d"))
+            for start in starts]
+
+
+def _busy_days(history: SyntheticHistory, rng: random.Random, n: int, intervals: int) -> List[list]:
+    """Days of `intervals` work intervals (a break between each), built in memory on random dates."""
+    days = []
+    for day in _random_days(history, rng, n):
+        ts = day_start(day) + 6 * 3600
+        punches = [("Entrada", ts)]
+        for _ in range(intervals - 1):
+            ts += rng.randint(600, 1200)
+            punches.append(("Ir a comer", ts))
+            ts += rng.randint(60, 300)
+            punches.append(("Salida comida", ts))
+        punches.append(("Fin jornada", ts + rng.randint(600, 1200)))
+        days.append(punches)
+    return days
+
+
+def _summary(dates: tuple) -> int:
+    """What a week/month/year view asks for: the per-day totals and the period total."""
+    get_daily_totals(dates[0], dates[1], DEFAULT_EMPLOYEE_ID)
+    return get_total_worked_seconds(dates[0], dates[1], DEFAULT_EMPLOYEE_ID)
+
+
+def _clear_today():
+    today = date.today().strftime("%Y-%m-%d")
+    for punch_type in PUNCH_TYPES:
+        delete_punch_by_date_type(today, punch_type)
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("get_daily_punches", lambda h, rng, n: _random_days(h, rng, n), get_daily_punches),
+    # The same few days read again and again (today and the displayed week): served by the day cache
+    Scenario("get_daily_punches_repeat", lambda h, rng, n: (_random_days(h, rng, 7) * (n // 7 + 1))[:n], get_daily_punches),
+    Scenario("calculate_worked_hours", _day_punch_lists, calculate_worked_hours),
+    Scenario("calculate_accumulated_time_and_state", _day_punch_lists, calculate_accumulated_time_and_state),
+    # Days with dozens of intervals: the evaluation stays linear in the number of punches
+    Scenario("evaluate_day_12_intervals", lambda h, rng, n: _busy_days(h, rng, n, 12), evaluate_day),
+    Scenario("evaluate_day_48_intervals", lambda h, rng, n: _busy_days(h, rng, n, 48), evaluate_day),
+    Scenario("summary_week", lambda h, rng, n: _ranges(h, rng, n, 7), _summary),
+    Scenario("summary_month", lambda h, rng, n: _ranges(h, rng, n, 31), _summary),
+    Scenario("summary_year", lambda h, rng, n: _ranges(h, rng, n, 366), _summary),
+    Scenario("worked_hours_frame_year", lambda h, rng, n: _ranges(h, rng, n, 366),
+             lambda dates: worked_hours_frame(dates[0], dates[1])),
+    # Overtime balance of a random range: two balance_ledger rows whatever its length
+    Scenario("balance_range", lambda h, rng, n: [_ranges(h, rng, 1, rng.randint(1, 3650))[0] for _ in range(n)],
+             lambda dates: get_balance(dates[0], dates[1])),
+]
+# Writes are timed apart: each round registers today's 4 punches in flow order (one
+# sample per call) and today is cleared again outside the timed part.
+REGISTER_SCENARIO: str = "register_punch"
+
+
+def check_reports(history: SyntheticHistory) -> int:
+    """
+    Days of the whole history (irregular days included) where worked_hours_frame
+    disagrees with evaluate_day, i.e. with daily_totals and the week table.
+    """
+    start, end = history.first_day.strftime("%Y-%m-%d"), history.last_day.strftime("%Y-%m-%d")
+    frame = worked_hours_frame(start, end)
+    mismatches = 0
+    for punches, worked, on_break, complete in zip(get_punches_range(start, end).values(), frame["worked_seconds"],
+                                                   frame["break_seconds"], frame["complete"]):
+        evaluation = evaluate_day(punches)
+        if (evaluation.worked_seconds, evaluation.break_seconds, evaluation.is_complete) != (worked, on_break, complete):
+            mismatches += 1
+    return mismatches
+
+
+def percentiles(samples_ns: List[int]) -> Dict[str, float]:
+    """Summary of the samples in microseconds."""
+    us = sorted(sample / 1000 for sample in samples_ns)
+    cuts = statistics.quantiles(us, n=100, method="inclusive") if len(us) > 1 else us * 99
+    return {
+        "n": len(us),
+        "min": round(us[0], 2),
+        "p50": round(cuts[49], 2),
+        "p90": round(cuts[89], 2),
+        "p99": round(cuts[98], 2),
+        "max": round(us[-1], 2),
+        "mean": round(statistics.fmean(us), 2),
+    }
+
+
+def _time_calls(fn: Callable[[Any], Any], args: List[Any]) -> List[int]:
+    for arg in args[:WARMUP_ITERATIONS]:
+        fn(arg)
+    samples: List[int] = []
+    for arg in args:
+        start = time.perf_counter_ns()
+        fn(arg)
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def run_benchmarks(history: SyntheticHistory, iterations: int = DEFAULT_ITERATIONS, seed: int = 1,
+                   only: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """Runs every scenario (or those named in `only`) against the current database."""
+    rng = random.Random(seed)
+    results: Dict[str, Dict[str, float]] = {}
+    for scenario in SCENARIOS:
+        if only and scenario.name not in only:
+            continue
+        results[scenario.name] = percentiles(_time_calls(scenario.run, scenario.setup(history, rng, iterations)))
+
+    if not only or REGISTER_SCENARIO in only:
+        samples: List[int] = []
+        for _ in range(max(iterations // 4, 5)):
+            _clear_today()
+            for punch_type in PUNCH_TYPES:
+                start = time.perf_counter_ns()
+                register_punch(punch_type)
+                samples.append(time.perf_counter_ns() - start)
+        _clear_today()
+        results[REGISTER_SCENARIO] = percentiles(samples)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            max_regression: float = DEFAULT_MAX_REGRESSION) -> List[str]:
+    """Scenarios whose p50 is more than max_regression slower than in the baseline."""
+    regressions: List[str] = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before and before["p50"] > 0 and stats["p50"] > before["p50"] * (1 + max_regression):
+            regressions.append(f"{name}: p50 {before['p50']:.1f} -> {stats['p50']:.1f} us "
+                               f"(+{(stats['p50'] / before['p50'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Benchmarks de la capa de modelo.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10y")
+    parser.add_argument("--db", help="Ruta de la base de datos sintética (por defecto, un directorio temporal)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", nargs="+", metavar="ESCENARIO", help="Ejecuta solo estos escenarios")
+    parser.add_argument("-o", "--output", help="Fichero JSON de resultados (por defecto stdout)")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="Empeoramiento máximo del p50 admitido (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    years, employees = SCALES[args.scale]
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        history = generate_history(args.db or Path(tmp) / "bench.db", years, employees, args.seed)
+        generation_s = time.perf_counter() - started
+        results = run_benchmarks(history, args.iterations, args.seed, args.only)
+        report_mismatches = check_reports(history)
+        close_db()
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "days": history.days,
+            "employees": history.employees,
+            "punches": history.punches,
+            "iterations": args.iterations,
+            "generation_seconds": round(generation_s, 2),
+            "unit": "us",
+        },
+        "results": results,
+        "checks": {"report_mismatches": report_mismatches},
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if report_mismatches:
+        print(f"ERROR: worked_hours_frame difiere de evaluate_day en {report_mismatches} días", file=sys.stderr)
+        return 1
+    if args.baseline:
+        baseline_report = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if baseline_report["meta"].get("scale") != args.scale:
+            print(f"AVISO: la referencia usa la escala {baseline_report['meta'].get('scale')}", file=sys.stderr)
+        regressions = compare(results, baseline_report["results"], args.max_regression)
+        for line in regressions:
+            print(f"REGRESIÓN {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# benchmarks/servidor.py
+
+# Load test of the punch server (fichator/servidor.py). Starts `python -m fichator
+# serve` on a temporary database (or targets --url) and opens --connections
+# keep-alive HTTP connections that stand in for badge terminals: each one runs
+# today's full flow for its own share of the employees, plus an optional share of
+# GET /punches reads. Reports throughput and latency percentiles per endpoint and
+# the server's batching figures; exits with 1 if any request got an unexpected status.
+#
+#   python -m benchmarks.servidor --connections 64 --employees 5000
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.modelo import percentiles
+from models.fichaje import PUNCH_TYPES
+
+
+class HttpClient:
+    """Minimal keep-alive HTTP/1.1 client for the JSON endpoints (one request at a time)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, payload: Optional[dict] = None) -> Tuple[int, dict]:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode("latin-1")
+                          + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+
+async def _terminal(client: HttpClient, employee_ids: List[int], read_ratio: float, rng: random.Random,
+                    samples: Dict[str, List[int]], statuses: Counter):
+    """One terminal: the four punches of each of its employees, in flow order, interleaved with reads."""
+    await client.connect()
+    try:
+        for employee_id in employee_ids:
+            for punch_type in PUNCH_TYPES:
+                start = time.perf_counter_ns()
+                status, _ = await client.request("POST", "/punch", {"employee_id": employee_id, "type": punch_type})
+                samples["POST /punch"].append(time.perf_counter_ns() - start)
+                statuses[("POST /punch", status)] += 1
+                if rng.random() < read_ratio:
+                    start = time.perf_counter_ns()
+                    status, _ = await client.request("GET", f"/punches?employee_id={employee_id}")
+                    samples["GET /punches"].append(time.perf_counter_ns() - start)
+                    statuses[("GET /punches", status)] += 1
+    finally:
+        await client.close()
+
+
+async def run_load(host: str, port: int, connections: int, employees: int, first_employee: int,
+                   read_ratio: float, seed: int) -> Tuple[Dict[str, List[int]], Counter, float, dict]:
+    """Runs every terminal at once; returns the samples, status counts, seconds and the server's /stats."""
+    samples: Dict[str, List[int]] = defaultdict(list)
+    statuses: Counter = Counter()
+    employee_ids = list(range(first_employee, first_employee + employees))
+    terminals = [_terminal(HttpClient(host, port), employee_ids[i::connections], read_ratio,
+                           random.Random(seed + i), samples, statuses) for i in range(connections)]
+    started = time.perf_counter()
+    await asyncio.gather(*terminals)
+    elapsed = time.perf_counter() - started
+
+    client = HttpClient(host, port)
+    await client.connect()
+    _, stats = await client.request("GET", "/stats")
+    await client.close()
+    return samples, statuses, elapsed, stats
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(db_path: Path, port: int) -> subprocess.Popen:
+    """Starts `python -m fichator serve` on db_path and waits until it accepts connections."""
+    env = dict(os.environ, FICHATOR_DB=str(db_path))
+    process = subprocess.Popen([sys.executable, "-m", "fichator", "serve", "--port", str(port)], env=env,
+                               cwd=Path(__file__).resolve().parent.parent, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor terminó con código {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("El servidor no arrancó a tiempo")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.servidor", description="Prueba de carga del servidor de fichajes.")
+    parser.add_argument("--url", help="Servidor ya en marcha (p. ej. http://127.0.0.1:8765); por defecto se arranca uno")
+    parser.add_argument("--connections", type=int, default=64, help="Terminales simultáneos (conexiones keep-alive)")
+    parser.add_argument("--employees", type=int, default=5000, help="Empleados; cada uno ficha su jornada completa")
+    parser.add_argument("--first-employee", type=int, default=1000,
+                        help="Primer ID de empleado (deben estar sin fichajes hoy)")
+    parser.add_argument("--read-ratio", type=float, default=0.0, help="Lecturas GET /punches por fichaje")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="Fichero JSON de resultados (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port
+        else:
+            host, port = "127.0.0.1", _free_port()
+            process = _start_server(Path(tmp) / "servidor.db", port)
+        try:
+            samples, statuses, elapsed, server_stats = asyncio.run(run_load(
+                host, port, args.connections, args.employees, args.first_employee, args.read_ratio, args.seed))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    punches = statuses[("POST /punch", 201)]
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "connections": args.connections,
+            "employees": args.employees,
+            "read_ratio": args.read_ratio,
+            "seconds": round(elapsed, 2),
+            "unit": "us",
+        },
+        "throughput": {
+            "requests_per_second": round(sum(statuses.values()) / elapsed, 1),
+            "punches_per_second": round(punches / elapsed, 1),
+        },
+        "results": {endpoint: percentiles(values) for endpoint, values in samples.items()},
+        "statuses": {f"{endpoint} {status}": count for (endpoint, status), count in sorted(statuses.items())},
+        "server": dict(server_stats, mean_batch=round(server_stats["punches"] / max(server_stats["batches"], 1), 1)),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    unexpected = {key: count for key, count in statuses.items() if key[1] not in (200, 201)}
+    if unexpected:
+        print(f"RESPUESTAS INESPERADAS: {unexpected}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
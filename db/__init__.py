@@ -1,11 +1,131 @@
 # db/__init__.py
 
+import os
 import sqlite3
+import sys
+import threading
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from db import instrumentacion
 
 # Path to the database file, located in the same directory as this script.
-DB_PATH: Path = Path(__file__).parent / "fichajes.db"
+# FICHATOR_DB allows pointing the app (or a script) at another database file.
+DB_PATH: Path = Path(os.environ.get("FICHATOR_DB", Path(__file__).parent / "fichajes.db"))
+
+# --- CONNECTION TUNING ---
+# Negative cache_size is expressed in KiB (here 16 MiB of page cache).
+CACHE_SIZE_KIB: int = 16 * 1024
+MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+# Number of prepared statements kept per connection (sqlite3 LRU statement cache).
+STATEMENT_CACHE_SIZE: int = 256
+# ---------------------------------
+
+# One long-lived connection per thread: sqlite3 connections must not be shared
+# across threads while a transaction is open, and the GUI may query from workers.
+_local = threading.local()
+_registry_lock = threading.Lock()
+_open_connections: List[sqlite3.Connection] = []
+_stats: Dict[str, int] = {"opens": 0, "closes": 0, "requests": 0}
+# Bumped by close_db() so connections cached by other threads get reopened.
+_generation: int = 0
+
+
+def _open_connection() -> sqlite3.Connection:
+    """Opens a new physical connection and applies the performance PRAGMAs."""
+    conn = sqlite3.connect(
+        DB_PATH,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,  # close_db() may close it from another thread
+        # Times every statement when FICHATOR_PROFILE / --profile is set
+        factory=instrumentacion.InstrumentedConnection if instrumentacion.ENABLED else sqlite3.Connection,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
 
 def connect_db() -> sqlite3.Connection:
-    """Returns a connection object to the SQLite database."""
-    return sqlite3.connect(DB_PATH)
\ No newline at end of file
+    """
+    Returns the calling thread's connection to the SQLite database, opening it
+    on first use. The connection is shared by every call on the same thread, so
+    callers must not close it: use it as a context manager (`with connect_db() as conn:`)
+    to commit/rollback, and call close_db() on shutdown.
+    """
+    if instrumentacion.ENABLED:
+        start = time.perf_counter()
+    conn = getattr(_local, "conn", None)
+    with _registry_lock:
+        _stats["requests"] += 1
+        if conn is None or getattr(_local, "generation", None) != _generation:
+            conn = _open_connection()
+            _local.conn = conn
+            _local.generation = _generation
+            _open_connections.append(conn)
+            _stats["opens"] += 1
+    if instrumentacion.ENABLED:
+        # Named after the caller (e.g. get_daily_punches) to see who asks for connections
+        instrumentacion.record("connect", sys._getframe(1).f_code.co_name, time.perf_counter() - start)
+    return conn
+
+
+def close_db():
+    """Closes every open connection (all threads). Next connect_db() reopens."""
+    global _generation
+    with _registry_lock:
+        _generation += 1
+        for conn in _open_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            _stats["closes"] += 1
+        _open_connections.clear()
+
+
+def set_db_path(path: Union[str, Path]):
+    """Switches the database file used by connect_db(), closing current connections."""
+    global DB_PATH
+    close_db()
+    DB_PATH = Path(path)
+
+
+def get_connection_stats() -> Dict[str, int]:
+    """
+    Returns connection counters: physical 'opens'/'closes', 'requests' served
+    by connect_db() and the number of connections currently 'open'.
+    """
+    with _registry_lock:
+        stats = dict(_stats)
+        stats["open"] = len(_open_connections)
+    return stats
+
+
+class QueryCounter:
+    """
+    Context manager that counts the SQL statements executed on the calling thread's
+    connection while it is active (used to check how many queries a UI refresh costs).
+    """
+
+    def __init__(self):
+        self.count: int = 0
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _trace(self, statement: str):
+        self.count += 1
+
+    def __enter__(self) -> "QueryCounter":
+        self._conn = connect_db()
+        self._conn.set_trace_callback(self._trace)
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self._conn.set_trace_callback(None)
+        except sqlite3.ProgrammingError:
+            pass  # Closed by close_db() meanwhile
+        self._conn = None
@@ -0,0 +1,164 @@
+# db/instrumentacion.py
+
+# Opt-in instrumentation: connect_db() calls, SQL statements and UI refresh methods.
+# Enabled with FICHATOR_PROFILE=1 or the --profile flag (read once at import, like
+# gui/arranque.py). When disabled nothing is wrapped: connections use the plain
+# sqlite3.Connection class and timed() returns the function unchanged.
+# Events are dumped as JSON lines on exit to FICHATOR_PROFILE_FILE
+# (fichator_profile.jsonl by default), ending with a summary line.
+
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+ENABLED: bool = os.environ.get("FICHATOR_PROFILE", "") not in ("", "0") or "--profile" in sys.argv
+DUMP_PATH: str = os.environ.get("FICHATOR_PROFILE_FILE", "fichator_profile.jsonl")
+# Events kept for the rolling summary (debug panel) and for the dump
+ROLLING_WINDOW: int = 2000
+MAX_EVENTS: int = 200_000
+
+_START: float = time.perf_counter()
+_lock = threading.Lock()
+_events: List[Tuple[float, str, str, float, str]] = []  # (t, kind, name, seconds, thread)
+_recent: Deque[Tuple[str, str, float]] = deque(maxlen=ROLLING_WINDOW)
+_totals: Dict[Tuple[str, str], List[float]] = {}  # (kind, name) -> [count, total seconds, max seconds]
+_dropped: int = 0
+_sql_names: Optional[Dict[str, str]] = None
+
+
+def record(kind: str, name: str, seconds: float):
+    """Stores one timed event (kind: 'connect', 'sql', 'ui', 'worker')."""
+    global _dropped
+    now = time.perf_counter() - _START
+    with _lock:
+        totals = _totals.get((kind, name))
+        if totals is None:
+            totals = _totals[(kind, name)] = [0, 0.0, 0.0]
+        totals[0] += 1
+        totals[1] += seconds
+        if seconds > totals[2]:
+            totals[2] = seconds
+        _recent.append((kind, name, seconds))
+        if len(_events) < MAX_EVENTS:
+            _events.append((now, kind, name, seconds, threading.current_thread().name))
+        else:
+            _dropped += 1
+
+
+def timed(kind: str, name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator recording every call of the function; a no-op when instrumentation is disabled."""
+    def decorator(fn: Callable) -> Callable:
+        if not ENABLED:
+            return fn
+        label = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(kind, label, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def sql_name(sql: str) -> str:
+    """Name of the models.fichaje SQL_* constant with this text, or the statement's start."""
+    global _sql_names
+    if _sql_names is None:
+        try:
+            from models import fichaje
+            _sql_names = {value: key for key, value in vars(fichaje).items()
+                          if key.startswith("SQL_") and isinstance(value, str)}
+        except ImportError:
+            _sql_names = {}
+    return _sql_names.get(sql) or " ".join(sql.split())[:60]
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times execute()/executemany() (statement step, not the later fetches)."""
+
+    def execute(self, sql: str, parameters: Any = ()) -> "InstrumentedCursor":
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record("sql", sql_name(sql), time.perf_counter() - start)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> "InstrumentedCursor":
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record("sql", sql_name(sql), time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection class used by db._open_connection() while instrumentation is enabled."""
+
+    def cursor(self, factory: type = InstrumentedCursor) -> sqlite3.Cursor:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def rolling_summary() -> List[Dict[str, Any]]:
+    """
+    Per (kind, name) figures over the last ROLLING_WINDOW events (count, mean, p95 and
+    max in ms) plus the totals since start, sorted by time spent.
+    """
+    with _lock:
+        recent = list(_recent)
+        totals = {key: list(value) for key, value in _totals.items()}
+    window: Dict[Tuple[str, str], List[float]] = {}
+    for kind, name, seconds in recent:
+        window.setdefault((kind, name), []).append(seconds)
+
+    rows: List[Dict[str, Any]] = []
+    for (kind, name), (count, total, longest) in totals.items():
+        samples = sorted(window.get((kind, name), []))
+        rows.append({
+            "kind": kind,
+            "name": name,
+            "recent_count": len(samples),
+            "recent_mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+            "recent_p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3)
+                             if samples else 0.0,
+            "count": int(count),
+            "total_ms": round(total * 1000, 3),
+            "max_ms": round(longest * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+
+def dump(path: Optional[str] = None) -> Optional[str]:
+    """Writes every recorded event as JSON lines plus a final summary line. Returns the path."""
+    if not ENABLED:
+        return None
+    path = path or DUMP_PATH
+    with _lock:
+        events = list(_events)
+        dropped = _dropped
+    with open(path, "w", encoding="utf-8") as f:
+        for t, kind, name, seconds, thread in events:
+            f.write(json.dumps({"t": round(t, 6), "kind": kind, "name": name,
+                                "ms": round(seconds * 1000, 3), "thread": thread}) + "\n")
+        f.write(json.dumps({"summary": rolling_summary(), "dropped_events": dropped}) + "\n")
+    return path
+
+
+if ENABLED:
+    atexit.register(dump)
@@ -0,0 +1,337 @@
+# db/migrations.py
+
+import sqlite3
+import sys
+from time import gmtime, strftime
+from typing import Callable, List, Tuple
+
+# Each migration upgrades the schema from version N-1 to N (its position in the list).
+# The applied version lives in PRAGMA user_version, so existing fichajes.db files
+# (user_version = 0) are upgraded in place the next time the app starts.
+Migration = Tuple[str, Callable[[sqlite3.Connection], None]]
+# Conflicting rows quoted in a MigrationError
+MAX_LISTED_ROWS: int = 20
+# The same punch (employee, second and type) stored more than once (schema v5+)
+SQL_EXACT_DUPLICATES = """
+    SELECT p.id, p.employee_id, p.ts, p.tipo FROM fichajes_ts p
+    JOIN (SELECT employee_id, ts, tipo FROM fichajes_ts GROUP BY employee_id, ts, tipo HAVING COUNT(*) > 1)
+    USING (employee_id, ts, tipo)
+    ORDER BY p.employee_id, p.ts, p.id
+"""
+SQL_REMOVE_EXACT_DUPLICATES = ("DELETE FROM fichajes_ts WHERE id NOT IN "
+                               "(SELECT MIN(id) FROM fichajes_ts GROUP BY employee_id, ts, tipo)")
+
+
+class MigrationError(RuntimeError):
+    """A migration refused to run on the existing data (nothing is changed; see the message)."""
+
+
+def _create_fichajes(conn: sqlite3.Connection):
+    """v1: original table (IF NOT EXISTS keeps databases created before migrations)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fichajes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            hora TEXT NOT NULL
+        )
+    """)
+
+
+def _index_fecha_tipo_hora(conn: sqlite3.Connection):
+    """v2: covering index for the per-day, per-type and range lookups."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fichajes_fecha_tipo_hora ON fichajes (fecha, tipo, hora)")
+
+
+def _integer_timestamps(conn: sqlite3.Connection):
+    """
+    v3: punches stored as integer local-epoch seconds (see models/tiempo.py) in
+    fichajes_ts. The old table becomes a view with the same fecha/hora shape
+    (plus an INSTEAD OF INSERT trigger) so external readers and scripts keep working.
+    """
+    conn.execute("""
+        CREATE TABLE fichajes_ts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts INTEGER NOT NULL,
+            tipo TEXT NOT NULL
+        )
+    """)
+    # strftime('%s') reads the text as UTC, which is exactly the local-epoch convention.
+    conn.execute("""
+        INSERT INTO fichajes_ts (id, ts, tipo)
+        SELECT id, CAST(strftime('%s', fecha || ' ' || hora) AS INTEGER), tipo
+        FROM fichajes
+        WHERE strftime('%s', fecha || ' ' || hora) IS NOT NULL
+    """)
+    # Rows whose fecha/hora cannot be parsed have no timestamp: they are kept as they
+    # were in fichajes_invalid for the user to review and punch again by hand
+    conn.execute("""
+        CREATE TABLE fichajes_invalid (
+            id INTEGER PRIMARY KEY,
+            fecha TEXT,
+            tipo TEXT,
+            hora TEXT
+        )
+    """)
+    conn.execute("""
+        INSERT INTO fichajes_invalid (id, fecha, tipo, hora)
+        SELECT id, fecha, tipo, hora FROM fichajes
+        WHERE strftime('%s', fecha || ' ' || hora) IS NULL
+    """)
+    invalid = conn.execute("SELECT COUNT(*) FROM fichajes_invalid").fetchone()[0]
+    if invalid:
+        print(f"AVISO: {invalid} fichajes con fecha u hora no válidas se han apartado en la tabla "
+              f"fichajes_invalid (python -m db.migrations --invalid para verlos).", file=sys.stderr)
+    conn.execute("DROP TABLE fichajes")
+    conn.execute("CREATE INDEX idx_fichajes_ts_tipo ON fichajes_ts (ts, tipo)")
+    conn.execute("""
+        CREATE VIEW fichajes AS
+        SELECT id, date(ts, 'unixepoch') AS fecha, tipo, time(ts, 'unixepoch') AS hora
+        FROM fichajes_ts
+    """)
+    conn.execute("""
+        CREATE TRIGGER fichajes_insert INSTEAD OF INSERT ON fichajes
+        BEGIN
+            INSERT INTO fichajes_ts (ts, tipo)
+            VALUES (CAST(strftime('%s', NEW.fecha || ' ' || NEW.hora) AS INTEGER), NEW.tipo);
+        END
+    """)
+
+
+def _daily_totals(conn: sqlite3.Connection):
+    """
+    v4: per-day aggregate kept up to date by the model on every punch mutation.
+    Created empty: migrations never evaluate days (their result would change with the
+    day evaluation rules), so models.fichaje.init_db fills it once migrate() is done.
+    """
+    conn.execute("""
+        CREATE TABLE daily_totals (
+            dia INTEGER PRIMARY KEY,
+            worked_seconds INTEGER NOT NULL,
+            break_seconds INTEGER NOT NULL,
+            complete INTEGER NOT NULL
+        )
+    """)
+
+
+def _employees(conn: sqlite3.Connection):
+    """
+    v5: employee dimension. Existing punches and totals belong to employee 1, so
+    single-person databases keep working unchanged.
+    """
+    conn.execute("""
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL
+        )
+    """)
+    conn.execute("INSERT INTO employees (id, name) VALUES (1, 'Empleado 1')")
+
+    conn.execute("ALTER TABLE fichajes_ts ADD COLUMN employee_id INTEGER NOT NULL DEFAULT 1 REFERENCES employees (id)")
+    conn.execute("DROP INDEX idx_fichajes_ts_tipo")
+    conn.execute("CREATE INDEX idx_fichajes_employee_ts_tipo ON fichajes_ts (employee_id, ts, tipo)")
+
+    conn.execute("ALTER TABLE daily_totals RENAME TO daily_totals_v4")
+    conn.execute("""
+        CREATE TABLE daily_totals (
+            employee_id INTEGER NOT NULL,
+            dia INTEGER NOT NULL,
+            worked_seconds INTEGER NOT NULL,
+            break_seconds INTEGER NOT NULL,
+            complete INTEGER NOT NULL,
+            PRIMARY KEY (employee_id, dia)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT INTO daily_totals (employee_id, dia, worked_seconds, break_seconds, complete)
+        SELECT 1, dia, worked_seconds, break_seconds, complete FROM daily_totals_v4
+    """)
+    conn.execute("DROP TABLE daily_totals_v4")
+
+    conn.execute("DROP VIEW fichajes")
+    conn.execute("""
+        CREATE VIEW fichajes AS
+        SELECT id, date(ts, 'unixepoch') AS fecha, tipo, time(ts, 'unixepoch') AS hora, employee_id
+        FROM fichajes_ts
+    """)
+    conn.execute("""
+        CREATE TRIGGER fichajes_insert INSTEAD OF INSERT ON fichajes
+        BEGIN
+            INSERT INTO fichajes_ts (ts, tipo, employee_id)
+            VALUES (CAST(strftime('%s', NEW.fecha || ' ' || NEW.hora) AS INTEGER), NEW.tipo,
+                    COALESCE(NEW.employee_id, 1));
+        END
+    """)
+
+
+def _unique_day_type(conn: sqlite3.Connection):
+    """
+    v6: at most one punch of each type per employee and day, enforced by a unique
+    index on (employee_id, ts / 86400, tipo). Only created when the existing punches
+    already satisfy it: nothing is deleted, and v9 withdraws the rule anyway (a type
+    may repeat within a day since then).
+    """
+    repeated = conn.execute("SELECT 1 FROM fichajes_ts GROUP BY employee_id, ts / 86400, tipo "
+                            "HAVING COUNT(*) > 1 LIMIT 1").fetchone()
+    if repeated is None:
+        conn.execute("CREATE UNIQUE INDEX idx_fichajes_employee_dia_tipo ON fichajes_ts (employee_id, ts / 86400, tipo)")
+
+
+def _balance_ledger(conn: sqlite3.Connection):
+    """
+    v7: running overtime balance per employee and day: balance is the sum of
+    (worked - expected) seconds of every day up to and including dia, so the balance
+    of any range is the difference of two rows. Created empty; the model fills it
+    from daily_totals (init_db, after the migrations).
+    """
+    conn.execute("""
+        CREATE TABLE balance_ledger (
+            employee_id INTEGER NOT NULL,
+            dia INTEGER NOT NULL,
+            balance INTEGER NOT NULL,
+            PRIMARY KEY (employee_id, dia)
+        ) WITHOUT ROWID
+    """)
+
+
+def _schedules(conn: sqlite3.Connection):
+    """
+    v8: work schedule rules (per-weekday targets with an optional summer timetable,
+    holidays, per-employee vacations) and expected_calendar, the expected seconds of
+    every day materialized from them one year at a time by models.horario. Seeded
+    with the previous hard-coded goal: 7.5 h Monday to Friday.
+    """
+    conn.execute("""
+        CREATE TABLE schedule_weekdays (
+            weekday INTEGER PRIMARY KEY,
+            seconds INTEGER NOT NULL,
+            summer_seconds INTEGER
+        )
+    """)
+    conn.executemany("INSERT INTO schedule_weekdays (weekday, seconds) VALUES (?, ?)",
+                     [(weekday, 27000 if weekday < 5 else 0) for weekday in range(7)])
+    conn.execute("CREATE TABLE schedule_settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    conn.execute("CREATE TABLE holidays (dia INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    conn.execute("""
+        CREATE TABLE vacations (
+            employee_id INTEGER NOT NULL,
+            dia INTEGER NOT NULL,
+            PRIMARY KEY (employee_id, dia)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE expected_calendar (
+            employee_id INTEGER NOT NULL,
+            dia INTEGER NOT NULL,
+            expected_seconds INTEGER NOT NULL,
+            PRIMARY KEY (employee_id, dia)
+        ) WITHOUT ROWID
+    """)
+    # The ledger is rebuilt against the calendar on the next query
+    conn.execute("DELETE FROM balance_ledger")
+
+
+def _repeated_punch_types(conn: sqlite3.Connection):
+    """
+    v9: a day is any number of work intervals (several breaks, split shifts), so a
+    punch type may repeat within a day. The per-day unique index goes away (v6 may not
+    have created it); the lookup index becomes unique on (employee_id, ts, tipo), which
+    still rejects the same punch stored twice. If the database already holds such
+    repeats the migration stops and lists them: they are only removed on request
+    (python -m db.migrations --remove-duplicates).
+    """
+    conn.execute("DROP INDEX IF EXISTS idx_fichajes_employee_dia_tipo")
+    duplicated = conn.execute(SQL_EXACT_DUPLICATES).fetchall()
+    if duplicated:
+        shown = duplicated[:MAX_LISTED_ROWS]
+        lines = [f"  id {punch_id}: empleado {employee_id}, "
+                 f"{strftime('%Y-%m-%d %H:%M:%S', gmtime(ts))} {tipo}" for punch_id, employee_id, ts, tipo in shown]
+        if len(duplicated) > len(shown):
+            lines.append(f"  ... y {len(duplicated) - len(shown)} más")
+        raise MigrationError("El mismo fichaje (tipo y segundo) está guardado varias veces. Ejecute "
+                             "'python -m db.migrations --remove-duplicates' para dejar solo el primero:\n"
+                             + "\n".join(lines))
+    conn.execute("DROP INDEX idx_fichajes_employee_ts_tipo")
+    conn.execute("CREATE UNIQUE INDEX idx_fichajes_employee_ts_tipo ON fichajes_ts (employee_id, ts, tipo)")
+
+
+MIGRATIONS: List[Migration] = [
+    ("create fichajes table", _create_fichajes),
+    ("index fichajes (fecha, tipo, hora)", _index_fecha_tipo_hora),
+    ("integer timestamps in fichajes_ts", _integer_timestamps),
+    ("daily_totals aggregate table", _daily_totals),
+    ("employee dimension", _employees),
+    ("unique punch type per employee and day", _unique_day_type),
+    ("balance_ledger prefix sums", _balance_ledger),
+    ("work schedules and expected_calendar", _schedules),
+    ("repeated punch types per day", _repeated_punch_types),
+]
+
+SCHEMA_VERSION: int = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Returns the schema version stored in the database header."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Applies every pending migration, each one in its own transaction together with
+    the user_version bump, so an interrupted upgrade never leaves a half-applied step.
+    Returns the resulting schema version.
+    """
+    current: int = get_schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f"La base de datos tiene la versión de esquema {current}, "
+                           f"más reciente que la soportada ({SCHEMA_VERSION}).")
+
+    for version in range(current + 1, SCHEMA_VERSION + 1):
+        description, apply = MIGRATIONS[version - 1]
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except MigrationError as e:
+            conn.rollback()
+            raise MigrationError(f"La migración {version} ({description}) no se ha aplicado. {e}")
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise RuntimeError(f"Error en la migración {version} ({description}): {e}")
+    return SCHEMA_VERSION
+
+
+if __name__ == "__main__":
+    # python -m db.migrations [--explain] [--rebuild-totals] [--invalid] [--remove-duplicates]
+    from db import connect_db
+
+    conn = connect_db()
+    before = get_schema_version(conn)
+    removed = 0
+    if "--remove-duplicates" in sys.argv[1:] and before >= 5:
+        # Explicit repair for v9: keeps the first copy of each repeated punch
+        with conn:
+            removed = conn.execute(SQL_REMOVE_EXACT_DUPLICATES).rowcount
+        print(f"Fichajes repetidos eliminados: {removed}")
+    from models.fichaje import init_db, rebuild_daily_totals
+    try:
+        init_db()  # migrate() plus filling daily_totals if a migration left it empty
+    except RuntimeError as e:  # MigrationError included (raised from db.migrations, not __main__)
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(f"Schema version: {before} -> {get_schema_version(conn)}")
+
+    if "--rebuild-totals" in sys.argv[1:] or removed:
+        print(f"Daily totals rebuilt: {rebuild_daily_totals()} days")
+
+    if "--invalid" in sys.argv[1:]:
+        # Punches set aside by v3 because their fecha/hora could not be parsed
+        for punch_id, fecha, tipo, hora in conn.execute(
+                "SELECT id, fecha, tipo, hora FROM fichajes_invalid ORDER BY id"):
+            print(f"{punch_id}\t{fecha}\t{hora}\t{tipo}")
+
+    if "--explain" in sys.argv[1:]:
+        from models.fichaje import explain_queries
+        remaining_scans = explain_queries()
+        sys.exit(1 if remaining_scans else 0)
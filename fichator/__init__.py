@@ -0,0 +1 @@
+# fichator/__init__.py
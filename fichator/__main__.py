@@ -0,0 +1,7 @@
+# fichator/__main__.py
+
+import sys
+
+from fichator.cli import main
+
+sys.exit(main())
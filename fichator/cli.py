@@ -0,0 +1,228 @@
+# fichator/cli.py
+
+# Headless entry point (python -m fichator). It must only import the stdlib,
+# sqlite3 and the model layer: never Qt, matplotlib, numpy or pandas, so a status
+# query from a shell script or login hook starts in a few tens of milliseconds.
+
+import argparse
+import csv
+import sys
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from db import connect_db
+from models.fichaje import (
+    DEFAULT_EMPLOYEE_ID, PUNCH_TYPES, SQL_PUNCHES_BETWEEN,
+    get_daily_punches, get_daily_totals, init_db, register_punch
+)
+from models.horario import (
+    WEEKDAY_NAMES, add_holiday, get_expected_seconds, get_schedule, remove_holiday, set_summer_period,
+    set_vacation, set_weekday_target
+)
+from models.logica_contador import calculate_accumulated_time_and_state
+from models.tiempo import day_start, format_date, format_hour
+
+DAY_NAMES: List[str] = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _format_seconds(seconds: float) -> str:
+    """Formats seconds as H:MM."""
+    minutes = int(seconds) // 60
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+def _parse_date(value: str) -> date:
+    """Parses a 'YYYY-MM-DD' date."""
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _parse_hours(value: str) -> int:
+    """Parses hours ('7.5' or '7:30') as seconds."""
+    hours, _, minutes = value.partition(":")
+    return int(hours) * 3600 + int(minutes) * 60 if minutes else round(float(value) * 3600)
+
+
+def _print_totals(start: date, end: date, employee_id: int):
+    """Prints one line per day from daily_totals plus the period total against the expected hours."""
+    totals = get_daily_totals(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), employee_id)
+    expected = get_expected_seconds(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), employee_id)
+    total_seconds = 0
+    for day_str, (worked, on_break, complete) in totals.items():
+        total_seconds += worked
+        weekday = _parse_date(day_str).weekday()
+        if weekday >= 5 and not worked and not expected.get(day_str):
+            continue  # Only show weekends that were worked or expected
+        flag = "" if complete or not worked else "  (incompleto)"
+        print(f"{DAY_NAMES[weekday]} {day_str}  {_format_seconds(worked):>6}  pausa {_format_seconds(on_break):>5}"
+              f"  objetivo {_format_seconds(expected.get(day_str, 0)):>5}{flag}")
+    goal_seconds = sum(expected.values())
+    summary = f"Total: {_format_seconds(total_seconds)} h"
+    if goal_seconds:
+        summary += f" de {_format_seconds(goal_seconds)} h ({total_seconds / goal_seconds * 100:.0f}%)"
+    print(summary)
+
+
+def cmd_punch(args: argparse.Namespace) -> int:
+    register_punch(args.type, args.employee)
+    print(f"{args.type} registrado a las {datetime.now().strftime('%H:%M:%S')}")
+    return 0
+
+
+def cmd_status(args: argparse.Namespace) -> int:
+    punches = get_daily_punches(datetime.now().strftime("%Y-%m-%d"), args.employee)
+    worked, is_active, _ = calculate_accumulated_time_and_state(punches)
+    state = "trabajando" if is_active else ("sin fichajes" if not punches else "parado")
+    print(f"Hoy: {_format_seconds(worked)} h ({state})")
+    for punch_type, ts in punches:
+        print(f"  {format_hour(ts)}  {punch_type}")
+    return 0
+
+
+def cmd_week(args: argparse.Namespace) -> int:
+    day = _parse_date(args.date) if args.date else date.today()
+    start = day - timedelta(days=day.weekday())
+    _print_totals(start, start + timedelta(days=6), args.employee)
+    return 0
+
+
+def cmd_month(args: argparse.Namespace) -> int:
+    first = datetime.strptime(args.month, "%Y-%m").date() if args.month else date.today().replace(day=1)
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    _print_totals(first, last, args.employee)
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """Exports punches as CSV in the same format models.importador reads."""
+    first_ts = day_start(args.start)
+    end_ts = day_start(args.end) + 86400
+    output = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(["employee_id", "fecha", "hora", "tipo"])
+        for punch_type, ts in connect_db().execute(SQL_PUNCHES_BETWEEN, (args.employee, first_ts, end_ts)):
+            writer.writerow([args.employee, format_date(ts), format_hour(ts, with_seconds=True), punch_type])
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def cmd_schedule(args: argparse.Namespace) -> int:
+    """Shows the work schedule of a year or changes a weekday target / the summer period."""
+    if args.action == "day":
+        set_weekday_target(WEEKDAY_NAMES.index(args.weekday), _parse_hours(args.hours),
+                           _parse_hours(args.summer) if args.summer else None)
+    elif args.action == "summer":
+        if not args.off and not (args.start and args.end):
+            raise ValueError("Indique el periodo de verano (MM-DD MM-DD) o --off")
+        set_summer_period(None if args.off else args.start, args.end)
+
+    year = args.year or date.today().year
+    schedule = get_schedule(year, args.employee)
+    for name, (seconds, summer) in schedule["weekdays"].items():
+        line = f"{name}  {_format_seconds(seconds):>5}"
+        if summer is not None:
+            line += f"  verano {_format_seconds(summer):>5}"
+        print(line)
+    if schedule["summer"]:
+        print(f"Verano: {schedule['summer'][0]} a {schedule['summer'][1]}")
+    for day_str, name in schedule["holidays"]:
+        print(f"Festivo {day_str}  {name}")
+    if schedule["vacations"]:
+        print(f"Vacaciones {year}: {len(schedule['vacations'])} días")
+    return 0
+
+
+def cmd_holiday(args: argparse.Namespace) -> int:
+    if args.action == "add":
+        add_holiday(args.date, args.name)
+        print(f"Festivo {args.date} añadido")
+    else:
+        remove_holiday(args.date)
+        print(f"Festivo {args.date} eliminado")
+    return 0
+
+
+def cmd_vacation(args: argparse.Namespace) -> int:
+    end = args.end or args.start
+    set_vacation(args.start, end, args.employee, on_vacation=args.action == "add")
+    print(f"Vacaciones {args.start} a {end} {'añadidas' if args.action == 'add' else 'eliminadas'}")
+    return 0
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    from fichator.servidor import serve  # asyncio is only needed by this command
+    serve(args.host, args.port)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Builds the argument parser; --employee is accepted by every subcommand."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--employee", type=int, default=DEFAULT_EMPLOYEE_ID, help="ID del empleado (por defecto 1)")
+
+    parser = argparse.ArgumentParser(prog="fichator", description="Control horario sin interfaz gráfica.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    punch = commands.add_parser("punch", parents=[common], help="Registra un fichaje con la hora actual")
+    punch.add_argument("type", choices=PUNCH_TYPES)
+    punch.set_defaults(func=cmd_punch)
+
+    status = commands.add_parser("status", parents=[common], help="Horas trabajadas hoy y estado actual")
+    status.set_defaults(func=cmd_status)
+
+    week = commands.add_parser("week", parents=[common], help="Resumen semanal (lunes a domingo)")
+    week.add_argument("--date", help="Cualquier día de la semana (YYYY-MM-DD), por defecto hoy")
+    week.set_defaults(func=cmd_week)
+
+    month = commands.add_parser("month", parents=[common], help="Resumen mensual")
+    month.add_argument("--month", help="Mes (YYYY-MM), por defecto el actual")
+    month.set_defaults(func=cmd_month)
+
+    export = commands.add_parser("export", parents=[common], help="Exporta fichajes a CSV")
+    export.add_argument("start", help="Fecha inicial (YYYY-MM-DD)")
+    export.add_argument("end", help="Fecha final (YYYY-MM-DD)")
+    export.add_argument("-o", "--output", help="Fichero de salida (por defecto stdout)")
+    export.set_defaults(func=cmd_export)
+
+    schedule = commands.add_parser("schedule", parents=[common], help="Horario: objetivo por día y verano")
+    schedule.add_argument("--year", type=int, help="Año mostrado (por defecto el actual)")
+    schedule.set_defaults(func=cmd_schedule)
+    schedule_actions = schedule.add_subparsers(dest="action")
+    schedule_day = schedule_actions.add_parser("day", help="Horas esperadas de un día de la semana")
+    schedule_day.add_argument("weekday", choices=WEEKDAY_NAMES)
+    schedule_day.add_argument("hours", help="Horas (7.5 o 7:30); 0 = no laborable")
+    schedule_day.add_argument("--summer", help="Horas en el periodo de verano")
+    schedule_summer = schedule_actions.add_parser("summer", help="Periodo de jornada de verano")
+    schedule_summer.add_argument("start", nargs="?", help="Inicio (MM-DD)")
+    schedule_summer.add_argument("end", nargs="?", help="Fin (MM-DD), incluido")
+    schedule_summer.add_argument("--off", action="store_true", help="Sin jornada de verano")
+
+    holiday = commands.add_parser("holiday", help="Festivos (sin horas esperadas para nadie)")
+    holiday.add_argument("action", choices=["add", "remove"])
+    holiday.add_argument("date", help="Fecha (YYYY-MM-DD)")
+    holiday.add_argument("name", nargs="?", default="", help="Nombre del festivo")
+    holiday.set_defaults(func=cmd_holiday)
+
+    vacation = commands.add_parser("vacation", parents=[common], help="Días de vacaciones de un empleado")
+    vacation.add_argument("action", choices=["add", "remove"])
+    vacation.add_argument("start", help="Primer día (YYYY-MM-DD)")
+    vacation.add_argument("end", nargs="?", help="Último día (YYYY-MM-DD), por defecto el primero")
+    vacation.set_defaults(func=cmd_vacation)
+
+    server = commands.add_parser("serve", help="Servidor HTTP/JSON local para terminales de fichaje")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8765, help="Puerto (0 = uno libre)")
+    server.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        init_db()
+        return args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,249 @@
+# fichator/servidor.py
+
+# Local HTTP/JSON punch service (python -m fichator serve) so several badge
+# terminals and scripts can punch against one fichajes.db at the same time.
+# Like the CLI it only uses the stdlib and the model layer.
+#
+#   POST /punch                      {"employee_id": 1, "type": "Entrada"}
+#   GET  /punches?employee_id=1&date=YYYY-MM-DD
+#   GET  /week?employee_id=1&date=YYYY-MM-DD
+#   GET  /stats
+#
+# Reads run on a small thread pool (one SQLite connection per thread). Punches are
+# queued to a single writer task: while one transaction is being written the next
+# requests pile up, and the writer then registers all of them in one transaction
+# (register_punch_batch), so the commit cost is shared by the whole batch.
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from db import close_db
+from models.fichaje import (
+    DEFAULT_EMPLOYEE_ID, PUNCH_TYPES, get_daily_punches, get_daily_totals, register_punch_batch
+)
+from models.horario import get_expected_seconds
+from models.tiempo import format_date, format_hour
+
+DEFAULT_HOST: str = "127.0.0.1"
+DEFAULT_PORT: int = 8765
+# Upper bound of punches written in one transaction
+MAX_BATCH: int = 512
+READ_THREADS: int = 4
+MAX_BODY_BYTES: int = 64 * 1024
+
+REASONS: Dict[int, str] = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+                           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+                           500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    """Request error returned to the client as {"error": message} with this status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _employee_id(value: Any) -> int:
+    try:
+        employee_id = int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"employee_id no válido: {value}")
+    if employee_id <= 0:
+        raise HttpError(400, f"employee_id no válido: {value}")
+    return employee_id
+
+
+def _date(value: Optional[str]) -> date:
+    if not value:
+        return date.today()
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HttpError(400, f"Fecha no válida (YYYY-MM-DD): {value}")
+
+
+class PunchServer:
+    """The asyncio server plus its single writer task and the read thread pool."""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, max_batch: int = MAX_BATCH):
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.stats: Dict[str, int] = {"requests": 0, "punches": 0, "rejected": 0, "batches": 0, "max_batch": 0}
+        self._queue: "asyncio.Queue[Tuple[int, str, asyncio.Future]]" = asyncio.Queue()
+        self._readers = ThreadPoolExecutor(READ_THREADS, thread_name_prefix="fichator-read")
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="fichator-write")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writer_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # Resolves port 0
+
+    async def serve_forever(self):
+        """Serves (after start()) until cancelled, then closes everything."""
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+        self._readers.shutdown()
+        self._writer.shutdown()
+        close_db()
+
+    # --- Single writer (group commit) ---
+
+    async def _writer_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self._writer, register_punch_batch,
+                                                     [(employee_id, punch_type) for employee_id, punch_type, _ in batch])
+            except Exception as e:
+                results = [HttpError(500, str(e))] * len(batch)
+
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue  # Client gone
+                if isinstance(result, Exception):
+                    self.stats["rejected"] += 1
+                    future.set_exception(result if isinstance(result, HttpError) else HttpError(409, str(result)))
+                else:
+                    self.stats["punches"] += 1
+                    future.set_result(result)
+
+    async def punch(self, employee_id: int, punch_type: str) -> int:
+        """Queues a punch for the writer and waits for its transaction. Returns its timestamp."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((employee_id, punch_type, future))
+        return await future
+
+    # --- Endpoints ---
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        loop = asyncio.get_running_loop()
+
+        if url.path == "/punch":
+            if method != "POST":
+                raise HttpError(405, "Use POST")
+            try:
+                data = json.loads(body or b"{}")
+            except ValueError:
+                raise HttpError(400, "JSON no válido")
+            if not isinstance(data, dict):
+                raise HttpError(400, "JSON no válido")
+            employee_id = _employee_id(data.get("employee_id", DEFAULT_EMPLOYEE_ID))
+            punch_type = data.get("type")
+            if punch_type not in PUNCH_TYPES:
+                raise HttpError(400, f"Tipo de fichaje desconocido: {punch_type}")
+            ts = await self.punch(employee_id, punch_type)
+            return 201, {"employee_id": employee_id, "type": punch_type, "ts": ts,
+                         "fecha": format_date(ts), "hora": format_hour(ts, with_seconds=True)}
+
+        if method != "GET":
+            raise HttpError(405, "Use GET")
+        if url.path == "/punches":
+            employee_id = _employee_id(query.get("employee_id", DEFAULT_EMPLOYEE_ID))
+            day = _date(query.get("date")).strftime("%Y-%m-%d")
+            punches = await loop.run_in_executor(self._readers, get_daily_punches, day, employee_id)
+            return 200, {"employee_id": employee_id, "date": day,
+                         "punches": [{"type": tipo, "ts": ts, "hora": format_hour(ts, with_seconds=True)}
+                                     for tipo, ts in punches]}
+        if url.path == "/week":
+            employee_id = _employee_id(query.get("employee_id", DEFAULT_EMPLOYEE_ID))
+            day = _date(query.get("date"))
+            monday = day - timedelta(days=day.weekday())
+            week = (monday.strftime("%Y-%m-%d"), (monday + timedelta(days=6)).strftime("%Y-%m-%d"), employee_id)
+            totals = await loop.run_in_executor(self._readers, get_daily_totals, *week)
+            expected = await loop.run_in_executor(self._readers, get_expected_seconds, *week)
+            return 200, {"employee_id": employee_id, "week_start": monday.strftime("%Y-%m-%d"),
+                         "goal_seconds": sum(expected.values()),
+                         "total_seconds": sum(worked for worked, _, _ in totals.values()),
+                         "days": [{"date": day_str, "worked_seconds": worked, "break_seconds": on_break,
+                                   "complete": complete, "expected_seconds": expected.get(day_str, 0)}
+                                  for day_str, (worked, on_break, complete) in totals.items()]}
+        if url.path == "/stats":
+            return 200, dict(self.stats, queued=self._queue.qsize())
+        raise HttpError(404, f"Ruta desconocida: {url.path}")
+
+    # --- HTTP/1.1 (keep-alive) ---
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self.stats["requests"] += 1
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise HttpError(413, "Cuerpo demasiado grande")
+                    body = await reader.readexactly(length) if length > 0 else b""
+                    status, payload = await self._dispatch(method, target, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except ValueError:
+                    status, payload, keep_alive = 400, {"error": "Content-Length no válido"}, False
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write((f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                              f"Content-Type: application/json; charset=utf-8\r\n"
+                              f"Content-Length: {len(data)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, max_batch: int = MAX_BATCH):
+    """Runs the punch server until interrupted (Ctrl+C)."""
+    async def run():
+        server = PunchServer(host, port, max_batch)
+        await server.start()
+        print(f"Servidor de fichajes en http://{server.host}:{server.port}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
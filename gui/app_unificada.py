@@ -1,27 +1,94 @@
 # gui/app_unificada.py
 
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QLabel, QTableView,
     QPushButton, QDateEdit, QHBoxLayout, QDialog, QFormLayout,
     QDialogButtonBox, QTimeEdit, QComboBox, QMessageBox, QSpacerItem, 
     QSizePolicy, QGroupBox, QGridLayout, QHeaderView, QFrame, QProgressBar 
 )
-from PySide6.QtCore import QDate, QTime, Signal, Qt, QTimer
+from PySide6.QtCore import QDate, QTime, Signal, Qt, QTimer, QModelIndex, QEvent
 from PySide6.QtGui import QColor, QFont
 # CORREGIDO: Se importan explícitamente date y time para resolver errores de tipado de Pylance
 from datetime import datetime, timedelta, date, time 
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, NamedTuple
 
 # Model Imports - CORREGIDO: Nombres de funciones en inglés
 from models.fichaje import (
-    register_punch, get_daily_punches, calculate_worked_hours, 
-    register_manual_punch, delete_punch_by_date_type, PUNCH_TYPES
+    register_punch, get_daily_punches, get_punches_range, calculate_worked_hours, get_balance,
+    DEFAULT_EMPLOYEE_ID,
+    register_manual_punch, delete_punch, PUNCH_TYPES
 )
-from models.logica_contador import calculate_accumulated_time_and_state 
-
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from db import connect_db # CORREGIDO: conectar -> connect_db
+from models.horario import get_expected_seconds
+from models.logica_contador import LiveCounter, evaluate_day, OFF, WORKING, ON_BREAK, FINISHED
+from models.tiempo import format_hour, parse_timestamp
+from gui.modelo_tabla import PunchTableModel, DAY_NAMES
+from gui.reloj import TickScheduler
+from gui.trabajador_db import DbWorker
+
+# matplotlib (gui.grafico) is imported lazily in _create_chart_section (it dominates startup time)
+from db import connect_db, QueryCounter # CORREGIDO: conectar -> connect_db
+from db.instrumentacion import timed # No-op unless FICHATOR_PROFILE / --profile
+
+# SQL statements per refresh while the current week is displayed: the week's punches,
+# its expected hours and the balance ledger lookup (see fetch_refresh_snapshot)
+REFRESH_QUERY_BUDGET: int = 3
+
+class RefreshSnapshot(NamedTuple):
+    """Everything the widgets show, read from the DB once per refresh."""
+    week_start: date
+    week_end: date                                   # Friday, or Saturday/Sunday when worked or expected
+    week_punches: Dict[str, List[Tuple[str, int]]]   # Displayed days of the week
+    week_totals: Dict[str, Tuple[int, int, bool]]    # (worked, break, complete) per day
+    week_expected: Dict[str, int]                    # Expected seconds per day, from the calendar
+    today_punches: List[Tuple[str, int]]
+    today_expected: int                              # Today's goal for the live counter
+    balance_seconds: int                             # Running overtime balance up to balance_through
+    balance_through: date
+
+def fetch_refresh_snapshot(start_of_week: date, today: date, employee_id: int) -> Tuple[RefreshSnapshot, int]:
+    """
+    Reads the week starting at start_of_week (Mon-Sun) with a single range query plus
+    its expected hours from the precomputed calendar, and derives the daily totals in
+    memory. The weekend is only displayed when it has punches or expected hours (Sunday
+    brings Saturday along). When today falls in that week the same queries cover it;
+    otherwise its punches and expected hours cost one more query each. The running
+    balance (up to the week's Sunday or yesterday, whichever is earlier) is one ledger lookup,
+    plus two sums for days the ledger does not reach yet (see get_balance). Steady state is
+    REFRESH_QUERY_BUDGET statements, 5 for a past week; a calendar year not materialized
+    yet or a truncated ledger add a few more once.
+    Returns the snapshot and the number of SQL statements it took. Runs on the DB worker.
+    """
+    end_of_week: date = start_of_week + timedelta(days=6)
+    today_str: str = today.strftime("%Y-%m-%d")
+    with QueryCounter() as queries:
+        span_punches = get_punches_range(
+            start_of_week.strftime("%Y-%m-%d"), end_of_week.strftime("%Y-%m-%d"), employee_id)
+        expected = get_expected_seconds(start_of_week.strftime("%Y-%m-%d"), end_of_week.strftime("%Y-%m-%d"),
+                                        employee_id)
+        today_punches = span_punches.get(today_str)
+        if today_punches is None:
+            today_punches = get_daily_punches(today_str, employee_id)
+        today_expected: Optional[int] = expected.get(today_str)
+        if today_expected is None:
+            today_expected = get_expected_seconds(today_str, today_str, employee_id).get(today_str, 0)
+        # Today is still in progress: its expected hours would show as a deficit until the evening
+        balance_through: date = min(end_of_week, today - timedelta(days=1))
+        balance_seconds: int = get_balance(None, balance_through.strftime("%Y-%m-%d"), employee_id)
+
+    days: List[str] = list(span_punches)
+    shown: int = 5
+    for i in (5, 6):
+        if span_punches[days[i]] or expected.get(days[i], 0) > 0:
+            shown = i + 1
+    week_punches: Dict[str, List[Tuple[str, int]]] = {day_str: span_punches[day_str] for day_str in days[:shown]}
+
+    week_totals: Dict[str, Tuple[int, int, bool]] = {}
+    for day_str, punches in week_punches.items():
+        evaluation = evaluate_day(punches)
+        week_totals[day_str] = (evaluation.worked_seconds, evaluation.break_seconds, evaluation.is_complete)
+    week_expected: Dict[str, int] = {day_str: expected.get(day_str, 0) for day_str in week_punches}
+    return RefreshSnapshot(start_of_week, start_of_week + timedelta(days=shown - 1), week_punches, week_totals,
+                           week_expected, today_punches, today_expected, balance_seconds, balance_through), queries.count
 
 # Base class for signal emission - CORREGIDO: Nombre de señal
 class SignalEmitter(QWidget):
@@ -34,18 +101,31 @@ class UnifiedPunchApp(SignalEmitter):
     Main widget combining punch control, weekly table, summary, and chart.
     Manages the application state and UI updates.
     """
-    WEEKLY_GOAL_HOURS: float = 37.5 
+    # Emitted once the deferred sections (chart, week history) are loaded
+    fully_loaded = Signal()
+    DEFERRED_LOAD_FALLBACK_MS: int = 250
+    HISTORY_RANGES: List[str] = ["Week", "Month", "Quarter", "Year"]
 
-    def __init__(self):
+    def __init__(self, employee_id: int = DEFAULT_EMPLOYEE_ID):
         super().__init__()
         
         # State Initialization - CORREGIDO: Nombres de atributos
+        self.employee_id: int = employee_id
         self.worked_time_seconds: float = 0.0
         self.last_punch_time: Optional[datetime] = None
-        
-        # Timer Configuration (1-second interval)
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self._update_counter)
+        # In-memory snapshot of today's state; the counter ticks only read from it
+        self.live_counter = LiveCounter()
+        self.daily_goal_seconds: int = 0
+        # Every DB call runs on this thread; results come back through callbacks
+        self.db_worker = DbWorker(parent=self)
+        
+        # Counter wake-ups (see gui/reloj.py): aligned to the wall-clock second while working
+        # and visible, once a minute while idle, none while hidden or minimized
+        self.ticker = TickScheduler(self.live_counter, self)
+        self.ticker.tick.connect(self._update_counter)
+        self.ticker.goal_reached.connect(self._update_goal_state)
+        self.ticker.day_changed.connect(self._on_day_changed)
+        self._watched_window: Optional[QWidget] = None
         
         self.main_layout = QVBoxLayout(self)
 
@@ -61,15 +141,170 @@ class UnifiedPunchApp(SignalEmitter):
         self._create_history_section()
         self.main_layout.addWidget(self.history_group)
         
+        # Chart placeholder: the canvas is created after the first paint
+        self.chart = None
+        self.chart_container = QWidget()
+        self.chart_container.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.chart_container.setMinimumHeight(200)
+        self.chart_layout = QVBoxLayout(self.chart_container)
+        self.chart_layout.setContentsMargins(0, 0, 0, 0)
+        self.main_layout.addWidget(self.chart_container)
+
+        # Coalesced refresh state (see schedule_refresh)
+        self._refresh_pending: bool = False
+        self._refresh_in_flight: bool = False
+        self._refresh_again: bool = False
+        self.refresh_count: int = 0
+        self.last_refresh_query_count: int = 0 # Within REFRESH_QUERY_BUDGET in steady state
+
+        # 2. First paint data: only today's counter, punches and buttons (one query,
+        # on the DB worker; the buttons stay disabled until the state is known)
+        self.daily_hours: List[float] = []
+        self.daily_goals: List[float] = []
+        # Days of the displayed week (Mon-Fri, Mon-Sat or Mon-Sun), set by each snapshot
+        self.week_days: int = 5
+        self.is_fully_loaded: bool = False
+        self._fully_loaded_emitted: bool = False
+        for btn in self.punch_buttons.values():
+            btn.setEnabled(False)
+        self.db_worker.read(get_daily_punches, (date.today().strftime("%Y-%m-%d"), self.employee_id),
+                            self._apply_today_punches)
+
+        # 3. Chart (matplotlib import) and week history right after the first paint
+        # (paintEvent); the fallback timer covers windows that are never exposed.
+        self._deferred_load_scheduled: bool = False
+        QTimer.singleShot(self.DEFERRED_LOAD_FALLBACK_MS, self.ensure_fully_loaded)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._deferred_load_scheduled:
+            self._deferred_load_scheduled = True
+            QTimer.singleShot(0, self.ensure_fully_loaded)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Minimizing only changes the top-level window's state: watch it for that
+        if self._watched_window is not self.window():
+            self._watched_window = self.window()
+            self._watched_window.installEventFilter(self)
+        self._update_visibility()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._update_visibility()
+
+    def eventFilter(self, watched, event) -> bool:
+        if watched is self._watched_window and event.type() == QEvent.Type.WindowStateChange:
+            self._update_visibility()
+        return super().eventFilter(watched, event)
+
+    @timed("ui")
+    def ensure_fully_loaded(self):
+        """
+        Builds the deferred sections (chart, week table, weekly summary) if not done yet.
+        fully_loaded is emitted once their first snapshot has been applied.
+        """
+        if self.is_fully_loaded:
+            return
+        self.is_fully_loaded = True
         self._create_chart_section()
-        self.main_layout.addWidget(self.canvas)
+        self.refresh() # Also fills the table, the weekly summary and the chart
+
+    def shutdown(self):
+        """Stops the DB worker after it has finished the queued requests."""
+        self.ticker.stop()
+        self.db_worker.stop()
+
+    # ----------------------------------------
+    # --- Refresh Pipeline ---
+    # ----------------------------------------
 
-        # 2. Initial Data Load - CORREGIDO: Nombres de métodos
-        self._load_initial_counter_state() 
-        self.update_table()
-        self.update_quick_history()
-        self.update_button_state()
-        self.update_weekly_summary() 
+    def schedule_refresh(self):
+        """
+        Requests a refresh of every widget on the next event-loop turn. Requests made
+        before it runs (e.g. a burst of table edits) are coalesced into a single refresh.
+        """
+        if self._refresh_pending:
+            return
+        self._refresh_pending = True
+        QTimer.singleShot(0, self.refresh)
+
+    @timed("ui")
+    def refresh(self):
+        """
+        Asks the DB worker for one data snapshot, which _apply_snapshot fans out to all
+        widgets. Only one snapshot read is in flight at a time; a refresh requested
+        meanwhile is run once it arrives, so the widgets always end up current.
+        """
+        self._refresh_pending = False
+        if self._refresh_in_flight:
+            self._refresh_again = True
+            return
+        self._refresh_in_flight = True
+        start_of_week, _ = self._displayed_week()
+        self.db_worker.read(fetch_refresh_snapshot, (start_of_week, date.today(), self.employee_id),
+                            self._apply_snapshot, self._on_refresh_error)
+
+    @timed("ui")
+    def _apply_snapshot(self, result: Tuple[RefreshSnapshot, int]):
+        """Updates the counter, today's punches, buttons, table, summary and chart from a snapshot."""
+        snapshot, query_count = result
+        self._refresh_in_flight = False
+        self.refresh_count += 1
+        self.last_refresh_query_count = query_count
+
+        self.daily_goal_seconds = snapshot.today_expected
+        self._apply_today_punches(snapshot.today_punches)
+        if self.is_fully_loaded:
+            self.update_table(snapshot)
+            if not self._fully_loaded_emitted:
+                self._fully_loaded_emitted = True
+                self.fully_loaded.emit()
+
+        if self._refresh_again:
+            self._refresh_again = False
+            self.refresh()
+
+    def _on_refresh_error(self, error: Exception):
+        self._refresh_in_flight = False
+        QMessageBox.critical(self, "Refresh Error", str(error))
+        # A punch disables the buttons until the refresh; fall back to the last known state
+        self.update_button_state(self.live_counter.state)
+        if self._refresh_again:
+            self._refresh_again = False
+            self.refresh()
+
+    @timed("ui")
+    def _apply_today_punches(self, today_punches: List[Tuple[str, int]]):
+        """Fans today's punches out to the counter, the quick history and the buttons."""
+        self._load_initial_counter_state(today_punches)
+        self.update_quick_history(today_punches)
+        self.update_button_state(self.live_counter.state)
+
+    def _history_range(self) -> Tuple[date, date]:
+        """First and last day shown in the history table for the selected date and range."""
+        qdate: QDate = self.date_selector.date()
+        selected: date = date(qdate.year(), qdate.month(), qdate.day())
+        history_range: str = self.range_selector.currentText()
+        if history_range == "Month":
+            first_month, months = selected.month, 1
+        elif history_range == "Quarter":
+            first_month, months = selected.month - (selected.month - 1) % 3, 3
+        elif history_range == "Year":
+            first_month, months = 1, 12
+        else:
+            return self._displayed_week()
+        start: date = date(selected.year, first_month, 1)
+        next_month: int = first_month + months
+        end: date = date(selected.year + (next_month - 1) // 12, (next_month - 1) % 12 + 1, 1) - timedelta(days=1)
+        return start, end
+
+    def _displayed_week(self) -> Tuple[date, date]:
+        """Monday and last displayed day (Friday unless the weekend is worked) of the selected week."""
+        qdate: QDate = self.date_selector.date()
+        date_obj: date = date(qdate.year(), qdate.month(), qdate.day())
+        start_of_week: date = date_obj - timedelta(days=date_obj.weekday())
+        return start_of_week, start_of_week + timedelta(days=self.week_days - 1)
 
     # ----------------------------------------
     # --- UI Creation Methods ---
@@ -145,29 +380,40 @@ class UnifiedPunchApp(SignalEmitter):
         self.weekly_summary_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         self.progress_bar = QProgressBar()
-        # Set progress range based on weekly goal in "tenths of an hour" for precision
-        self.progress_bar.setRange(0, int(self.WEEKLY_GOAL_HOURS * 100)) 
+        # Range set from each week's goal, in hundredths of an hour for precision
         self.progress_bar.setValue(0)
         self.progress_bar.setTextVisible(True)
+
+        # Accumulated overtime / deficit, next to the weekly progress
+        self.balance_label = QLabel("")
+        self.balance_label.setObjectName("BalanceLabel")
+        progress_row = QHBoxLayout()
+        progress_row.addWidget(self.progress_bar, 1)
+        progress_row.addWidget(self.balance_label)
         
         self.weekly_summary_layout.addWidget(self.weekly_summary_label)
-        self.weekly_summary_layout.addWidget(self.progress_bar)
+        self.weekly_summary_layout.addLayout(progress_row)
 
 
     def _create_history_section(self):
-        """Creates the date controls and the weekly punch table."""
-        self.history_group = QGroupBox("Weekly History and Manual Edit")
+        """Creates the date/range controls and the punch history table."""
+        self.history_group = QGroupBox("History and Manual Edit")
         
         vbox = QVBoxLayout(self.history_group)
 
         # Date controls and action buttons
         control_layout = QHBoxLayout()
         
-        date_label = QLabel("Week starting:")
+        date_label = QLabel("Date:")
         self.date_selector = QDateEdit(QDate.currentDate())
         self.date_selector.setCalendarPopup(True)
         # CORREGIDO: Llamada al método renombrado
-        self.date_selector.dateChanged.connect(self.update_table)
+        self.date_selector.dateChanged.connect(self.schedule_refresh)
+
+        # Range shown in the table around the selected date (chart and summary stay weekly)
+        self.range_selector = QComboBox()
+        self.range_selector.addItems(self.HISTORY_RANGES)
+        self.range_selector.currentIndexChanged.connect(self.schedule_refresh)
         
         # CORREGIDO: Nombres de botones y llamadas a métodos
         self.manual_punch_btn = QPushButton("Manual Punch")
@@ -178,60 +424,56 @@ class UnifiedPunchApp(SignalEmitter):
         
         control_layout.addWidget(date_label)
         control_layout.addWidget(self.date_selector)
+        control_layout.addWidget(self.range_selector)
         control_layout.addStretch() 
         control_layout.addWidget(self.manual_punch_btn)
         control_layout.addWidget(self.delete_punch_btn)
         vbox.addLayout(control_layout)
 
-        # Punch Table 
-        self.punch_table = QTableWidget()
-        self.punch_table.setColumnCount(2 + len(PUNCH_TYPES)) 
-        self.punch_table.setHorizontalHeaderLabels(["Day", "Date"] + PUNCH_TYPES) 
-        # Connect itemChanged for manual inline editing
-        # CORREGIDO: Llamada al método renombrado
-        self.punch_table.itemChanged.connect(self._edit_punch_from_table)
+        # Punch Table: model/view, rows are read and formatted only as they become visible.
+        # Inline edits go through the model's setData to _edit_punch_from_table.
+        self.table_model = PunchTableModel(self.employee_id, self._edit_punch_from_table, self.db_worker, self)
+        self.punch_table = QTableView()
+        self.punch_table.setModel(self.table_model)
         
-        # Configuration for table appearance and sizing
+        # Configuration for table appearance and sizing (set once, not per update)
         self.punch_table.setAlternatingRowColors(True)
         self.punch_table.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding) 
-        self.punch_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.punch_table.verticalHeader().setVisible(False)
+        header = self.punch_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents) 
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents) 
         
         vbox.addWidget(self.punch_table)
         
         
     def _create_chart_section(self):
-        """Creates the Matplotlib chart canvas."""
-        self.figure = Figure(facecolor="#2c3e50") 
-        self.canvas = FigureCanvas(self.figure)
-        
-        self.canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        self.canvas.setMinimumHeight(200)
+        """Imports matplotlib and creates the persistent chart inside its placeholder."""
+        from gui.grafico import WeeklyChart
+
+        self.chart = WeeklyChart()
+        self.chart_layout.addWidget(self.chart.canvas)
 
 
     # ----------------------------------------
     # --- Real-Time Counter Logic ---
     # ----------------------------------------
 
-    def _load_initial_counter_state(self):
+    @timed("ui")
+    def _load_initial_counter_state(self, daily_punches: List[Tuple[str, int]]):
         """
-        Calculates initial worked time using logica_contador and starts/stops the QTimer.
+        Rebuilds the in-memory counter snapshot from today's punches (as read by the
+        DB worker) and re-plans the counter's wake-ups from it.
         """
-        today_str: str = QDate.currentDate().toString("yyyy-MM-dd")
-        # CORREGIDO: Nombre de función
-        daily_punches: List[Tuple[str, str]] = get_daily_punches(today_str)
         
-        # CORREGIDO: Nombre de función
         try:
-            total_seconds, is_active, start_time_dt = calculate_accumulated_time_and_state(daily_punches)
-            
-            self.worked_time_seconds = total_seconds
-            self.last_punch_time = start_time_dt
-            self._update_hours_label(total_seconds)
-
-            if is_active:
-                self.timer.start(1000)
-            else:
-                self.timer.stop()
+            self.live_counter.load(daily_punches)
+            self.last_punch_time = self.live_counter.start_time
+            self._update_counter(self.ticker.resolution or 60)
+            self._update_goal_state()
+            self.ticker.goal_seconds = self.daily_goal_seconds
+            self.ticker.reschedule()
                 
         except Exception as e:
             # Fallback for errors in counter logic or DB read
@@ -240,25 +482,44 @@ class UnifiedPunchApp(SignalEmitter):
             hours_td = calculate_worked_hours(daily_punches)
             self.worked_time_seconds = hours_td.total_seconds()
             self._update_hours_label(self.worked_time_seconds)
-            self.timer.stop()
+            self.ticker.stop()
 
 
-    def _update_counter(self):
-        """Timer slot: increments the counter and updates the UI label."""
-        # Se recalcula cada segundo para mantener la precisión y sincronización con el reloj del sistema
-        if self.last_punch_time:
-            punches = get_daily_punches(datetime.now().strftime("%Y-%m-%d"))
-            total_seconds, is_active, start_dt = calculate_accumulated_time_and_state(punches)
-            
-            self.worked_time_seconds = total_seconds
-            self._update_hours_label(self.worked_time_seconds)
-            
-        else:
-            self._update_hours_label(self.worked_time_seconds)
-            self.timer.stop()
+    @timed("ui")
+    def _update_counter(self, resolution: int = 1):
+        """Tick slot: advances the counter from the in-memory snapshot and updates the UI labels."""
+        # Derived from a monotonic clock: no DB access and immune to clock changes
+        self.worked_time_seconds = self.live_counter.elapsed_seconds()
+        self._update_hours_label(self.worked_time_seconds)
             
-        # Actualizar fecha y hora en el label de fecha
-        self.date_label.setText(datetime.now().strftime("%A, %d %B %Y | %H:%M:%S")) 
+        # Actualizar fecha y hora en el label de fecha (con segundos solo si el tick es por segundo)
+        self.date_label.setText(datetime.now().strftime(
+            "%A, %d %B %Y | %H:%M:%S" if resolution == 1 else "%A, %d %B %Y | %H:%M"))
+
+    def _update_visibility(self):
+        """Pauses the ticks while the window is hidden or minimized; catches up when shown again."""
+        visible: bool = self.isVisible() and not self.window().isMinimized()
+        was_visible: bool = self.ticker.visible
+        self.ticker.set_visible(visible)
+        if visible and not was_visible:
+            if self.live_counter.needs_reload():
+                self._on_day_changed()
+            else:
+                self._update_counter(self.ticker.resolution)
+
+    def _update_goal_state(self):
+        """Highlights the counter once today's worked time reaches today's expected hours."""
+        goal: int = self.daily_goal_seconds
+        reached: bool = goal > 0 and self.live_counter.elapsed_seconds() >= goal
+        self.hours_label.setToolTip(f"Daily goal: {goal / 3600:.2f} h" if goal > 0 else "No hours expected today")
+        if self.hours_label.property("goalReached") != reached:
+            self.hours_label.setProperty("goalReached", reached)
+            self.hours_label.style().polish(self.hours_label)
+
+    def _on_day_changed(self):
+        """Midnight rollover: today's punches and goal are a different set, reload once."""
+        self.date_label.setText(datetime.now().strftime("%A, %d %B %Y | %H:%M"))
+        self.schedule_refresh()
 
 
     def _update_hours_label(self, seconds: float):
@@ -273,230 +534,134 @@ class UnifiedPunchApp(SignalEmitter):
     # ----------------------------------------
     
     def _execute_punch(self, punch_type: str):
-        """Handles the quick punch button actions."""
-        try:
-            # CORREGIDO: Nombre de función
-            register_punch(punch_type)
-            
-            # Refresh all UI elements - CORREGIDO: Nombres de métodos y señales
-            self._load_initial_counter_state() 
-            self.update_table()
-            self.update_quick_history()
-            self.update_button_state() 
-            self.update_weekly_summary() 
-            self.punches_changed.emit() 
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Punch Error", str(e))
+        """Handles the quick punch button actions (the write runs on the DB worker)."""
+        # No second punch until this one is stored; the refresh re-enables the right buttons
+        for btn in self.punch_buttons.values():
+            btn.setEnabled(False)
+        # CORREGIDO: Nombre de función
+        self.db_worker.write(register_punch, (punch_type, self.employee_id),
+                             lambda _: self._on_punches_written(), self._on_punch_error)
+
+    def _on_punches_written(self):
+        """Refreshes all UI elements (coalesced) after a successful write - CORREGIDO: Nombres de señales"""
+        self.schedule_refresh()
+        self.punches_changed.emit()
+
+    def _on_punch_error(self, error: Exception):
+        QMessageBox.critical(self, "Punch Error", str(error))
+        self.schedule_refresh()
 
-    def update_quick_history(self):
+    @timed("ui")
+    def update_quick_history(self, punches: List[Tuple[str, int]]):
         """Updates the label showing today's punches."""
-        today_str: str = QDate.currentDate().toString("yyyy-MM-dd")
-        # CORREGIDO: Nombre de función
-        punches: List[Tuple[str, str]] = get_daily_punches(today_str)
         
         if punches:
             # Format time to HH:MM for cleaner display
-            text = "\n".join([f"  • {punch_type}: {time_str[:5]}" for punch_type, time_str in punches]) 
+            text = "\n".join([f"  • {punch_type}: {format_hour(ts)}" for punch_type, ts in punches]) 
         else:
             text = "No punches yet."
         self.history_content_label.setText(text) 
 
-    def update_button_state(self):
-        """Controls which quick punch buttons are enabled/disabled based on flow logic."""
-        today_str: str = QDate.currentDate().toString("yyyy-MM-dd")
-        # CORREGIDO: Nombre de función
-        punches_list: List[str] = [punch_type for punch_type, _ in get_daily_punches(today_str)]
-        punched: Dict[str, bool] = {p: True for p in punches_list}
-
+    @timed("ui")
+    def update_button_state(self, state: int):
+        """Controls which quick punch buttons are enabled/disabled for the day's state (flow logic)."""
         # 1. Disable all buttons first
         for btn in self.punch_buttons.values():
             btn.setEnabled(False)
 
-        # 2. Apply enablement logic based on sequence
+        # 2. Apply enablement logic based on the day's state (same rules as validate_punch_flow)
         
-        # A. Start Shift
-        if not punched.get("Entrada"):
+        # A. Start Shift (also a further shift after 'Fin jornada', e.g. split shifts)
+        if state in (OFF, FINISHED):
             self.punch_buttons["Entrada"].setEnabled(True)
-            return
 
-        # B. Shift Ended
-        if punched.get("Fin jornada"):
-            return # All remain disabled
-        
-        # C. Active Shift
-        
-        # C1. Currently on Lunch Break? ('Ir a comer' YES, 'Salida comida' NO)
-        if punched.get("Ir a comer") and not punched.get("Salida comida"):
-            # Only 'Salida comida' is allowed
+        # B. Currently on a break: only 'Salida comida' is allowed
+        elif state == ON_BREAK:
             self.punch_buttons["Salida comida"].setEnabled(True)
         
-        # C2. Currently Working? (No break or break ended)
-        elif (not punched.get("Ir a comer")) or (punched.get("Salida comida")):
-            # 'Ir a comer' OR 'Fin jornada' are allowed
+        # C. Currently Working: 'Ir a comer' (any number of breaks) OR 'Fin jornada' are allowed
+        elif state == WORKING:
             self.punch_buttons["Ir a comer"].setEnabled(True)
             self.punch_buttons["Fin jornada"].setEnabled(True)
             
     
     # --- Table and Editing Methods ---
 
-    def update_table(self):
-        """Updates the table with weekly punches (Mon-Fri) and recalculates totals."""
-        qdate: QDate = self.date_selector.date()
-        date_obj: date = datetime(qdate.year(), qdate.month(), qdate.day()).date()
-        # Calculate the start of the week (Monday)
-        start_of_week: date = date_obj - timedelta(days=date_obj.weekday()) 
-        
-        self.punch_table.blockSignals(True)
-        self.punch_table.setRowCount(5) 
+    @timed("ui")
+    def update_table(self, snapshot: RefreshSnapshot):
+        """
+        Updates the history table for the selected range and the week's daily hours
+        from a refresh snapshot, then the chart and the weekly summary.
+        """
+        self.week_days = len(snapshot.week_totals)
+        start, end = self._history_range()
+        if start != self.table_model.start or (end - start).days + 1 != self.table_model.total_days:
+            # New range: reset the model; the snapshot already holds its first days when it starts on Monday
+            self.table_model.set_range(start, end, snapshot.week_punches if start == snapshot.week_start else None)
+            # A week fills the table height; longer ranges scroll
+            self.punch_table.verticalHeader().setSectionResizeMode(
+                QHeaderView.ResizeMode.Stretch if len(self.table_model.dates()) <= 7 else QHeaderView.ResizeMode.Fixed)
+        else:
+            # Same range: only the rows whose punches changed are repainted
+            self.table_model.update_days(snapshot.week_punches)
+            self.table_model.update_days({date.today().strftime("%Y-%m-%d"): snapshot.today_punches})
+
+        self.daily_hours: List[float] = [worked / 3600 for worked, _, _ in snapshot.week_totals.values()]
+        self.daily_goals: List[float] = [expected / 3600 for expected in snapshot.week_expected.values()]
 
-        self.daily_hours: List[float] = []
-        day_names: List[str] = ["Mon", "Tue", "Wed", "Thu", "Fri"]
-
-        # Font configuration for table data
-        font_data = QFont()
-        font_data.setPointSize(10)
-        font_day_name = QFont()
-        font_day_name.setBold(True)
-
-        for i in range(5): # Iterate Monday to Friday
-            day: date = start_of_week + timedelta(days=i)
-            day_str: str = day.strftime("%Y-%m-%d")
-            # CORREGIDO: Nombre de función
-            punches: List[Tuple[str, str]] = get_daily_punches(day_str)
-            punch_dict: Dict[str, str] = {punch_type: time_str for punch_type, time_str in punches}
-
-            # Column 0: Day of the week
-            item_day_name = QTableWidgetItem(day_names[i])
-            item_day_name.setFont(font_day_name) 
-            self.punch_table.setItem(i, 0, item_day_name)
-            
-            # Column 1: Date
-            item_date = QTableWidgetItem(day_str)
-            self.punch_table.setItem(i, 1, item_date)
-
-            # Columns 2 onwards: Punches (Hours)
-            for j, punch_type in enumerate(PUNCH_TYPES):
-                hour_str: str = punch_dict.get(punch_type, "")
-                if hour_str and len(hour_str) > 5:
-                    hour_str = hour_str[:5] # Use HH:MM format
-                    
-                item = QTableWidgetItem(hour_str)
-                item.setFont(font_data) 
-                
-                # Apply alignment and QSS colors
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter) 
-                self.punch_table.setItem(i, j+2, item)
-
-            # CORREGIDO: calculate_worked_hours toma la lista de fichajes y devuelve un float
-            worked_hours_td: timedelta = calculate_worked_hours(punches)
-            worked_hours: float = worked_hours_td.total_seconds() / 3600
-            self.daily_hours.append(worked_hours)
-
-        # Final table layout adjustments
-        self.punch_table.resizeColumnsToContents() 
-        self.punch_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents) 
-        self.punch_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents) 
-        
-        for i in range(2, self.punch_table.columnCount()):
-            self.punch_table.horizontalHeader().setSectionResizeMode(i, QHeaderView.ResizeMode.Stretch) 
-            
-        self.punch_table.blockSignals(False)
         # CORREGIDO: Nombre de métodos
         self.update_chart()
-        self.update_weekly_summary() 
-        
-    def update_weekly_summary(self):
-        """Calculates weekly hours and updates the progress bar."""
-        qdate: QDate = self.date_selector.date()
-        date_obj: date = datetime(qdate.year(), qdate.month(), qdate.day()).date()
-        start_of_week: date = date_obj - timedelta(days=date_obj.weekday()) 
-        
-        total_hours: float = 0.0
-        # Recalculate based on current table week selection
-        for i in range(5):
-            day: date = start_of_week + timedelta(days=i)
-            day_str: str = day.strftime("%Y-%m-%d")
-            # CORREGIDO: calculate_worked_hours toma la lista de fichajes
-            punches: List[Tuple[str, str]] = get_daily_punches(day_str)
-            total_hours += calculate_worked_hours(punches).total_seconds() / 3600
-            
-        # Value for progress bar (multiplied by 100 for range set previously)
-        progress_value: int = int(total_hours * 100) 
+        self.update_weekly_summary(sum(worked for worked, _, _ in snapshot.week_totals.values()),
+                                   sum(snapshot.week_expected.values()))
+        self.update_balance(snapshot.balance_seconds, snapshot.balance_through)
+        
+    @timed("ui")
+    def update_weekly_summary(self, total_seconds: int, goal_seconds: int):
+        """Updates the progress bar with the worked and expected seconds of the displayed week."""
+        total_hours: float = total_seconds / 3600
+        goal_hours: float = goal_seconds / 3600
+
+        # Progress bar in hundredths of an hour; a week without expected hours shows full when worked
+        self.progress_bar.setRange(0, max(int(goal_hours * 100), 1))
+        progress_value: int = min(int(total_hours * 100), self.progress_bar.maximum())
         self.progress_bar.setValue(progress_value)
         
-        hours_remaining: float = max(0, self.WEEKLY_GOAL_HOURS - total_hours)
-        percentage: float = (total_hours / self.WEEKLY_GOAL_HOURS) * 100 if self.WEEKLY_GOAL_HOURS > 0 else 0.0
+        hours_remaining: float = max(0, goal_hours - total_hours)
+        percentage: float = (total_hours / goal_hours) * 100 if goal_hours > 0 else 0.0
         
-        progress_text: str = f"Progress: {total_hours:.2f} h of {self.WEEKLY_GOAL_HOURS:.1f} h ({percentage:.0f}%)"
+        progress_text: str = f"Progress: {total_hours:.2f} h of {goal_hours:.1f} h ({percentage:.0f}%)"
         
         # Update summary text
-        if hours_remaining > 0 and percentage < 100:
+        if goal_hours == 0:
+            remaining_text: str = "No hours expected this week."
+        elif hours_remaining > 0 and percentage < 100:
             remaining_text: str = f"{hours_remaining:.2f} hours remaining until goal."
         elif total_hours == 0:
-            remaining_text: str = f"Must reach {self.WEEKLY_GOAL_HOURS:.1f} hours this week."
+            remaining_text: str = f"Must reach {goal_hours:.1f} hours this week."
         else:
             remaining_text: str = "Weekly goal completed! 🎉"
             
         self.progress_bar.setFormat(progress_text)
         self.weekly_summary_label.setText(remaining_text)
 
+    @timed("ui")
+    def update_balance(self, balance_seconds: int, through: date):
+        """Shows the running overtime (+) or deficit (-) balance from the ledger."""
+        minutes: int = abs(balance_seconds) // 60
+        sign: str = "-" if balance_seconds < 0 else "+"
+        self.balance_label.setText(f"Balance: {sign}{minutes // 60}:{minutes % 60:02d} h")
+        self.balance_label.setToolTip(f"Accumulated overtime (+) or deficit (-) up to {through.strftime('%d/%m/%Y')}")
+        self.balance_label.setProperty("negative", balance_seconds < 0)
+        self.balance_label.style().polish(self.balance_label)
+
+    @timed("ui")
     def update_chart(self):
-        """Generates the aesthetic weekly bar chart for the 5 working days."""
-        self.figure.clear()
-        
-        # Set subplot background color to match QGroupBox/Card background
-        ax = self.figure.add_subplot(111, facecolor="#34495e") 
-
-        day_labels: List[str] = []
-        for i in range(self.punch_table.rowCount()):
-            item = self.punch_table.item(i, 0)
-            # CORREGIDO: Comprobación explícita para evitar Error 8 de Pylance
-            if item:
-                 day_labels.append(item.text())
-        
-        # Color coding logic for bars based on daily goal
-        daily_goal: float = self.WEEKLY_GOAL_HOURS / 5 
-        colors: List[str] = []
-        for h in self.daily_hours: 
-            if daily_goal > 0:
-                pct: float = h / daily_goal
-                if pct >= 1.0:
-                    colors.append("#2ecc71") # Green (Goal reached)
-                elif pct >= 0.8:
-                    colors.append("#f1c40f") # Yellow (Close to goal)
-                else:
-                    colors.append("#e74c3c") # Red (Below goal)
-            else:
-                colors.append("#4e6d8a") # Default gray
+        """Updates the persistent weekly bar chart for the displayed days in place."""
+        if self.chart is None:
+            return # Not built yet; ensure_fully_loaded draws it
 
-        ax.bar(day_labels, self.daily_hours, color=colors, edgecolor="#ecf0f1", linewidth=0.5)
-
-        # Add horizontal goal line
-        ax.axhline(daily_goal, color="#1abc9c", linestyle="-.", alpha=0.9, 
-                   label=f"Daily Goal ({daily_goal:.1f} h)")
-
-        total_weekly: float = sum(self.daily_hours)
-        pct_total: float = (total_weekly / self.WEEKLY_GOAL_HOURS) * 100 if self.WEEKLY_GOAL_HOURS > 0 else 0.0
-        
-        title_text: str = f"Worked Hours (Mon-Fri) | Total: {total_weekly:.2f} h ({pct_total:.0f}%)"
-        ax.set_title(title_text, color="#ecf0f1", fontsize=14, pad=15) 
-
-        # Configure axis appearance for dark theme
-        ax.set_ylabel("Hours", color="#ecf0f1")
-        ax.set_xlabel("Day", color="#ecf0f1")
-        ax.tick_params(colors="#ecf0f1", labelsize=9)
-        for spine in ax.spines.values():
-            spine.set_color("#ecf0f1")
-            
-        ax.grid(axis='y', linestyle=':', alpha=0.4, color="#7f8c8d")
-        ax.set_axisbelow(True)
-        
-        self.figure.tight_layout(pad=3.0) 
-        self.figure.autofmt_xdate(rotation=45) 
-
-        ax.legend(facecolor="#34495e", edgecolor="#ecf0f1", labelcolor="#ecf0f1", fontsize=9)
-        self.canvas.draw()
+        day_labels: List[str] = DAY_NAMES[:len(self.daily_hours)]
+        self.chart.update(day_labels, self.daily_hours, self.daily_goals, sum(self.daily_goals))
         
     def _show_manual_punch_dialog(self):
         """Displays the dialog for manual punch entry/update."""
@@ -504,12 +669,12 @@ class UnifiedPunchApp(SignalEmitter):
         dialog.setWindowTitle("Manual Punch Entry")
         layout = QFormLayout(dialog)
 
-        # 1. Day selection (based on the current week displayed in the table)
+        # 1. Day selection (based on the range displayed in the table)
         day_combo = QComboBox()
-        for i in range(self.punch_table.rowCount()): 
-            item_date = self.punch_table.item(i, 1)
-            if item_date:
-                day_combo.addItem(item_date.text())
+        day_combo.addItems(self.table_model.dates())
+        selected_date: Optional[str] = self.table_model.date_at(self.punch_table.currentIndex().row())
+        if selected_date:
+            day_combo.setCurrentText(selected_date)
         layout.addRow("Date:", day_combo)
 
         # 2. Punch type selection
@@ -537,101 +702,78 @@ class UnifiedPunchApp(SignalEmitter):
             self._save_manual_punch(selected_date, selected_type, selected_time)
 
     def _save_manual_punch(self, date_str: str, punch_type: str, time_str_hhmm: str):
-        """Registers a manual punch and refreshes the UI."""
-        try:
-            # CORREGIDO: Nombre de función
-            register_manual_punch(date_str, punch_type, time_str_hhmm)
-            
-            # Full UI refresh after successful DB operation - CORREGIDO: Nombres de métodos y señales
-            self.update_table()
-            self.update_quick_history() 
-            self._load_initial_counter_state()
-            self.update_weekly_summary()
-            self.update_button_state() 
-            self.punches_changed.emit()
-        except Exception as e:
-            QMessageBox.warning(self, "Manual Punch Error", str(e))
-            return
+        """Registers a manual punch (on the DB worker) and refreshes the UI."""
+        def on_saved(_):
+            self.table_model.set_punch(date_str, punch_type, parse_timestamp(date_str, time_str_hhmm))
+            self._on_punches_written()
 
-    def _edit_punch_from_table(self, item: QTableWidgetItem):
-        """Handles manual inline editing in the table cells."""
-        # Only process changes in punch columns (index >= 2)
-        if item is None or item.column() < 2: 
-            return 
-            
-        self.punch_table.blockSignals(True) # Prevent recursion
-        
-        item_date: Optional[QTableWidgetItem] = self.punch_table.item(item.row(), 1) 
-        if item_date is None:
-            self.punch_table.blockSignals(False)
-            return
-            
-        date_str: str = item_date.text()
-        # Map column index to punch type
-        punch_type: str = PUNCH_TYPES[item.column() - 2] 
-        hour_str: str = item.text().strip() 
+        # CORREGIDO: Nombre de función
+        self.db_worker.write(register_manual_punch, (date_str, punch_type, time_str_hhmm, self.employee_id),
+                             on_saved, lambda e: QMessageBox.warning(self, "Manual Punch Error", str(e)))
 
+    def _edit_punch_from_table(self, date_str: str, punch_type: str, hour_str: str, old_ts: Optional[int]) -> bool:
+        """
+        Handles manual inline editing of a table cell (called by the model's setData).
+        A cell holding a punch (old_ts) moves it; an empty cell adds a punch of the type
+        its position implies. The cell shows the new value at once and the write runs on
+        the DB worker; if it is rejected, the day is read again so the cell goes back to
+        the stored value. Returns False (cell unchanged) for a malformed time.
+        """
         if not hour_str:
-             # If the user deletes the text, perform a logical deletion
-             # CORREGIDO: Nombre de método
-             self._delete_punch_logical(date_str, punch_type)
-        else:
-            try:
-                # Validate HH:MM format
-                datetime.strptime(hour_str, "%H:%M") 
-                # CORREGIDO: Nombre de función
-                register_manual_punch(date_str, punch_type, hour_str)
-                
-                # Full UI refresh after successful DB operation - CORREGIDO: Nombres de métodos y señales
-                self.update_table() 
-                self.update_quick_history()
-                self._load_initial_counter_state()
-                self.update_weekly_summary()
-                self.update_button_state() 
-                self.punches_changed.emit()
-                
-            except ValueError:
-                QMessageBox.warning(self, "Invalid Format", "Time must be in HH:MM format.")
-                self.update_table() # Revert table content on error
-            except Exception as e:
-                QMessageBox.warning(self, "Update Error", str(e))
-                self.update_table() # Revert table content on error
-
-        self.punch_table.blockSignals(False)
+            # If the user deletes the text, perform a logical deletion
+            # CORREGIDO: Nombre de método
+            if old_ts is not None:
+                self._delete_punch_logical(date_str, punch_type, old_ts)
+            return True
 
-    def _delete_punch_logical(self, date_str: str, punch_type: str):
-        """Executes the DB deletion and refreshes UI components."""
         try:
-            # CORREGIDO: Usa la función del modelo delete_punch_by_date_type
-            delete_punch_by_date_type(date_str, punch_type)
-            
-            # Full UI refresh after successful DB operation - CORREGIDO: Nombres de métodos y señales
-            self.update_table()
-            self.update_quick_history()
-            self._load_initial_counter_state()
-            self.update_weekly_summary()
-            self.update_button_state() 
-            self.punches_changed.emit()
-        except Exception as e:
-            QMessageBox.critical(self, "DB Error", f"Could not delete punch: {e}")
+            # Validate HH:MM with the same parser the write uses ("9:05" is rejected here)
+            ts = parse_timestamp(date_str, hour_str)
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Format", "Time must be in HH:MM format.")
+            return False
+
+        def on_error(error: Exception):
+            QMessageBox.warning(self, "Update Error", str(error))
+            self._reload_table_day(date_str)
+
+        # Only the edited row is repainted now; the rest follows in the coalesced refresh
+        self.table_model.set_punch(date_str, punch_type, ts, old_ts)
+        # CORREGIDO: Nombre de función
+        self.db_worker.write(register_manual_punch, (date_str, punch_type, hour_str, self.employee_id, old_ts),
+                             lambda _: self._on_punches_written(), on_error)
+        return True
+
+    def _delete_punch_logical(self, date_str: str, punch_type: str, ts: int):
+        """Executes the DB deletion of one punch (on the DB worker) and refreshes UI components."""
+        def on_error(error: Exception):
+            QMessageBox.critical(self, "DB Error", f"Could not delete punch: {error}")
+            self._reload_table_day(date_str)
+
+        self.table_model.set_punch(date_str, punch_type, None, ts)
+        self.db_worker.write(delete_punch, (punch_type, ts, self.employee_id),
+                             lambda _: self._on_punches_written(), on_error)
+
+    def _reload_table_day(self, date_str: str):
+        """Reads one day again and repaints its row (reverts an optimistic edit)."""
+        self.db_worker.read(get_daily_punches, (date_str, self.employee_id),
+                            lambda punches: self.table_model.update_days({date_str: punches}))
 
     def _delete_selected_punch(self):
         """Handles the 'Delete Punch' button action based on cell selection."""
-        item: Optional[QTableWidgetItem] = self.punch_table.currentItem()
-        # Check if an item is selected and it's a punch column (index >= 2) with content
-        if not item or item.column() < 2 or not item.text(): 
+        index: QModelIndex = self.punch_table.currentIndex()
+        # Check if a cell is selected and it's a punch column (index >= 2) with content
+        punch: Optional[Tuple[str, int]] = self.table_model.punch_at(index.row(), index.column()) if index.isValid() else None
+        if punch is None: 
             QMessageBox.warning(self, "Delete Punch", "Select a valid time cell to delete.")
             return
             
-        item_date: Optional[QTableWidgetItem] = self.punch_table.item(item.row(), 1) 
-        if not item_date:
-            return
-            
-        date_str: str = item_date.text()
-        punch_type: str = PUNCH_TYPES[item.column() - 2] 
+        date_str: str = self.table_model.date_at(index.row())
+        punch_type, ts = punch
 
-        reply = QMessageBox.question(self, "Confirm Deletion", f"Confirm deletion of {punch_type} on {date_str}?",
+        reply = QMessageBox.question(self, "Confirm Deletion",
+                                     f"Confirm deletion of {punch_type} at {format_hour(ts)} on {date_str}?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             # CORREGIDO: Nombre de método
-            self._delete_punch_logical(date_str, punch_type)
\ No newline at end of file
+            self._delete_punch_logical(date_str, punch_type, ts)
\ No newline at end of file
@@ -0,0 +1,38 @@
+# gui/arranque.py
+
+# Startup timing. main.py imports this module before anything else so the clock
+# starts as close to interpreter startup as possible; stages are marked as the app
+# comes up and report() prints them when FICHATOR_STARTUP_TIMING=1 or the
+# --startup-timing flag is given.
+
+import os
+import sys
+import time
+from typing import List, Tuple
+
+_START: float = time.perf_counter()
+_marks: List[Tuple[str, float]] = []
+
+ENABLED: bool = os.environ.get("FICHATOR_STARTUP_TIMING", "") not in ("", "0") or "--startup-timing" in sys.argv
+
+
+def mark(stage: str):
+    """Records the elapsed time for a startup stage (only the first mark of each name counts)."""
+    if all(name != stage for name, _ in _marks):
+        _marks.append((stage, time.perf_counter() - _START))
+
+
+def get_marks() -> List[Tuple[str, float]]:
+    """Returns the recorded (stage, seconds since start) pairs in order."""
+    return list(_marks)
+
+
+def report():
+    """Prints the startup timing report to stderr if enabled."""
+    if not ENABLED:
+        return
+    print("Startup timing:", file=sys.stderr)
+    previous = 0.0
+    for stage, elapsed in _marks:
+        print(f"  {stage:<14} {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:.1f} ms)", file=sys.stderr)
+        previous = elapsed
@@ -0,0 +1,103 @@
+# gui/grafico.py
+
+# Imported lazily by UnifiedPunchApp (matplotlib is the slowest import of the app).
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from PySide6.QtWidgets import QSizePolicy
+from typing import List
+
+# Dark theme colors
+BACKGROUND_COLOR = "#2c3e50"
+AXES_COLOR = "#34495e"
+TEXT_COLOR = "#ecf0f1"
+GOAL_LINE_COLOR = "#1abc9c"
+GRID_COLOR = "#7f8c8d"
+GOAL_REACHED_COLOR = "#2ecc71"
+GOAL_CLOSE_COLOR = "#f1c40f"
+GOAL_MISSED_COLOR = "#e74c3c"
+NO_GOAL_COLOR = "#4e6d8a"
+
+
+def bar_color(hours: float, daily_goal: float) -> str:
+    """Color coding for a day's bar based on the daily goal."""
+    if daily_goal <= 0:
+        return NO_GOAL_COLOR # Default gray
+    pct: float = hours / daily_goal
+    if pct >= 1.0:
+        return GOAL_REACHED_COLOR # Green (Goal reached)
+    if pct >= 0.8:
+        return GOAL_CLOSE_COLOR # Yellow (Close to goal)
+    return GOAL_MISSED_COLOR # Red (Below goal)
+
+
+class WeeklyChart:
+    """
+    Persistent weekly bar chart. The figure, axes, bars, goal line, title and legend
+    are created once; update() only changes bar heights/colors, the goal line and
+    the texts in place and schedules a repaint with draw_idle(). Layout work
+    (tight_layout, tick rotation) is only redone when the set of days changes.
+    Each day has its own goal (weekday targets, holidays, summer hours), drawn as a
+    segment over its bar.
+    """
+
+    def __init__(self):
+        self.figure = Figure(facecolor=BACKGROUND_COLOR)
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.canvas.setMinimumHeight(200)
+
+        # Set subplot background color to match QGroupBox/Card background
+        self.ax = self.figure.add_subplot(111, facecolor=AXES_COLOR)
+        self.ax.set_ylabel("Hours", color=TEXT_COLOR)
+        self.ax.set_xlabel("Day", color=TEXT_COLOR)
+        self.ax.tick_params(colors=TEXT_COLOR, labelsize=9)
+        for spine in self.ax.spines.values():
+            spine.set_color(TEXT_COLOR)
+        self.ax.grid(axis='y', linestyle=':', alpha=0.4, color=GRID_COLOR)
+        self.ax.set_axisbelow(True)
+
+        self.title = self.ax.set_title("", color=TEXT_COLOR, fontsize=14, pad=15)
+        # One line for every day's goal: a segment per bar, separated by NaN
+        self.goal_line, = self.ax.plot([], [], color=GOAL_LINE_COLOR, linestyle="-.", alpha=0.9, label="Daily Goal")
+        self.legend = self.ax.legend(facecolor=AXES_COLOR, edgecolor=TEXT_COLOR, labelcolor=TEXT_COLOR, fontsize=9)
+
+        self.bars = None
+        self.day_labels: List[str] = []
+
+    def update(self, day_labels: List[str], daily_hours: List[float], daily_goals: List[float], weekly_goal: float):
+        """Updates the existing artists with a new week of data and repaints when idle."""
+        if day_labels != self.day_labels or self.bars is None:
+            # Different set of days: rebuild only the bars and the x layout
+            if self.bars is not None:
+                self.bars.remove()
+            positions = range(len(day_labels))
+            self.bars = self.ax.bar(positions, [0.0] * len(day_labels), edgecolor=TEXT_COLOR, linewidth=0.5)
+            self.ax.set_xticks(positions, day_labels)
+            self.ax.set_xlim(-0.6, len(day_labels) - 0.4)
+            self.day_labels = list(day_labels)
+            self.figure.tight_layout(pad=3.0)
+            self.figure.autofmt_xdate(rotation=45)
+
+        for bar, hours, goal in zip(self.bars, daily_hours, daily_goals):
+            bar.set_height(hours)
+            bar.set_facecolor(bar_color(hours, goal))
+
+        goal_x: List[float] = []
+        goal_y: List[float] = []
+        for i, goal in enumerate(daily_goals):
+            goal_x += [i - 0.45, i + 0.45, float("nan")]
+            goal_y += [goal, goal, float("nan")]
+        self.goal_line.set_data(goal_x, goal_y)
+        working_goals = {goal for goal in daily_goals if goal > 0}
+        self.legend.get_texts()[0].set_text(f"Daily Goal ({working_goals.pop():.1f} h)" if len(working_goals) == 1
+                                            else "Daily Goal")
+
+        total_weekly: float = sum(daily_hours)
+        pct_total: float = (total_weekly / weekly_goal) * 100 if weekly_goal > 0 else 0.0
+        span: str = f"{day_labels[0]}-{day_labels[-1]}" if day_labels else ""
+        self.title.set_text(f"Worked Hours ({span}) | Total: {total_weekly:.2f} h ({pct_total:.0f}%)")
+
+        # Keep the goal line and the tallest bar visible
+        top: float = max([0.0] + list(daily_goals) + list(daily_hours))
+        self.ax.set_ylim(0, top * 1.1 if top > 0 else 1.0)
+        self.canvas.draw_idle()
@@ -0,0 +1,260 @@
+# gui/modelo_tabla.py
+
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtGui import QFont
+
+from models.fichaje import DEFAULT_EMPLOYEE_ID, get_punches_range
+from models.logica_contador import day_intervals
+from models.tiempo import format_hour
+from gui.trabajador_db import DbWorker
+
+DAY_NAMES: List[str] = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+HEADERS: List[str] = ["Day", "Date"]
+# In/Out column pairs always shown (morning and afternoon); days with more intervals add pairs
+MIN_INTERVALS: int = 2
+# Days read from the DB per fetchMore() (one range query each)
+FETCH_CHUNK_DAYS: int = 62
+
+Punch = Tuple[str, int]
+# Signature of the inline edit handler: (date_str, punch_type, hour_str, timestamp of the
+# punch being changed or None for an empty cell) -> accepted
+EditHandler = Callable[[str, str, str, Optional[int]], bool]
+
+
+def interval_slots(punches: List[Punch]) -> List[Optional[Punch]]:
+    """A day's punches laid out as In 1, Out 1, In 2, Out 2... cells (None = empty)."""
+    return [punch for interval in day_intervals(punches) for punch in interval]
+
+
+class PunchTableModel(QAbstractTableModel):
+    """
+    Punch history for an arbitrary date range: one row per day, one In/Out column
+    pair per work interval (as many pairs as the busiest loaded day needs, at least
+    MIN_INTERVALS; the punch type is the cell's tooltip). Days are read in chunks
+    through canFetchMore()/fetchMore() as the view scrolls, and cells are formatted
+    in data() only when the view asks for them, so a year costs the same to open as
+    a week. Updates compare the new punches with the stored ones and emit
+    dataChanged just for the rows that differ.
+
+    With a DbWorker the chunks are read on the worker thread and inserted when they
+    arrive; without one they are read synchronously.
+    """
+
+    def __init__(self, employee_id: int = DEFAULT_EMPLOYEE_ID, edit_handler: Optional[EditHandler] = None,
+                 worker: Optional[DbWorker] = None, parent=None):
+        super().__init__(parent)
+        self.employee_id: int = employee_id
+        self.edit_handler: Optional[EditHandler] = edit_handler
+        self.worker: Optional[DbWorker] = worker
+        # Bumped by set_range() so chunks read for a previous range are discarded
+        self._generation: int = 0
+        self._fetching: bool = False
+
+        self.start: date = date.today()
+        self.total_days: int = 0
+        # Loaded rows: date string, that day's (type, timestamp) punches and their cells
+        self._dates: List[str] = []
+        self._punches: List[List[Punch]] = []
+        self._slots: List[List[Optional[Punch]]] = []
+        self._row_of: Dict[str, int] = {}
+        self._intervals: int = MIN_INTERVALS
+
+        self._font_day_name = QFont()
+        self._font_day_name.setBold(True)
+        self._font_data = QFont()
+        self._font_data.setPointSize(10)
+
+    # --- Range ---
+
+    def set_range(self, start: date, end: date, punches: Optional[Dict[str, List[Tuple[str, int]]]] = None):
+        """
+        Shows the days from start to end (inclusive). Already-read punches for the
+        first days of the range (e.g. the refresh snapshot) can be passed to avoid a query.
+        """
+        self.beginResetModel()
+        self._generation += 1
+        self._fetching = False
+        self.start = start
+        self.total_days = (end - start).days + 1
+        self._dates, self._punches, self._slots, self._row_of = [], [], [], {}
+        self._intervals = MIN_INTERVALS
+        if punches:
+            self._intervals = max(self._intervals, self._append_days(punches))
+        self.endResetModel()
+
+    def dates(self) -> List[str]:
+        """Dates of every day in the range ('YYYY-MM-DD'), loaded or not."""
+        return [(self.start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(self.total_days)]
+
+    def _append_days(self, punches: Dict[str, List[Punch]]) -> int:
+        """Appends loaded days; returns the most intervals any of them has."""
+        intervals = 0
+        for day_str, day_punches in punches.items():
+            if len(self._dates) >= self.total_days:
+                break
+            self._row_of[day_str] = len(self._dates)
+            self._dates.append(day_str)
+            self._punches.append(list(day_punches))
+            self._slots.append(interval_slots(day_punches))
+            intervals = max(intervals, len(self._slots[-1]) // 2)
+        return intervals
+
+    def _ensure_intervals(self, intervals: int):
+        """Adds In/Out column pairs when a loaded day has more intervals than shown."""
+        if intervals > self._intervals:
+            first = len(HEADERS) + 2 * self._intervals
+            self.beginInsertColumns(QModelIndex(), first, len(HEADERS) + 2 * intervals - 1)
+            self._intervals = intervals
+            self.endInsertColumns()
+
+    def _set_row(self, row: int, day_punches: List[Punch]):
+        self._punches[row] = day_punches
+        self._slots[row] = interval_slots(day_punches)
+        self._ensure_intervals(len(self._slots[row]) // 2)
+        self.dataChanged.emit(self.index(row, len(HEADERS)), self.index(row, self.columnCount() - 1))
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and not self._fetching and len(self._dates) < self.total_days
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):
+        loaded = len(self._dates)
+        count = min(FETCH_CHUNK_DAYS, self.total_days - loaded)
+        if parent.isValid() or count <= 0 or self._fetching:
+            return
+        first = self.start + timedelta(days=loaded)
+        last = first + timedelta(days=count - 1)
+        args = (first.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d"), self.employee_id)
+        if self.worker is None:
+            self._insert_chunk(get_punches_range(*args))
+            return
+
+        generation = self._generation
+        self._fetching = True
+
+        def on_chunk(chunk: Dict[str, List[Tuple[str, int]]]):
+            if generation == self._generation:
+                self._fetching = False
+                self._insert_chunk(chunk)
+
+        def on_error(error: Exception):
+            if generation == self._generation:
+                self._fetching = False
+
+        self.worker.read(get_punches_range, args, on_chunk, on_error)
+
+    def _insert_chunk(self, chunk: Dict[str, List[Punch]]):
+        loaded = len(self._dates)
+        self.beginInsertRows(QModelIndex(), loaded, loaded + len(chunk) - 1)
+        intervals = self._append_days(chunk)
+        self.endInsertRows()
+        self._ensure_intervals(intervals)
+
+    # --- Targeted updates ---
+
+    def update_days(self, punches: Dict[str, List[Punch]]):
+        """Replaces the punches of the given loaded days, emitting dataChanged only for rows that changed."""
+        for day_str, day_punches in punches.items():
+            row = self._row_of.get(day_str)
+            if row is None or self._punches[row] == day_punches:
+                continue
+            self._set_row(row, list(day_punches))
+
+    def set_punch(self, date_str: str, punch_type: str, ts: Optional[int], old_ts: Optional[int] = None):
+        """
+        Adds the punch at ts and/or removes the one at old_ts (same type) in a loaded day
+        and repaints its row (the cells after the change shift when intervals do).
+        """
+        row = self._row_of.get(date_str)
+        if row is None:
+            return
+        day_punches = [punch for punch in self._punches[row] if punch != (punch_type, old_ts)]
+        if ts is not None:
+            day_punches.append((punch_type, ts))
+            day_punches.sort(key=lambda punch: punch[1])
+        self._set_row(row, day_punches)
+
+    def date_at(self, row: int) -> Optional[str]:
+        return self._dates[row] if 0 <= row < len(self._dates) else None
+
+    def punch_at(self, row: int, column: int) -> Optional[Punch]:
+        """The (type, timestamp) punch shown in a cell, None if it is empty."""
+        if not 0 <= row < len(self._slots) or column < len(HEADERS):
+            return None
+        slots = self._slots[row]
+        slot = column - len(HEADERS)
+        return slots[slot] if slot < len(slots) else None
+
+    def punch_type_at(self, row: int, column: int) -> Optional[str]:
+        """Type of the punch in a cell or, for an empty cell, of a punch typed into it."""
+        if not 0 <= row < len(self._slots) or column < len(HEADERS):
+            return None
+        punch = self.punch_at(row, column)
+        if punch is not None:
+            return punch[0]
+        slots = self._slots[row]
+        slot = column - len(HEADERS)
+        if slot % 2 == 0:
+            # In: a new shift at the start or after 'Fin jornada', otherwise back from a break
+            previous = next((p for p in reversed(slots[:slot]) if p is not None), None)
+            return "Entrada" if previous is None or previous[0] == "Fin jornada" else "Salida comida"
+        # Out: a break when the day goes on after it with 'Salida comida', otherwise the end of the shift
+        following = next((p for p in slots[slot + 1:] if p is not None), None)
+        return "Ir a comer" if following is not None and following[0] == "Salida comida" else "Fin jornada"
+
+    # --- QAbstractTableModel interface ---
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._dates)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HEADERS) + 2 * self._intervals
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            if section < len(HEADERS):
+                return HEADERS[section]
+            slot = section - len(HEADERS)
+            return f"{'Out' if slot % 2 else 'In'} {slot // 2 + 1}"
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if column == 0:
+                return DAY_NAMES[(self.start + timedelta(days=row)).weekday()]
+            if column == 1:
+                return self._dates[row]
+            punch = self.punch_at(row, column)
+            return format_hour(punch[1]) if punch else "" # HH:MM format
+        if role == Qt.ItemDataRole.ToolTipRole and column >= 2:
+            punch = self.punch_at(row, column)
+            return punch[0] if punch else None
+        if role == Qt.ItemDataRole.FontRole:
+            return self._font_day_name if column == 0 else (self._font_data if column >= 2 else None)
+        if role == Qt.ItemDataRole.TextAlignmentRole and column >= 2:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        flags = super().flags(index)
+        if index.isValid() and index.column() >= 2 and self.edit_handler is not None:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index: QModelIndex, value, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        """Inline edit of a punch cell, delegated to edit_handler (which writes and refreshes)."""
+        if role != Qt.ItemDataRole.EditRole or not index.isValid() or index.column() < 2 or self.edit_handler is None:
+            return False
+        new_text: str = str(value).strip()
+        if new_text == self.data(index):
+            return False
+        row, column = index.row(), index.column()
+        punch = self.punch_at(row, column)
+        return self.edit_handler(self._dates[row], self.punch_type_at(row, column), new_text,
+                                 punch[1] if punch else None)
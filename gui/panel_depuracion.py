@@ -0,0 +1,90 @@
+# gui/panel_depuracion.py
+
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import (
+    QHBoxLayout, QHeaderView, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget
+)
+from typing import List, Tuple
+
+from db import get_connection_stats, instrumentacion
+
+# (summary key, header) of the columns shown
+COLUMNS: List[Tuple[str, str]] = [
+    ("kind", "Kind"),
+    ("name", "Name"),
+    ("recent_count", "Recent calls"),
+    ("recent_mean_ms", "Mean ms"),
+    ("recent_p95_ms", "p95 ms"),
+    ("max_ms", "Max ms"),
+    ("count", "Total calls"),
+    ("total_ms", "Total ms"),
+]
+
+
+class DebugPanel(QWidget):
+    """
+    Separate window with the rolling instrumentation summary (connect_db calls, SQL
+    statements, UI refresh methods and DB worker jobs). Only created when
+    instrumentation is enabled; it refreshes once per second while visible.
+    """
+    REFRESH_INTERVAL_MS: int = 1000
+
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.WindowType.Window)
+        self.setWindowTitle("Fichator - Instrumentation")
+        self.resize(900, 500)
+
+        layout = QVBoxLayout(self)
+        self.connections_label = QLabel("")
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([header for _, header in COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+
+        buttons = QHBoxLayout()
+        self.dump_btn = QPushButton("Dump JSON lines")
+        self.dump_btn.clicked.connect(self._dump)
+        self.dump_label = QLabel("")
+        buttons.addWidget(self.dump_btn)
+        buttons.addWidget(self.dump_label)
+        buttons.addStretch()
+
+        layout.addWidget(self.connections_label)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start(self.REFRESH_INTERVAL_MS)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+
+    def refresh(self):
+        """Reloads the table from the rolling summary."""
+        stats = get_connection_stats()
+        self.connections_label.setText(
+            f"Connections: {stats['open']} open, {stats['opens']} opened, "
+            f"{stats['requests']} connect_db() calls")
+
+        rows = instrumentacion.rolling_summary()
+        self.table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, (key, _) in enumerate(COLUMNS):
+                item = QTableWidgetItem(str(row[key]))
+                if j >= 2:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(i, j, item)
+
+    def _dump(self):
+        path = instrumentacion.dump()
+        self.dump_label.setText(f"Written to {path}")
@@ -0,0 +1,107 @@
+# gui/reloj.py
+
+# Wake-up planning for the live counter. Instead of a fixed 1 s QTimer, every timer
+# here is single-shot and re-armed for the next moment something visible changes:
+#   - tick: on the next wall-clock second while the window is visible and the counter
+#     runs, on the next minute while it is visible but idle (only the clock moves),
+#     and not at all while the window is hidden or minimized;
+#   - goal_reached: once, when the worked time reaches today's expected hours;
+#   - day_changed: once, at local midnight (re-armed at most an hour ahead, so clock
+#     changes, DST and suspend/resume are caught without polling).
+
+from typing import Optional
+
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+
+from models.logica_contador import LiveCounter, seconds_to_boundary, seconds_to_midnight
+
+# Ticks land this long after the boundary, so the counter already shows the new value
+TICK_SLACK_MS: int = 2
+# Longest single wait of the midnight timer (see the module comment)
+MAX_WAIT_MS: int = 3600 * 1000
+
+
+def _ms(seconds: float) -> int:
+    return max(int(seconds * 1000) + TICK_SLACK_MS, 0)
+
+
+class TickScheduler(QObject):
+    """Single-shot timers driving the live counter of a LiveCounter snapshot."""
+
+    tick = Signal(int)    # Resolution of the tick in seconds (1 or 60)
+    goal_reached = Signal()
+    day_changed = Signal()
+
+    def __init__(self, counter: LiveCounter, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.counter = counter
+        self.visible: bool = False
+        self.goal_seconds: int = 0  # Today's expected seconds; applied by reschedule()
+        self.wakeups: int = 0  # Timer expirations so far (benchmarks/interfaz.py reports them)
+
+        self._tick_timer = self._single_shot(Qt.TimerType.PreciseTimer, self._on_tick)
+        self._goal_timer = self._single_shot(Qt.TimerType.PreciseTimer, self._on_goal)
+        self._midnight_timer = self._single_shot(Qt.TimerType.VeryCoarseTimer, self._on_midnight)
+
+    def _single_shot(self, timer_type: Qt.TimerType, slot) -> QTimer:
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setTimerType(timer_type)
+        timer.timeout.connect(slot)
+        return timer
+
+    @property
+    def resolution(self) -> Optional[int]:
+        """Seconds between ticks right now: 1, 60, or None while the window isn't visible."""
+        if not self.visible:
+            return None
+        return 1 if self.counter.is_active else 60
+
+    def reschedule(self):
+        """Re-arms every timer; call after the counter snapshot or the goal changes."""
+        self._arm_tick()
+        self._arm_goal()
+        self._midnight_timer.start(min(_ms(seconds_to_midnight()), MAX_WAIT_MS))
+
+    def set_visible(self, visible: bool):
+        if visible != self.visible:
+            self.visible = visible
+            self._arm_tick()
+
+    def stop(self):
+        for timer in (self._tick_timer, self._goal_timer, self._midnight_timer):
+            timer.stop()
+
+    def _arm_tick(self):
+        resolution = self.resolution
+        if resolution is None:
+            self._tick_timer.stop()
+        else:
+            self._tick_timer.start(_ms(seconds_to_boundary(resolution)))
+
+    def _arm_goal(self):
+        remaining = self.counter.seconds_until_worked(self.goal_seconds)
+        if remaining:
+            self._goal_timer.start(_ms(remaining))
+        else:
+            self._goal_timer.stop()  # Already reached (the caller shows it) or not running
+
+    def _on_tick(self):
+        self.wakeups += 1
+        resolution = self.resolution
+        if resolution is not None:
+            self.tick.emit(resolution)
+        self._arm_tick()
+
+    def _on_goal(self):
+        self.wakeups += 1
+        if self.counter.seconds_until_worked(self.goal_seconds) == 0:
+            self.goal_reached.emit()
+        else:
+            self._arm_goal()  # Woken early
+
+    def _on_midnight(self):
+        self.wakeups += 1
+        if self.counter.needs_reload():
+            self.day_changed.emit()  # The reload of today's punches ends in reschedule()
+        self._midnight_timer.start(min(_ms(seconds_to_midnight()), MAX_WAIT_MS))
@@ -0,0 +1,133 @@
+# gui/trabajador_db.py
+
+import os
+import queue
+import time
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+from PySide6.QtCore import QThread, Signal
+
+from db import instrumentacion
+
+# Artificial latency added to every DB round trip of the worker (one per write and
+# one per batch of reads), to reproduce a database on a slow network share.
+DB_LATENCY_MS: int = int(os.environ.get("FICHATOR_DB_LATENCY_MS", "0") or 0)
+
+ResultCallback = Callable[[Any], None]
+ErrorCallback = Callable[[Exception], None]
+
+
+class _Request(NamedTuple):
+    is_write: bool
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    on_result: Optional[ResultCallback]
+    on_error: Optional[ErrorCallback]
+
+
+class DbWorker(QThread):
+    """
+    Runs model calls on a dedicated thread so the Qt event loop never waits on SQLite.
+
+    Requests are queued and executed in order. Writes run one at a time; consecutive
+    reads are taken from the queue together and identical calls (same function and
+    arguments) are executed only once. Results and errors are delivered on the GUI
+    thread through a queued signal to the callbacks given with each request.
+    """
+    _finished_job = Signal(object)
+
+    def __init__(self, latency_ms: int = DB_LATENCY_MS, parent=None):
+        super().__init__(parent)
+        self.latency_ms: int = latency_ms
+        self._requests: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._pending: int = 0  # Requests whose callbacks have not run yet (GUI thread only)
+        self._finished_job.connect(self._deliver)
+
+    # --- GUI thread API ---
+
+    def read(self, fn: Callable[..., Any], args: Tuple[Any, ...] = (),
+             on_result: Optional[ResultCallback] = None, on_error: Optional[ErrorCallback] = None):
+        """Queues a read-only model call; may be batched with other pending reads."""
+        self._submit(_Request(False, fn, args, on_result, on_error))
+
+    def write(self, fn: Callable[..., Any], args: Tuple[Any, ...] = (),
+              on_result: Optional[ResultCallback] = None, on_error: Optional[ErrorCallback] = None):
+        """Queues a model call that modifies the database; writes are never batched."""
+        self._submit(_Request(True, fn, args, on_result, on_error))
+
+    def is_idle(self) -> bool:
+        """True when every queued request has run and its callback has been delivered."""
+        return self._pending == 0
+
+    def stop(self):
+        """Finishes the queued requests (pending punches are not lost) and stops the thread."""
+        if self.isRunning():
+            self._requests.put(None)
+            self.wait()
+
+    def _submit(self, request: _Request):
+        self._pending += 1
+        self._requests.put(request)
+        if not self.isRunning():
+            self.start()
+
+    def _deliver(self, outcomes: List[Tuple[_Request, Any, Optional[Exception]]]):
+        for request, result, error in outcomes:
+            self._pending -= 1
+            if error is not None:
+                if request.on_error is not None:
+                    request.on_error(error)
+                else:
+                    print(f"Error in DB worker ({request.fn.__name__}): {error}")
+            elif request.on_result is not None:
+                request.on_result(result)
+
+    # --- Worker thread ---
+
+    def run(self):
+        held: Optional[_Request] = None
+        has_held: bool = False
+        while True:
+            if has_held:
+                request, has_held = held, False
+            else:
+                request = self._requests.get()
+            if request is None:
+                break
+
+            batch: List[_Request] = [request]
+            if not request.is_write:
+                # Take every read already waiting; stop at the first write to keep the order
+                while True:
+                    try:
+                        following = self._requests.get_nowait()
+                    except queue.Empty:
+                        break
+                    if following is None or following.is_write:
+                        held, has_held = following, True
+                        break
+                    batch.append(following)
+
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            self._finished_job.emit(self._execute(batch))
+
+    def _execute(self, batch: List[_Request]) -> List[Tuple[_Request, Any, Optional[Exception]]]:
+        outcomes: List[Tuple[_Request, Any, Optional[Exception]]] = []
+        results: List[Tuple[Tuple[Callable[..., Any], Tuple[Any, ...]], Any, Optional[Exception]]] = []
+        for request in batch:
+            key = (request.fn, request.args)
+            for done_key, result, error in results:
+                if done_key == key:
+                    break
+            else:
+                start = time.perf_counter()
+                try:
+                    result, error = request.fn(*request.args), None
+                except Exception as e:
+                    result, error = None, e
+                if instrumentacion.ENABLED:
+                    instrumentacion.record("worker", request.fn.__name__, time.perf_counter() - start)
+                results.append((key, result, error))
+            outcomes.append((request, result, error))
+        return outcomes
@@ -1,14 +1,19 @@
 # main.py
 
+from gui import arranque # Primero: arranca el reloj del informe de tiempos de arranque
 import sys
 # Aseguramos que QApplication esté disponible para el type hint
 from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QMessageBox 
 from PySide6.QtCore import QCoreApplication 
+from PySide6.QtGui import QKeySequence, QShortcut
 from gui.app_unificada import UnifiedPunchApp 
 from models.fichaje import init_db 
+from db import close_db, instrumentacion
 import os 
 from typing import Optional 
 
+arranque.mark("imports")
+
 # CORRECCIÓN: El tipo de 'app' es QApplication, ya que setStyleSheet NO está en QCoreApplication.
 def load_stylesheet(app: QApplication, path: str) -> bool:
     """
@@ -45,11 +50,29 @@ class FichajeApp(QWidget):
         self.setLayout(layout)
 
         self.app_unificada = UnifiedPunchApp()
+        self.app_unificada.fully_loaded.connect(self._on_fully_loaded)
         layout.addWidget(self.app_unificada)
+
+        # Panel de instrumentación (solo con FICHATOR_PROFILE=1 o --profile); F12 lo muestra u oculta
+        self.debug_panel = None
+        if instrumentacion.ENABLED:
+            from gui.panel_depuracion import DebugPanel
+            self.debug_panel = DebugPanel()
+            QShortcut(QKeySequence("F12"), self, self.debug_panel.toggle)
+            self.debug_panel.show()
+        arranque.mark("constructed")
         
         self.resize(1000, 700)
         self.showMaximized() 
 
+    def paintEvent(self, event):
+        arranque.mark("first paint")
+        super().paintEvent(event)
+
+    def _on_fully_loaded(self):
+        arranque.mark("fully loaded")
+        arranque.report()
+
 
 if __name__ == "__main__":
     
@@ -89,5 +112,11 @@ if __name__ == "__main__":
         print("ADVERTENCIA: No se pudo encontrar ningún archivo QSS. Verifique que 'estilos.qss' o 'styles.qss' esté en la carpeta 'gui' o en la raíz.", file=sys.stderr)
 
     main_window = FichajeApp()
+    # Termina los fichajes pendientes del hilo de base de datos antes de cerrar la conexión
+    app.aboutToQuit.connect(main_window.app_unificada.shutdown)
+    # Cierra la conexión persistente de SQLite (y hace checkpoint del WAL) al salir
+    app.aboutToQuit.connect(close_db)
+    # Con instrumentación activa, vuelca los eventos a FICHATOR_PROFILE_FILE (JSON lines)
+    app.aboutToQuit.connect(instrumentacion.dump)
     
     sys.exit(app.exec())
\ No newline at end of file
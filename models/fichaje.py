@@ -1,161 +1,544 @@
 from datetime import datetime, timedelta, date, time # CORREGIDO: Añadido date, time para tipado (Error 12)
 from db import connect_db # CORREGIDO: 'conectar' -> 'connect_db' (Error 11)
+from db.migrations import migrate
+from models.logica_contador import FINISHED, OFF, ON_BREAK, WORKING, evaluate_day
+from models.tiempo import SECONDS_PER_DAY, day_start, format_date, format_hour, now_timestamp, parse_timestamp
 import sqlite3
-from typing import List, Tuple, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional, Union
 
 # --- CENTRALIZED CONSTANTS --- 
 PUNCH_TYPES = ["Entrada", "Ir a comer", "Salida comida", "Fin jornada"]
+# Employee used by the desktop app and by databases created before multi-employee support
+DEFAULT_EMPLOYEE_ID = 1
+# ---------------------------------
+
+# --- SQL USED BY THE MODEL (also checked by explain_queries) ---
+# Punches live in fichajes_ts as integer timestamps (see models/tiempo.py); a day is
+# the half-open range [day_start, day_start + 86400) so every lookup is an index range
+# on (employee_id, ts, tipo). Punches within the same second keep their insertion order (id).
+SQL_INSERT_PUNCH = "INSERT INTO fichajes_ts (employee_id, ts, tipo) VALUES (?, ?, ?)"
+SQL_PUNCHES_BETWEEN = "SELECT tipo, ts FROM fichajes_ts WHERE employee_id=? AND ts >= ? AND ts < ? ORDER BY ts, id"
+SQL_DELETE_PUNCH = ("DELETE FROM fichajes_ts WHERE id = (SELECT id FROM fichajes_ts "
+                    "WHERE employee_id=? AND ts >= ? AND ts < ? AND tipo=? ORDER BY ts DESC LIMIT 1)")
+SQL_DELETE_PUNCH_AT = "DELETE FROM fichajes_ts WHERE employee_id=? AND ts=? AND tipo=?"
+SQL_ALL_PUNCHES = "SELECT employee_id, tipo, ts FROM fichajes_ts ORDER BY employee_id, ts, id"
+SQL_ENSURE_EMPLOYEE = "INSERT OR IGNORE INTO employees (id, name) VALUES (?, ?)"
+SQL_EMPLOYEES = "SELECT id, name FROM employees ORDER BY id"
+# daily_totals is keyed by (employee_id, day number = ts // 86400)
+SQL_UPSERT_DAILY_TOTAL = ("INSERT OR REPLACE INTO daily_totals (employee_id, dia, worked_seconds, break_seconds, "
+                          "complete) VALUES (?, ?, ?, ?, ?)")
+SQL_DELETE_DAILY_TOTAL = "DELETE FROM daily_totals WHERE employee_id=? AND dia=?"
+# Punches but no totals: daily_totals was just created by the migrations (checked at startup)
+SQL_TOTALS_MISSING = "SELECT EXISTS (SELECT 1 FROM fichajes_ts) AND NOT EXISTS (SELECT 1 FROM daily_totals)"
+SQL_DAILY_TOTALS_BETWEEN = ("SELECT dia, worked_seconds, break_seconds, complete FROM daily_totals "
+                            "WHERE employee_id=? AND dia BETWEEN ? AND ?")
+SQL_SUM_WORKED_BETWEEN = ("SELECT COALESCE(SUM(worked_seconds), 0) FROM daily_totals "
+                          "WHERE employee_id=? AND dia BETWEEN ? AND ?")
+SQL_DAY_WORKED = "SELECT worked_seconds FROM daily_totals WHERE employee_id=? AND dia=?"
+SQL_FIRST_TOTAL_DAY = "SELECT MIN(dia) FROM daily_totals WHERE employee_id=?"
+# balance_ledger holds one row per day from the employee's first punch on: the running
+# sum of (worked - expected) seconds, expected coming from models.horario's calendar.
+# Mutations shift the rows from their day onwards and extend it through today; init_db
+# extends every ledger at startup. Bulk writes and schedule changes truncate it. Reads
+# never write: days it does not reach yet are summed from daily_totals and the calendar.
+SQL_LEDGER_FIRST = "SELECT MIN(dia) FROM balance_ledger WHERE employee_id=?"
+SQL_LEDGER_LAST = "SELECT dia, balance FROM balance_ledger WHERE employee_id=? ORDER BY dia DESC LIMIT 1"
+SQL_INSERT_LEDGER = "INSERT INTO balance_ledger (employee_id, dia, balance) VALUES (?, ?, ?)"
+SQL_SHIFT_LEDGER = "UPDATE balance_ledger SET balance = balance + ? WHERE employee_id=? AND dia >= ?"
+SQL_TRUNCATE_LEDGER = "DELETE FROM balance_ledger WHERE employee_id=? AND dia >= ?"
+SQL_TRUNCATE_ALL_LEDGERS = "DELETE FROM balance_ledger WHERE dia >= ?"
+# (last ledger day, running balance at the range end, running balance before the range start)
+SQL_LEDGERS_BEHIND = ("SELECT DISTINCT employee_id FROM daily_totals t WHERE dia <= ?1 AND NOT EXISTS "
+                      "(SELECT 1 FROM balance_ledger l WHERE l.employee_id = t.employee_id AND l.dia >= ?1)")
+SQL_LEDGER_RANGE = ("SELECT (SELECT MAX(dia) FROM balance_ledger WHERE employee_id=?1), "
+                    "(SELECT balance FROM balance_ledger WHERE employee_id=?1 AND dia <= ?3 ORDER BY dia DESC LIMIT 1), "
+                    "(SELECT balance FROM balance_ledger WHERE employee_id=?1 AND dia < ?2 ORDER BY dia DESC LIMIT 1)")
+# ---------------------------------
+
+# --- PER-DAY PUNCH CACHE (get_daily_punches) ---
+# LRU of (employee_id, dia) -> punches. The mutation functions below invalidate the
+# day they touch; a change of PRAGMA data_version (another connection or process
+# committed) or of connection clears it all.
+DAY_CACHE_SIZE = 512
+_day_cache: "OrderedDict[Tuple[int, int], Tuple[Tuple[str, int], ...]]" = OrderedDict()
+_day_cache_lock = threading.Lock()
+_day_cache_epoch = 0 # Bumped by every invalidation: a read started before it is not stored
+_day_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "clears": 0}
+_data_version = threading.local() # Last (connection, data_version) seen by each thread
 # ---------------------------------
 
 def init_db():
-    """Crea la tabla de fichajes si no existe."""
+    """
+    Crea la tabla de fichajes si no existe y aplica las migraciones pendientes. Las
+    migraciones crean daily_totals vacía (v4): si hay fichajes sin totales se rellena
+    aquí con las reglas actuales de evaluate_day. Después extiende hasta hoy los
+    saldos acumulados (balance_ledger) que se hayan quedado atrás.
+    """
     try:
-        with connect_db() as conn: # Usar connect_db
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS fichajes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    fecha TEXT NOT NULL,
-                    tipo TEXT NOT NULL,
-                    hora TEXT NOT NULL
-                )
-            """)
-            conn.commit()
+        conn = connect_db()
+        migrate(conn)
+        if conn.execute(SQL_TOTALS_MISSING).fetchone()[0]:
+            rebuild_daily_totals()
+        today_dia = now_timestamp() // SECONDS_PER_DAY
+        behind = [employee_id for employee_id, in conn.execute(SQL_LEDGERS_BEHIND, (today_dia,))]
+        if behind:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for employee_id in behind:
+                    _extend_ledger(conn, employee_id, today_dia)
     except sqlite3.Error as e:
         raise RuntimeError(f"Error al inicializar la base de datos: {e}")
 
-def register_punch(punch_type: str):
-    """Registra un fichaje con la hora actual, aplicando la lógica de flujo estricta."""
-    now = datetime.now()
-    date_str = now.strftime("%Y-%m-%d")
-    hour_str = now.strftime("%H:%M:%S")
-    
-    existing_punches = {t for t, _ in get_daily_punches(date_str)}
+def explain_queries() -> int:
+    """
+    Prints EXPLAIN QUERY PLAN for every model query and returns how many of them
+    still contain a full table scan (0 means all lookups are served by an index).
+    """
+    start = day_start(datetime.now().strftime("%Y-%m-%d"))
+    end = start + SECONDS_PER_DAY
+    dia = start // SECONDS_PER_DAY
+    emp = DEFAULT_EMPLOYEE_ID
+    queries = [
+        (SQL_PUNCHES_BETWEEN, (emp, start - 7 * SECONDS_PER_DAY, end)),
+        (SQL_DELETE_PUNCH, (emp, start, end, PUNCH_TYPES[0])),
+        (SQL_DELETE_PUNCH_AT, (emp, start, PUNCH_TYPES[0])),
+        (SQL_DAILY_TOTALS_BETWEEN, (emp, dia - 6, dia)),
+        (SQL_SUM_WORKED_BETWEEN, (emp, dia - 365, dia)),
+        (SQL_SHIFT_LEDGER, (0, emp, dia)),
+        (SQL_LEDGER_RANGE, (emp, dia - 365, dia)),
+    ]
+    from models.horario import SQL_CALENDAR_SUM  # models.horario imports this module
+    queries.append((SQL_CALENDAR_SUM, (emp, dia, dia + 365)))
+    scans = 0
+    conn = connect_db()
+    for sql, params in queries:
+        print(sql)
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        for row in plan:
+            detail: str = row[-1]
+            print(f"    {detail}")
+            if detail.startswith("SCAN") and "USING" not in detail and detail != "SCAN CONSTANT ROW":
+                scans += 1
+    print(f"Full table scans: {scans}")
+    return scans
 
-    # --- Lógica de Flujo Estricta (Mantenida) ---
+def validate_punch_flow(state: int, punch_type: str) -> int:
+    """
+    Applies the strict daily flow rules to the next punch of a day whose punches left
+    it in state (evaluate_day(...).state): raises an Exception with the reason if
+    punch_type cannot follow, otherwise returns the new state. A day may hold any
+    number of breaks and, after 'Fin jornada', another shift starting with 'Entrada'.
+    """
     if punch_type == "Entrada":
-        if "Entrada" in existing_punches:
+        if state == WORKING:
             raise Exception("Ya existe una Entrada registrada.")
-        if existing_punches:
-            raise Exception("Debe ser el primer fichaje del día.")
-    
+        if state == ON_BREAK:
+            raise Exception("Debe fichar Salida comida primero.")
+        return WORKING
+
     elif punch_type == "Ir a comer":
-        if "Entrada" not in existing_punches:
+        if state in (OFF, FINISHED):
             raise Exception("Debe fichar Entrada primero.")
-        if "Ir a comer" in existing_punches:
+        if state == ON_BREAK:
             raise Exception("Ya ha fichado Ir a comer.")
-        if "Salida comida" in existing_punches:
-            raise Exception("Ya ha terminado su descanso.")
-        if "Fin jornada" in existing_punches:
-            raise Exception("La jornada ya ha terminado.")
+        return ON_BREAK
 
     elif punch_type == "Salida comida":
-        if "Ir a comer" not in existing_punches:
+        if state != ON_BREAK:
             raise Exception("Debe fichar Ir a comer primero.")
-        if "Salida comida" in existing_punches:
-            raise Exception("Ya ha fichado Salida comida.")
-        if "Fin jornada" in existing_punches:
-            raise Exception("La jornada ya ha terminado.")
-            
+        return WORKING
+
     elif punch_type == "Fin jornada":
-        if "Entrada" not in existing_punches:
+        if state in (OFF, FINISHED):
             raise Exception("Debe fichar Entrada primero.")
-        if "Fin jornada" in existing_punches:
-            raise Exception("La jornada ya ha finalizado.")
-        if "Ir a comer" in existing_punches and "Salida comida" not in existing_punches:
-             raise Exception("Debe fichar Salida comida antes de finalizar la jornada.")
+        if state == ON_BREAK:
+            raise Exception("Debe fichar Salida comida antes de finalizar la jornada.")
+        return FINISHED
+
+    else:
+        raise Exception(f"Tipo de fichaje desconocido: {punch_type}")
+
+def _check_data_version(conn: sqlite3.Connection):
+    """Clears the day cache if the database changed outside this connection since it last looked."""
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if getattr(_data_version, "conn", None) is not conn or _data_version.version != version:
+        _data_version.conn, _data_version.version = conn, version
+        clear_day_cache()
+
+def _invalidate_day(employee_id: int, ts: int):
+    """Drops the cached punches of the day containing ts (called after every mutation)."""
+    global _day_cache_epoch
+    with _day_cache_lock:
+        _day_cache_epoch += 1
+        _day_cache.pop((employee_id, ts // SECONDS_PER_DAY), None)
+
+def clear_day_cache():
+    """Empties the per-day punch cache (e.g. after bulk writes on this connection)."""
+    global _day_cache_epoch
+    with _day_cache_lock:
+        _day_cache_epoch += 1
+        _day_cache.clear()
+        _day_cache_stats["clears"] += 1
+
+def get_day_cache_stats() -> Dict[str, int]:
+    """Returns the cache counters ('hits', 'misses', 'clears') and its current 'size'."""
+    with _day_cache_lock:
+        stats = dict(_day_cache_stats)
+        stats["size"] = len(_day_cache)
+    return stats
+
+def _insert_punch(cursor: sqlite3.Cursor, employee_id: int, ts: int, punch_type: str,
+                  day_punches: List[Tuple[str, int]]):
+    """
+    Inserts the punch and stores the day's new total, inside the caller's BEGIN IMMEDIATE
+    transaction; day_punches are the punches the day already had. The same punch
+    stored twice (same type and second) violates the unique index (migration v9).
+    """
+    try:
+        cursor.execute(SQL_ENSURE_EMPLOYEE, (employee_id, f"Empleado {employee_id}"))
+        cursor.execute(SQL_INSERT_PUNCH, (employee_id, ts, punch_type))
+    except sqlite3.IntegrityError:
+        raise Exception(f"Ya existe un fichaje de tipo '{punch_type}' para la fecha {format_date(ts)} "
+                        f"a las {format_hour(ts, with_seconds=True)}.")
+    _store_daily_total(cursor, employee_id, ts // SECONDS_PER_DAY,
+                       daily_total_row(employee_id, sorted(day_punches + [(punch_type, ts)], key=lambda punch: punch[1])))
 
-    # --- DB Registration ---
+def register_punch(punch_type: str, employee_id: int = DEFAULT_EMPLOYEE_ID):
+    """
+    Registra un fichaje con la hora actual, aplicando la lógica de flujo estricta.
+    Reading the day, validating and inserting happen in one BEGIN IMMEDIATE transaction,
+    so two windows or processes punching at once cannot both pass the validation.
+    """
+    ts = now_timestamp()
+    start = ts - ts % SECONDS_PER_DAY
     try:
         with connect_db() as conn: # Usar connect_db
             cursor = conn.cursor()
-            cursor.execute("INSERT INTO fichajes (fecha, tipo, hora) VALUES (?, ?, ?)", 
-                           (date_str, punch_type, hour_str))
-            conn.commit()
+            cursor.execute("BEGIN IMMEDIATE")
+            day_punches = cursor.execute(SQL_PUNCHES_BETWEEN, (employee_id, start, start + SECONDS_PER_DAY)).fetchall()
+            validate_punch_flow(evaluate_day(day_punches).state, punch_type)
+            _insert_punch(cursor, employee_id, ts, punch_type, day_punches)
     except sqlite3.Error as e:
         raise Exception(f"Error al registrar fichaje en DB: {e}")
+    finally:
+        _invalidate_day(employee_id, ts)
+
+def register_punch_batch(punches: List[Tuple[int, str]]) -> List[Union[int, Exception]]:
+    """
+    Registers several (employee_id, type) punches with the current time in a single
+    BEGIN IMMEDIATE transaction (group commit, used by the punch server). Each one is
+    validated like register_punch against its day as stored plus the earlier punches
+    of the batch. Returns, in order, each punch's timestamp or the Exception that
+    rejected it; a database error rejects the whole batch (raised).
+    """
+    ts = now_timestamp()
+    start = ts - ts % SECONDS_PER_DAY
+    results: List[Union[int, Exception]] = []
+    days: Dict[int, List[Tuple[str, int]]] = {}
+    states: Dict[int, int] = {}
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            for employee_id, punch_type in punches:
+                day_punches = days.get(employee_id)
+                if day_punches is None:
+                    day_punches = days[employee_id] = cursor.execute(
+                        SQL_PUNCHES_BETWEEN, (employee_id, start, start + SECONDS_PER_DAY)).fetchall()
+                    states[employee_id] = evaluate_day(day_punches).state
+                try:
+                    state = validate_punch_flow(states[employee_id], punch_type)
+                    _insert_punch(cursor, employee_id, ts, punch_type, day_punches)
+                except sqlite3.Error:
+                    raise
+                except Exception as e:
+                    results.append(e)
+                    continue
+                day_punches.append((punch_type, ts))
+                states[employee_id] = state
+                results.append(ts)
+    except sqlite3.Error as e:
+        raise Exception(f"Error al registrar fichajes en DB: {e}")
+    finally:
+        for employee_id in days:
+            _invalidate_day(employee_id, ts)
+    return results
 
-def get_daily_punches(date_str: str) -> List[Tuple[str, str]]:
-    """Retrieves all punches for a specific date (type, hour)."""
-    punches = []
+def get_daily_punches(date_str: str, employee_id: int = DEFAULT_EMPLOYEE_ID) -> List[Tuple[str, int]]:
+    """Retrieves all punches for a specific date as (type, timestamp), sorted by time (LRU cached)."""
+    start = day_start(date_str)
+    key = (employee_id, start // SECONDS_PER_DAY)
     try:
         with connect_db() as conn: # Usar connect_db
+            _check_data_version(conn)
+            with _day_cache_lock:
+                cached = _day_cache.get(key)
+                if cached is not None:
+                    _day_cache.move_to_end(key)
+                    _day_cache_stats["hits"] += 1
+                    return list(cached)
+                _day_cache_stats["misses"] += 1
+                epoch = _day_cache_epoch
+
             cursor = conn.cursor()
-            cursor.execute("SELECT tipo, hora FROM fichajes WHERE fecha=? ORDER BY hora", (date_str,))
+            cursor.execute(SQL_PUNCHES_BETWEEN, (employee_id, start, start + SECONDS_PER_DAY))
             punches = cursor.fetchall()
     except sqlite3.Error:
         return []
+
+    with _day_cache_lock:
+        if epoch == _day_cache_epoch: # Not invalidated while reading
+            _day_cache[key] = tuple(punches)
+            if len(_day_cache) > DAY_CACHE_SIZE:
+                _day_cache.popitem(last=False)
     return punches
 
-def register_manual_punch(date_str: str, punch_type: str, hour_str: str):
-    """Registers a manual punch for a specific date and time, without flow logic."""
+def get_punches_range(start_date: str, end_date: str,
+                      employee_id: int = DEFAULT_EMPLOYEE_ID) -> Dict[str, List[Tuple[str, int]]]:
+    """
+    Retrieves all punches between two dates (inclusive, 'YYYY-MM-DD') in a single query.
+    Returns a dict keyed by date in chronological order, with an entry (possibly empty)
+    for every day of the span, each holding that day's (type, timestamp) tuples sorted by time.
+    """
+    start: date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end: date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    days: List[List[Tuple[str, int]]] = [[] for _ in range((end - start).days + 1)]
+    first_ts = day_start(start_date)
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_PUNCHES_BETWEEN, (employee_id, first_ts, first_ts + len(days) * SECONDS_PER_DAY))
+            for tipo, ts in cursor:
+                days[(ts - first_ts) // SECONDS_PER_DAY].append((tipo, ts))
+    except sqlite3.Error:
+        pass
+    return {(start + timedelta(days=i)).strftime("%Y-%m-%d"): day for i, day in enumerate(days)}
+
+def register_manual_punch(date_str: str, punch_type: str, hour_str: str, employee_id: int = DEFAULT_EMPLOYEE_ID,
+                          replaces: Optional[int] = None):
+    """
+    Registers a manual punch for a specific date and time ('HH:MM[:SS]'), without flow logic.
+    With replaces (the timestamp of a punch of the same type that day) that punch is
+    moved instead: deleted and re-inserted at the new time in the same transaction.
+    """
+    ts = parse_timestamp(date_str, hour_str)
+    start = day_start(date_str)
     try:
         with connect_db() as conn: # Usar connect_db
             cursor = conn.cursor()
-            if len(hour_str) == 5:
-                hour_str += ":00"
-                
-            cursor.execute("SELECT id FROM fichajes WHERE fecha=? AND tipo=?", (date_str, punch_type))
-            if cursor.fetchone():
-                raise Exception(f"Ya existe un fichaje de tipo '{punch_type}' para la fecha {date_str}. Elimínelo primero.")
-
-            cursor.execute("INSERT INTO fichajes (fecha, tipo, hora) VALUES (?, ?, ?)", 
-                           (date_str, punch_type, hour_str))
-            conn.commit()
+            cursor.execute("BEGIN IMMEDIATE")
+            if replaces is not None:
+                cursor.execute(SQL_DELETE_PUNCH_AT, (employee_id, replaces, punch_type))
+            day_punches = cursor.execute(SQL_PUNCHES_BETWEEN, (employee_id, start, start + SECONDS_PER_DAY)).fetchall()
+            _insert_punch(cursor, employee_id, ts, punch_type, day_punches)
     except sqlite3.Error as e:
         raise Exception(f"Error al registrar fichaje manual: {e}")
+    finally:
+        _invalidate_day(employee_id, ts)
 
-def calculate_worked_hours(fichajes: List[Tuple[str, str]]) -> timedelta:
-    """Calculates the total worked time based on a list of punches."""
+def calculate_worked_hours(fichajes: List[Tuple[str, int]]) -> timedelta:
+    """Calculates the total worked time (closed work intervals) based on a list of punches."""
     if not fichajes:
         return timedelta()
-        
-    try:
-        fecha_base: date = datetime.strptime(fichajes[0][0], "%Y-%m-%d").date()
-    except ValueError:
-        fecha_base: date = datetime.now().date()
-
-    tiempos = {}
-    
-    for tipo, hora_str in fichajes:
-        try:
-            # Uso explícito de 'time' (Pylance fix)
-            hora_dt: time = datetime.strptime(hora_str, "%H:%M:%S").time() 
-            tiempos[tipo] = datetime.combine(fecha_base, hora_dt) 
-        except ValueError:
-            try:
-                # Uso explícito de 'time' (Pylance fix)
-                hora_dt: time = datetime.strptime(hora_str[:5], "%H:%M").time() 
-                tiempos[tipo] = datetime.combine(fecha_base, hora_dt) 
-            except ValueError:
-                continue
-
-    hours = timedelta()
-
-    # Total Worked Hours Calculation
-    if "Entrada" in tiempos and "Fin jornada" in tiempos:
-        
-        total_jornada = tiempos["Fin jornada"] - tiempos["Entrada"]
-        tiempo_comida = timedelta()
-        
-        if "Ir a comer" in tiempos and "Salida comida" in tiempos:
-            if tiempos["Salida comida"] > tiempos["Ir a comer"]:
-                tiempo_comida = tiempos["Salida comida"] - tiempos["Ir a comer"]
-        
-        hours = total_jornada - tiempo_comida
-    
-    if hours.total_seconds() < 0:
-        return timedelta()
-
-    return hours
+    return timedelta(seconds=evaluate_day(fichajes).worked_seconds)
     
-def delete_punch_by_date_type(date_str: str, punch_type: str):
-    """Deletes a specific punch by date and type."""
+def delete_punch_by_date_type(date_str: str, punch_type: str, employee_id: int = DEFAULT_EMPLOYEE_ID):
+    """Deletes a specific punch by date and type (the latest one if repeated)."""
+    start = day_start(date_str)
     try:
         with connect_db() as conn: # Usar connect_db
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM fichajes WHERE fecha=? AND tipo=? ORDER BY hora DESC LIMIT 1", 
-                           (date_str, punch_type))
+            cursor.execute(SQL_DELETE_PUNCH, (employee_id, start, start + SECONDS_PER_DAY, punch_type))
+            _update_daily_total(cursor, employee_id, start)
             conn.commit()
     except sqlite3.Error as e:
-        raise Exception(f"Error al eliminar fichaje de DB: {e}")
\ No newline at end of file
+        raise Exception(f"Error al eliminar fichaje de DB: {e}")
+    finally:
+        _invalidate_day(employee_id, start)
+
+def delete_punch(punch_type: str, ts: int, employee_id: int = DEFAULT_EMPLOYEE_ID):
+    """Deletes one specific punch, identified by its type and timestamp (days may repeat types)."""
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_DELETE_PUNCH_AT, (employee_id, ts, punch_type))
+            _update_daily_total(cursor, employee_id, ts)
+            conn.commit()
+    except sqlite3.Error as e:
+        raise Exception(f"Error al eliminar fichaje de DB: {e}")
+    finally:
+        _invalidate_day(employee_id, ts)
+
+# --- EMPLOYEES ---
+
+def ensure_employee(employee_id: int, name: Optional[str] = None):
+    """Creates the employee if it does not exist yet."""
+    try:
+        with connect_db() as conn:
+            conn.execute(SQL_ENSURE_EMPLOYEE, (employee_id, name or f"Empleado {employee_id}"))
+    except sqlite3.Error as e:
+        raise Exception(f"Error al registrar el empleado {employee_id}: {e}")
+
+def get_employees() -> List[Tuple[int, str]]:
+    """Returns every employee as (id, name)."""
+    try:
+        return connect_db().execute(SQL_EMPLOYEES).fetchall()
+    except sqlite3.Error:
+        return []
+
+# --- DAILY TOTALS AGGREGATE ---
+
+def _update_daily_total(cursor: sqlite3.Cursor, employee_id: int, ts: int):
+    """Re-evaluates the day containing ts and stores it in daily_totals (same transaction as the mutation)."""
+    first_ts = ts - ts % SECONDS_PER_DAY
+    punches = cursor.execute(SQL_PUNCHES_BETWEEN, (employee_id, first_ts, first_ts + SECONDS_PER_DAY)).fetchall()
+    _store_daily_total(cursor, employee_id, first_ts // SECONDS_PER_DAY,
+                       daily_total_row(employee_id, punches) if punches else None)
+
+def _store_daily_total(cursor: sqlite3.Cursor, employee_id: int, dia: int,
+                       row: Optional[Tuple[int, int, int, int, int]]):
+    """
+    Writes (or deletes, row None) a day's total, shifts the balance ledger by the change
+    in worked time and extends the ledger through today.
+    """
+    old = cursor.execute(SQL_DAY_WORKED, (employee_id, dia)).fetchone()
+    if row is None:
+        cursor.execute(SQL_DELETE_DAILY_TOTAL, (employee_id, dia))
+    else:
+        cursor.execute(SQL_UPSERT_DAILY_TOTAL, row)
+
+    if old is None or row is None:
+        # A day appearing before the ledger start, or its first day disappearing, moves the start: rebuild
+        first = cursor.execute(SQL_LEDGER_FIRST, (employee_id,)).fetchone()[0]
+        if first is not None and (dia < first or (row is None and dia == first)):
+            cursor.execute(SQL_TRUNCATE_LEDGER, (employee_id, first))
+    delta = (row[2] if row else 0) - (old[0] if old else 0)
+    if delta:
+        cursor.execute(SQL_SHIFT_LEDGER, (delta, employee_id, dia))
+    _extend_ledger(cursor.connection, employee_id, now_timestamp() // SECONDS_PER_DAY)
+
+def daily_total_row(employee_id: int, punches: List[Tuple[str, int]]) -> Tuple[int, int, int, int, int]:
+    """daily_totals row (employee_id, dia, worked, break, complete) for one non-empty day of punches."""
+    evaluation = evaluate_day(punches)
+    return (employee_id, punches[0][1] // SECONDS_PER_DAY, evaluation.worked_seconds,
+            evaluation.break_seconds, int(evaluation.is_complete))
+
+def fill_daily_totals(conn: sqlite3.Connection) -> int:
+    """
+    Recomputes daily_totals from every punch (one pass, one executemany) inside the
+    caller's transaction. Returns the number of (employee, day) rows stored.
+    """
+    rows = []
+    day_punches: List[Tuple[str, int]] = []
+    current_key: Optional[Tuple[int, int]] = None
+    for employee_id, tipo, ts in conn.execute(SQL_ALL_PUNCHES):
+        key = (employee_id, ts // SECONDS_PER_DAY)
+        if key != current_key and day_punches:
+            rows.append(daily_total_row(current_key[0], day_punches))
+            day_punches = []
+        current_key = key
+        day_punches.append((tipo, ts))
+    if day_punches:
+        rows.append(daily_total_row(current_key[0], day_punches))
+
+    conn.execute("DELETE FROM daily_totals")
+    conn.executemany(SQL_UPSERT_DAILY_TOTAL, rows)
+    conn.execute("DELETE FROM balance_ledger")  # Extended again from the new totals by init_db
+    return len(rows)
+
+def rebuild_daily_totals() -> int:
+    """Rebuilds daily_totals for an existing database (e.g. after external edits)."""
+    try:
+        with connect_db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return fill_daily_totals(conn)
+    except sqlite3.Error as e:
+        raise Exception(f"Error al reconstruir los totales diarios: {e}")
+
+def get_daily_totals(start_date: str, end_date: str,
+                     employee_id: int = DEFAULT_EMPLOYEE_ID) -> Dict[str, Tuple[int, int, bool]]:
+    """
+    Returns (worked_seconds, break_seconds, complete) per day between two dates
+    (inclusive) from the daily_totals aggregate, with zeros for days without punches.
+    """
+    start: date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    first_dia = day_start(start_date) // SECONDS_PER_DAY
+    last_dia = day_start(end_date) // SECONDS_PER_DAY
+    totals: List[Tuple[int, int, bool]] = [(0, 0, False)] * (last_dia - first_dia + 1)
+    try:
+        for dia, worked, on_break, complete in connect_db().execute(SQL_DAILY_TOTALS_BETWEEN,
+                                                                   (employee_id, first_dia, last_dia)):
+            totals[dia - first_dia] = (worked, on_break, bool(complete))
+    except sqlite3.Error:
+        pass
+    return {(start + timedelta(days=i)).strftime("%Y-%m-%d"): total for i, total in enumerate(totals)}
+
+def get_total_worked_seconds(start_date: str, end_date: str, employee_id: int = DEFAULT_EMPLOYEE_ID) -> int:
+    """Total worked seconds between two dates (inclusive) with a single aggregate query."""
+    try:
+        row = connect_db().execute(SQL_SUM_WORKED_BETWEEN, (employee_id,
+                                                            day_start(start_date) // SECONDS_PER_DAY,
+                                                            day_start(end_date) // SECONDS_PER_DAY)).fetchone()
+    except sqlite3.Error:
+        return 0
+    return row[0]
+
+# --- OVERTIME BALANCE LEDGER ---
+
+def _extend_ledger(conn: sqlite3.Connection, employee_id: int, through_dia: int):
+    """Appends the ledger rows missing up to through_dia (from the first punch day if empty)."""
+    last = conn.execute(SQL_LEDGER_LAST, (employee_id,)).fetchone()
+    if last is not None:
+        first_dia, balance = last[0] + 1, last[1]
+    else:
+        first_dia, balance = conn.execute(SQL_FIRST_TOTAL_DAY, (employee_id,)).fetchone()[0], 0
+        if first_dia is None:
+            return
+    if first_dia > through_dia:
+        return
+
+    from models.horario import expected_days  # models.horario imports this module
+
+    worked = {dia: seconds for dia, seconds, _, _ in conn.execute(SQL_DAILY_TOTALS_BETWEEN,
+                                                                 (employee_id, first_dia, through_dia))}
+    rows = []
+    for dia, expected in enumerate(expected_days(conn, employee_id, first_dia, through_dia), first_dia):
+        balance += worked.get(dia, 0) - expected
+        rows.append((employee_id, dia, balance))
+    conn.executemany(SQL_INSERT_LEDGER, rows)
+
+def _ledger_tail(conn: sqlite3.Connection, employee_id: int, first_dia: int, last_dia: int) -> int:
+    """Worked minus expected seconds of days the ledger does not reach yet (two SQL sums, no writes)."""
+    if first_dia > last_dia:
+        return 0
+    from models.horario import expected_total
+    worked = conn.execute(SQL_SUM_WORKED_BETWEEN, (employee_id, first_dia, last_dia)).fetchone()[0]
+    return worked - expected_total(conn, employee_id, first_dia, last_dia)
+
+def get_balance(start_date: Optional[str], end_date: str, employee_id: int = DEFAULT_EMPLOYEE_ID) -> int:
+    """
+    Overtime (positive) or deficit (negative) in seconds between two dates inclusive,
+    from the first punch day when start_date is None: worked minus expected time.
+    Two rows of balance_ledger; days after its last row (none once a day has a write
+    or after startup) are summed from daily_totals and the calendar. Read-only:
+    sqlite3 errors propagate to the caller.
+    """
+    end_dia = day_start(end_date) // SECONDS_PER_DAY
+    start_dia = day_start(start_date) // SECONDS_PER_DAY if start_date else end_dia - 10 ** 6
+    today_dia = now_timestamp() // SECONDS_PER_DAY
+    through_dia = min(end_dia, today_dia)
+    conn = connect_db()
+    last_dia, at_end, before_start = conn.execute(SQL_LEDGER_RANGE, (employee_id, start_dia, through_dia)).fetchone()
+    if last_dia is None:
+        first_dia = conn.execute(SQL_FIRST_TOTAL_DAY, (employee_id,)).fetchone()[0]
+        if first_dia is None:
+            return 0 # No punches yet
+        last_dia = first_dia - 1 # Ledger truncated: everything is tail
+    balance = ((at_end or 0) + _ledger_tail(conn, employee_id, last_dia + 1, through_dia)
+               - (before_start or 0) - _ledger_tail(conn, employee_id, last_dia + 1, min(start_dia - 1, through_dia)))
+    if end_dia > today_dia:
+        from models.horario import expected_total
+        balance -= expected_total(conn, employee_id, max(today_dia + 1, start_dia), end_dia)
+    return balance
@@ -0,0 +1,262 @@
+# models/horario.py
+
+# Work schedule: expected seconds per weekday (with an optional reduced summer
+# timetable), company holidays and per-employee vacation days. The rules are turned
+# into the expected_calendar table one whole year per employee at a time, the first
+# time any day of that year is asked for, so summaries, the chart and the balance
+# ledger read precomputed expectations instead of evaluating rules on every refresh.
+# Changing a rule drops the calendar years it affects and truncates balance_ledger
+# from the first affected day (both are rebuilt on the next query).
+
+import sqlite3
+from datetime import date, datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from db import connect_db
+from models.fichaje import DEFAULT_EMPLOYEE_ID, SQL_TRUNCATE_ALL_LEDGERS, SQL_TRUNCATE_LEDGER
+from models.tiempo import SECONDS_PER_DAY, date_from_day_number, day_number, day_start
+
+# Weekday 0 is Monday; migration v8 seeds 7.5 h Monday to Friday
+WEEKDAY_NAMES: List[str] = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# --- SQL ---
+SQL_WEEKDAYS = "SELECT weekday, seconds, summer_seconds FROM schedule_weekdays ORDER BY weekday"
+SQL_SET_WEEKDAY = "INSERT OR REPLACE INTO schedule_weekdays (weekday, seconds, summer_seconds) VALUES (?, ?, ?)"
+SQL_SETTING = "SELECT value FROM schedule_settings WHERE key=?"
+SQL_SET_SETTING = "INSERT OR REPLACE INTO schedule_settings (key, value) VALUES (?, ?)"
+SQL_DELETE_SETTING = "DELETE FROM schedule_settings WHERE key=?"
+SQL_HOLIDAYS_BETWEEN = "SELECT dia, name FROM holidays WHERE dia BETWEEN ? AND ? ORDER BY dia"
+SQL_ADD_HOLIDAY = "INSERT OR REPLACE INTO holidays (dia, name) VALUES (?, ?)"
+SQL_REMOVE_HOLIDAY = "DELETE FROM holidays WHERE dia=?"
+SQL_VACATIONS_BETWEEN = "SELECT dia FROM vacations WHERE employee_id=? AND dia BETWEEN ? AND ? ORDER BY dia"
+SQL_ADD_VACATION = "INSERT OR IGNORE INTO vacations (employee_id, dia) VALUES (?, ?)"
+SQL_REMOVE_VACATION = "DELETE FROM vacations WHERE employee_id=? AND dia BETWEEN ? AND ?"
+SQL_CALENDAR_BETWEEN = ("SELECT dia, expected_seconds FROM expected_calendar "
+                        "WHERE employee_id=? AND dia BETWEEN ? AND ? ORDER BY dia")
+SQL_CALENDAR_SUM = ("SELECT COUNT(*), COALESCE(SUM(expected_seconds), 0) FROM expected_calendar "
+                    "WHERE employee_id=? AND dia BETWEEN ? AND ?")
+SQL_INSERT_CALENDAR = "INSERT OR REPLACE INTO expected_calendar (employee_id, dia, expected_seconds) VALUES (?, ?, ?)"
+SQL_DROP_CALENDAR_YEAR = "DELETE FROM expected_calendar WHERE dia BETWEEN ? AND ?"
+SQL_DROP_EMPLOYEE_CALENDAR_YEAR = "DELETE FROM expected_calendar WHERE employee_id=? AND dia BETWEEN ? AND ?"
+SQL_DROP_CALENDAR = "DELETE FROM expected_calendar"
+# ---------------------------------
+
+
+class ScheduleRules(NamedTuple):
+    """The rules that apply to one employee and year (holidays and vacations as day numbers)."""
+    weekday_seconds: List[int]
+    summer_seconds: List[Optional[int]]       # Per weekday; None keeps the normal target in summer
+    summer: Optional[Tuple[str, str]]         # ('MM-DD', 'MM-DD') inclusive, or None
+    holidays: Set[int]
+    vacations: Set[int]
+
+
+def _year_span(year: int) -> Tuple[int, int]:
+    """First and last day number of a year."""
+    return day_number(date(year, 1, 1)), day_number(date(year, 12, 31))
+
+
+def _load_rules(conn: sqlite3.Connection, employee_id: int, year: int) -> ScheduleRules:
+    first, last = _year_span(year)
+    weekday_seconds, summer_seconds = [0] * 7, [None] * 7
+    for weekday, seconds, summer in conn.execute(SQL_WEEKDAYS):
+        weekday_seconds[weekday], summer_seconds[weekday] = seconds, summer
+    summer_start = conn.execute(SQL_SETTING, ("summer_start",)).fetchone()
+    summer_end = conn.execute(SQL_SETTING, ("summer_end",)).fetchone()
+    return ScheduleRules(
+        weekday_seconds, summer_seconds,
+        (summer_start[0], summer_end[0]) if summer_start and summer_end else None,
+        {dia for dia, _ in conn.execute(SQL_HOLIDAYS_BETWEEN, (first, last))},
+        {dia for dia, in conn.execute(SQL_VACATIONS_BETWEEN, (employee_id, first, last))},
+    )
+
+
+def expected_for(rules: ScheduleRules, dia: int) -> int:
+    """Expected seconds of one day under the rules (holidays and vacations expect nothing)."""
+    if dia in rules.holidays or dia in rules.vacations:
+        return 0
+    weekday = (dia + 3) % 7  # Day 0 (1970-01-01) was a Thursday
+    summer_seconds = rules.summer_seconds[weekday]
+    if rules.summer and summer_seconds is not None:
+        month_day = date_from_day_number(dia).strftime("%m-%d")
+        start, end = rules.summer
+        in_summer = start <= month_day <= end if start <= end else (month_day >= start or month_day <= end)
+        if in_summer:
+            return summer_seconds
+    return rules.weekday_seconds[weekday]
+
+
+def _materialize_year(conn: sqlite3.Connection, employee_id: int, year: int):
+    """Writes the expected_calendar rows of a whole year for an employee."""
+    rules = _load_rules(conn, employee_id, year)
+    first, last = _year_span(year)
+    conn.executemany(SQL_INSERT_CALENDAR, [(employee_id, dia, expected_for(rules, dia))
+                                           for dia in range(first, last + 1)])
+
+
+def _materialize_missing(conn: sqlite3.Connection, employee_id: int, first_dia: int, last_dia: int,
+                         present: Set[int]):
+    """
+    Materializes every year of [first_dia, last_dia] with a day not in present (in the
+    caller's transaction if one is open, otherwise in one of its own).
+    """
+    years = sorted({date_from_day_number(dia).year for dia in range(first_dia, last_dia + 1) if dia not in present})
+    if conn.in_transaction:
+        for year in years:
+            _materialize_year(conn, employee_id, year)
+    else:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for year in years:
+                _materialize_year(conn, employee_id, year)
+
+
+def expected_days(conn: sqlite3.Connection, employee_id: int, first_dia: int, last_dia: int) -> List[int]:
+    """Expected seconds of every day from first_dia to last_dia (inclusive), from expected_calendar."""
+    rows = conn.execute(SQL_CALENDAR_BETWEEN, (employee_id, first_dia, last_dia)).fetchall()
+    if len(rows) == last_dia - first_dia + 1:
+        return [seconds for _, seconds in rows]
+    _materialize_missing(conn, employee_id, first_dia, last_dia, {dia for dia, _ in rows})
+    return [seconds for _, seconds in conn.execute(SQL_CALENDAR_BETWEEN, (employee_id, first_dia, last_dia))]
+
+
+def expected_total(conn: sqlite3.Connection, employee_id: int, first_dia: int, last_dia: int) -> int:
+    """Sum of the expected seconds from first_dia to last_dia (inclusive), summed by SQLite."""
+    days, total = conn.execute(SQL_CALENDAR_SUM, (employee_id, first_dia, last_dia)).fetchone()
+    if days == last_dia - first_dia + 1:
+        return total
+    present = {dia for dia, _ in conn.execute(SQL_CALENDAR_BETWEEN, (employee_id, first_dia, last_dia))}
+    _materialize_missing(conn, employee_id, first_dia, last_dia, present)
+    return conn.execute(SQL_CALENDAR_SUM, (employee_id, first_dia, last_dia)).fetchone()[1]
+
+
+def get_expected_seconds(start_date: str, end_date: str, employee_id: int = DEFAULT_EMPLOYEE_ID) -> Dict[str, int]:
+    """Expected seconds per day between two dates (inclusive, 'YYYY-MM-DD') from the calendar."""
+    first_dia = day_start(start_date) // SECONDS_PER_DAY
+    last_dia = day_start(end_date) // SECONDS_PER_DAY
+    try:
+        seconds = expected_days(connect_db(), employee_id, first_dia, last_dia)
+    except sqlite3.Error:
+        return {}
+    return {date_from_day_number(first_dia + i).strftime("%Y-%m-%d"): value for i, value in enumerate(seconds)}
+
+
+# --- RULE CHANGES ---
+
+def _parse_dia(date_str: str) -> int:
+    return day_start(date_str) // SECONDS_PER_DAY
+
+
+def _changed(conn: sqlite3.Connection, dia: int, employee_id: Optional[int] = None):
+    """Drops the calendar year containing dia (one employee or all) and the balances from dia on."""
+    first, last = _year_span(date_from_day_number(dia).year)
+    if employee_id is None:
+        conn.execute(SQL_DROP_CALENDAR_YEAR, (first, last))
+        conn.execute(SQL_TRUNCATE_ALL_LEDGERS, (dia,))
+    else:
+        conn.execute(SQL_DROP_EMPLOYEE_CALENDAR_YEAR, (employee_id, first, last))
+        conn.execute(SQL_TRUNCATE_LEDGER, (employee_id, dia))
+
+
+def _all_changed(conn: sqlite3.Connection):
+    """Weekday or summer rules apply to every year: drop the whole calendar and every balance."""
+    conn.execute(SQL_DROP_CALENDAR)
+    conn.execute(SQL_TRUNCATE_ALL_LEDGERS, (-10 ** 9,))
+
+
+def set_weekday_target(weekday: int, seconds: int, summer_seconds: Optional[int] = None):
+    """Sets the expected seconds of a weekday (0 = Monday) and, optionally, its summer timetable."""
+    if not 0 <= weekday < 7 or seconds < 0 or (summer_seconds is not None and summer_seconds < 0):
+        raise ValueError(f"Objetivo no válido: día {weekday}, {seconds} s")
+    try:
+        with connect_db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(SQL_SET_WEEKDAY, (weekday, seconds, summer_seconds))
+            _all_changed(conn)
+    except sqlite3.Error as e:
+        raise Exception(f"Error al guardar el horario: {e}")
+
+
+def set_summer_period(start_mmdd: Optional[str], end_mmdd: Optional[str] = None):
+    """Sets the reduced summer timetable period ('MM-DD' to 'MM-DD', inclusive); None removes it."""
+    if start_mmdd is not None:
+        for value in (start_mmdd, end_mmdd):
+            try:
+                datetime.strptime(f"2000-{value}", "%Y-%m-%d")  # Leap year: 02-29 is valid
+            except (TypeError, ValueError):
+                raise ValueError(f"Fecha de verano no válida (MM-DD): {value}")
+    try:
+        with connect_db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if start_mmdd is None:
+                conn.execute(SQL_DELETE_SETTING, ("summer_start",))
+                conn.execute(SQL_DELETE_SETTING, ("summer_end",))
+            else:
+                conn.execute(SQL_SET_SETTING, ("summer_start", start_mmdd))
+                conn.execute(SQL_SET_SETTING, ("summer_end", end_mmdd))
+            _all_changed(conn)
+    except sqlite3.Error as e:
+        raise Exception(f"Error al guardar el horario de verano: {e}")
+
+
+def add_holiday(date_str: str, name: str = ""):
+    """Marks a date as a holiday for everybody (no expected work)."""
+    dia = _parse_dia(date_str)
+    try:
+        with connect_db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(SQL_ADD_HOLIDAY, (dia, name or "Festivo"))
+            _changed(conn, dia)
+    except sqlite3.Error as e:
+        raise Exception(f"Error al añadir el festivo: {e}")
+
+
+def remove_holiday(date_str: str):
+    """Removes a holiday."""
+    dia = _parse_dia(date_str)
+    try:
+        with connect_db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(SQL_REMOVE_HOLIDAY, (dia,))
+            _changed(conn, dia)
+    except sqlite3.Error as e:
+        raise Exception(f"Error al eliminar el festivo: {e}")
+
+
+def _year_starts(first: int, last: int) -> List[int]:
+    """First day number of every year touched by [first, last], starting with first itself."""
+    return [first] + [_year_span(year)[0] for year in range(date_from_day_number(first).year + 1,
+                                                              date_from_day_number(last).year + 1)]
+
+
+def set_vacation(start_date: str, end_date: str, employee_id: int = DEFAULT_EMPLOYEE_ID, on_vacation: bool = True):
+    """Adds (or removes, on_vacation False) the vacation days of an employee between two dates inclusive."""
+    first, last = _parse_dia(start_date), _parse_dia(end_date)
+    if last < first:
+        raise ValueError("La fecha final es anterior a la inicial.")
+    try:
+        with connect_db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if on_vacation:
+                conn.executemany(SQL_ADD_VACATION, [(employee_id, dia) for dia in range(first, last + 1)])
+            else:
+                conn.execute(SQL_REMOVE_VACATION, (employee_id, first, last))
+            for dia in _year_starts(first, last):
+                _changed(conn, dia, employee_id)
+    except sqlite3.Error as e:
+        raise Exception(f"Error al guardar las vacaciones: {e}")
+
+
+def get_schedule(year: int, employee_id: int = DEFAULT_EMPLOYEE_ID) -> Dict[str, object]:
+    """Current rules for display: weekday targets, summer period, the year's holidays and vacation dates."""
+    try:
+        rules = _load_rules(connect_db(), employee_id, year)
+        names = dict(connect_db().execute(SQL_HOLIDAYS_BETWEEN, _year_span(year)).fetchall())
+    except sqlite3.Error:
+        return {}
+    return {
+        "weekdays": {WEEKDAY_NAMES[i]: (rules.weekday_seconds[i], rules.summer_seconds[i]) for i in range(7)},
+        "summer": rules.summer,
+        "holidays": [(date_from_day_number(dia).strftime("%Y-%m-%d"), names[dia]) for dia in sorted(rules.holidays)],
+        "vacations": [date_from_day_number(dia).strftime("%Y-%m-%d") for dia in sorted(rules.vacations)],
+    }
@@ -0,0 +1,165 @@
+# models/importador.py
+
+import csv
+import sqlite3
+import sys
+from itertools import groupby
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+from db import connect_db
+from models.fichaje import (
+    SQL_ENSURE_EMPLOYEE, SQL_INSERT_PUNCH, SQL_PUNCHES_BETWEEN, SQL_TRUNCATE_LEDGER,
+    SQL_UPSERT_DAILY_TOTAL, clear_day_cache, daily_total_row, validate_punch_flow
+)
+from models.logica_contador import evaluate_day
+from models.tiempo import SECONDS_PER_DAY, day_start, parse_hour_seconds
+
+# Rows written per transaction (whole employee/days are never split across batches)
+IMPORT_BATCH_SIZE: int = 50_000
+# Columns expected in the badge terminal CSV dumps (header row, any order)
+CSV_COLUMNS: Tuple[str, ...] = ("employee_id", "fecha", "hora", "tipo")
+
+
+class ImportResult(NamedTuple):
+    """Summary of a bulk import."""
+    read: int
+    imported: int
+    rejected: List[Tuple[int, str]]  # (CSV line number, reason)
+
+
+def _read_terminal_csv(path: str, rejected: List[Tuple[int, str]]) -> List[Tuple[int, int, int, str]]:
+    """Parses the CSV into (employee_id, ts, line, tipo) rows, recording unparseable lines."""
+    rows: List[Tuple[int, int, int, str]] = []
+    day_starts: Dict[str, int] = {}  # strptime only once per distinct date
+    hour_seconds: Dict[str, int] = {}  # terminals repeat the same hours a lot
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = [column.strip().lower() for column in next(reader, [])]
+        missing = [column for column in CSV_COLUMNS if column not in header]
+        if missing:
+            raise Exception(f"Faltan columnas en el CSV: {', '.join(missing)}")
+        emp_col, date_col, hour_col, type_col = (header.index(column) for column in CSV_COLUMNS)
+
+        for line, record in enumerate(reader, start=2):
+            try:
+                date_str = record[date_col].strip()
+                start = day_starts.get(date_str)
+                if start is None:
+                    start = day_starts[date_str] = day_start(date_str)
+                hour_str = record[hour_col].strip()
+                seconds = hour_seconds.get(hour_str)
+                if seconds is None:
+                    seconds = parse_hour_seconds(hour_str)
+                    if seconds is None:
+                        raise ValueError(f"hora no válida '{hour_str}'")
+                    hour_seconds[hour_str] = seconds
+                rows.append((int(record[emp_col]), start + seconds, line, record[type_col].strip()))
+            except (ValueError, IndexError) as e:
+                rejected.append((line, f"Fila no válida: {e}"))
+    return rows
+
+
+def _existing_punches(conn: sqlite3.Connection, rows: List[Tuple[int, int, int, str]]) -> Dict[Tuple[int, int], List[Tuple[str, int]]]:
+    """Punches already stored for the employees and span being imported, keyed by (employee_id, dia)."""
+    existing: Dict[Tuple[int, int], List[Tuple[str, int]]] = {}
+    for employee_id, employee_rows in groupby(rows, key=lambda row: row[0]):
+        employee_rows = list(employee_rows)
+        first_ts = employee_rows[0][1] - employee_rows[0][1] % SECONDS_PER_DAY
+        last_ts = employee_rows[-1][1] - employee_rows[-1][1] % SECONDS_PER_DAY + SECONDS_PER_DAY
+        for tipo, ts in conn.execute(SQL_PUNCHES_BETWEEN, (employee_id, first_ts, last_ts)):
+            existing.setdefault((employee_id, ts // SECONDS_PER_DAY), []).append((tipo, ts))
+    return existing
+
+
+def _write_batch(conn: sqlite3.Connection, employees: Set[int], punches: List[Tuple[int, int, str]],
+                 totals: List[Tuple[int, int, int, int, int]]):
+    """Writes one batch of punches and their daily totals in a single transaction."""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(SQL_ENSURE_EMPLOYEE, [(emp, f"Empleado {emp}") for emp in employees])
+        conn.executemany(SQL_INSERT_PUNCH, punches)
+        conn.executemany(SQL_UPSERT_DAILY_TOTAL, totals)
+        # The balance ledger is extended again from each employee's first imported day by the
+        # employee's next punch or at startup (get_balance sums the missing days meanwhile)
+        first_days: Dict[int, int] = {}
+        for employee_id, dia, *_ in totals:
+            first_days[employee_id] = min(dia, first_days.get(employee_id, dia))
+        conn.executemany(SQL_TRUNCATE_LEDGER, first_days.items())
+
+
+def import_terminal_csv(path: str, batch_size: int = IMPORT_BATCH_SIZE) -> ImportResult:
+    """
+    Bulk-imports a badge terminal CSV dump (columns employee_id, fecha, hora, tipo).
+
+    Rows are sorted per employee and day and validated with the same flow rules as
+    register_punch, continuing from the state the punches already stored left the day
+    in; rejected rows (including punches already stored, so a dump can be imported
+    again) are reported with their line number instead of aborting the import. Accepted
+    punches and the refreshed daily_totals are written with executemany in batched
+    transactions, so a day is either fully imported or not at all.
+    """
+    rejected: List[Tuple[int, str]] = []
+    rows = _read_terminal_csv(path, rejected)
+    read = len(rows) + len(rejected)
+    rows.sort()
+
+    conn = connect_db()
+    imported = 0
+    try:
+        existing = _existing_punches(conn, rows)
+
+        employees: Set[int] = set()
+        punches: List[Tuple[int, int, str]] = []
+        totals: List[Tuple[int, int, int, int, int]] = []
+        for (employee_id, dia), day_rows in groupby(rows, key=lambda row: (row[0], row[1] // SECONDS_PER_DAY)):
+            day_punches = list(existing.get((employee_id, dia), []))
+            registered = set(day_punches)
+            state = evaluate_day(day_punches).state
+            accepted = 0
+            for _, ts, line, tipo in day_rows:
+                if (tipo, ts) in registered:
+                    rejected.append((line, f"Empleado {employee_id}: fichaje ya registrado"))
+                    continue
+                try:
+                    state = validate_punch_flow(state, tipo)
+                except Exception as e:
+                    rejected.append((line, f"Empleado {employee_id}: {e}"))
+                    continue
+                registered.add((tipo, ts))
+                day_punches.append((tipo, ts))
+                punches.append((employee_id, ts, tipo))
+                accepted += 1
+            if not accepted:
+                continue
+            employees.add(employee_id)
+            totals.append(daily_total_row(employee_id, day_punches))
+
+            if len(punches) >= batch_size:
+                _write_batch(conn, employees, punches, totals)
+                imported += len(punches)
+                employees, punches, totals = set(), [], []
+
+        if punches:
+            _write_batch(conn, employees, punches, totals)
+            imported += len(punches)
+    except sqlite3.Error as e:
+        raise Exception(f"Error al importar fichajes ({imported} ya importados): {e}")
+    finally:
+        if imported:
+            clear_day_cache() # Same connection: data_version does not see these writes
+
+    rejected.sort()
+    return ImportResult(read, imported, rejected)
+
+
+if __name__ == "__main__":
+    # python -m models.importador volcado.csv [volcado2.csv ...]
+    from models.fichaje import init_db
+
+    init_db()
+    for csv_path in sys.argv[1:]:
+        result = import_terminal_csv(csv_path)
+        print(f"{csv_path}: {result.imported} de {result.read} fichajes importados, "
+              f"{len(result.rejected)} rechazados")
+        for line, reason in result.rejected[:20]:
+            print(f"    línea {line}: {reason}")
@@ -1,104 +1,190 @@
 # models/logica_contador.py
 
 from datetime import datetime, timedelta, date, time # CORREGIDO: Añadido date, time para tipado (Errores 13, 14)
-from typing import List, Tuple, Optional
+from operator import itemgetter
+from time import monotonic
+from typing import Dict, List, NamedTuple, Tuple, Optional
 
-def calculate_accumulated_time_and_state(punches: List[Tuple[str, str]]) -> Tuple[float, bool, Optional[datetime]]:
+from models.tiempo import now_timestamp, to_datetime, to_timestamp
+
+# --- DAY EVALUATION ENGINE ---
+# A day is an ordered list of work intervals: each one opened by 'Entrada' or
+# 'Salida comida' and closed by 'Ir a comer' (a break follows) or 'Fin jornada'
+# (the shift ends; a later 'Entrada' starts another one, e.g. a split shift).
+WORK_STARTS: Tuple[str, ...] = ("Entrada", "Salida comida")
+WORK_ENDS: Tuple[str, ...] = ("Ir a comer", "Fin jornada")
+
+# States of the single-pass state machine
+OFF, WORKING, ON_BREAK, FINISHED = range(4)
+
+# Compiled transition table: (state, punch type) -> new state. Punches that are not
+# a valid transition from the current state (duplicates, out-of-order types) are ignored.
+# models.informes applies the same table to whole ranges as arrays.
+TRANSITIONS = {
+    (OFF, "Entrada"): WORKING,
+    (WORKING, "Ir a comer"): ON_BREAK,
+    (WORKING, "Fin jornada"): FINISHED,
+    (ON_BREAK, "Salida comida"): WORKING,
+    (ON_BREAK, "Fin jornada"): FINISHED,
+    (FINISHED, "Entrada"): WORKING,  # Next shift of the day; the gap is neither work nor break
+}
+
+# (punch that opens a work interval, punch that closes it); None when that side is missing
+Interval = Tuple[Optional[Tuple[str, int]], Optional[Tuple[str, int]]]
+
+
+class DayEvaluation(NamedTuple):
+    """Result of evaluating one day of punches (times as integer timestamps)."""
+    worked_seconds: int
+    break_seconds: int
+    is_active: bool
+    start_ts: Optional[int]
+    is_complete: bool  # The day's last shift ended with 'Fin jornada'
+    state: int         # OFF, WORKING, ON_BREAK or FINISHED after the last punch
+
+
+def evaluate_day(punches: List[Tuple[str, int]], now_ts: Optional[int] = None) -> DayEvaluation:
+    """
+    Evaluates a day's (type, timestamp) punches in one linear pass over them sorted by time,
+    whatever the number of intervals.
+
+    Work runs from 'Entrada'/'Salida comida' to the next 'Ir a comer'/'Fin jornada';
+    a break runs from 'Ir a comer' to the next 'Salida comida' (or 'Fin jornada').
+    If the day is still in a work interval and now_ts is given, the open
+    interval is counted up to that moment.
+    """
+    # Stable and linear for the (usual) already-sorted input: punches within the same
+    # second keep their stored order
+    timeline = sorted(punches, key=itemgetter(1))
+
+    state = OFF
+    worked = 0
+    on_break = 0
+    mark = 0  # Start of the current work or break interval
+    for tipo, ts in timeline:
+        new_state = TRANSITIONS.get((state, tipo))
+        if new_state is None:
+            continue
+        if state == WORKING:
+            worked += ts - mark
+        elif state == ON_BREAK:
+            on_break += ts - mark
+        state = new_state
+        mark = ts
+
+    is_active = state == WORKING
+    if is_active and now_ts is not None and now_ts > mark:
+        worked += now_ts - mark
+    return DayEvaluation(worked, on_break, is_active, mark if is_active else None, state == FINISHED, state)
+
+
+def day_intervals(punches: List[Tuple[str, int]]) -> List[Interval]:
+    """
+    Pairs a day's punches (sorted by time) into its work intervals in one pass, for
+    display: each opening punch with the closing punch that follows it. A closing
+    punch without an opening one, or the other way round, gets None on the missing side.
+    """
+    intervals: List[Interval] = []
+    opened: Optional[Tuple[str, int]] = None
+    for punch in punches:
+        if punch[0] in WORK_STARTS:
+            if opened is not None:
+                intervals.append((opened, None))
+            opened = punch
+        elif punch[0] in WORK_ENDS:
+            intervals.append((opened, punch))
+            opened = None
+    if opened is not None:
+        intervals.append((opened, None))
+    return intervals
+
+
+def evaluate_days(punches_by_day: Dict[str, List[Tuple[str, int]]]) -> Dict[str, DayEvaluation]:
+    """Batch version of evaluate_day for reports (closed intervals only)."""
+    return {day: evaluate_day(punches) for day, punches in punches_by_day.items()}
+# ---------------------------------
+
+
+def calculate_accumulated_time_and_state(punches: List[Tuple[str, int]]) -> Tuple[float, bool, Optional[datetime]]:
     """
     Calcula el tiempo acumulado de trabajo y determina si el contador debe estar activo.
 
     Args:
-        punches (list): Lista de tuplas (tipo, hora_str) del día actual.
+        punches (list): Lista de tuplas (tipo, timestamp) del día actual.
 
     Returns:
         tuple: (total_segundos_acumulados, esta_activo, hora_inicio_actividad_dt)
     """
-    
-    # Convierte los fichajes de string a objetos datetime
-    fichajes_dt = []
-    for tipo, hora_str in punches:
-        try:
-            # Uso explícito de 'date' y 'time' (Pylance fix)
-            today: date = datetime.now().date()
-            hora: time = datetime.strptime(hora_str, "%H:%M:%S").time()
-            dt = datetime.combine(today, hora)
-            fichajes_dt.append((tipo, dt))
-        except ValueError:
-            try:
-                # Uso explícito de 'date' y 'time' (Pylance fix)
-                today: date = datetime.now().date()
-                hora: time = datetime.strptime(hora_str[:5], "%H:%M").time()
-                dt = datetime.combine(today, hora)
-                fichajes_dt.append((tipo, dt))
-            except ValueError:
-                continue
-
-    fichajes_dt.sort(key=lambda x: x[1])
-    
-    total_segundos_acumulados = 0
-    esta_activo = False
-    hora_inicio_actividad_dt = None
-
-    i = 0
-    while i < len(fichajes_dt):
-        tipo_actual, dt_actual = fichajes_dt[i]
-
-        # 1. Entrada
-        if tipo_actual == "Entrada":
-            j = i + 1
-            while j < len(fichajes_dt) and fichajes_dt[j][0] not in ["Ir a comer", "Fin jornada"]:
-                j += 1
-                
-            if j < len(fichajes_dt):
-                tipo_siguiente, dt_siguiente = fichajes_dt[j]
-                total_segundos_acumulados += (dt_siguiente - dt_actual).total_seconds()
-                esta_activo = False
-                i = j
-            else:
-                esta_activo = True
-                hora_inicio_actividad_dt = dt_actual
-                i = len(fichajes_dt)
-                break 
-
-        # 2. Ir a comer
-        elif tipo_actual == "Ir a comer":
-            j = i + 1
-            while j < len(fichajes_dt) and fichajes_dt[j][0] != "Salida comida":
-                j += 1
-                
-            if j < len(fichajes_dt):
-                tipo_siguiente, dt_siguiente = fichajes_dt[j]
-                esta_activo = False
-                i = j
-            else:
-                esta_activo = False
-                i = len(fichajes_dt)
-                break 
-
-        # 3. Salida comida
-        elif tipo_actual == "Salida comida":
-            j = i + 1
-            while j < len(fichajes_dt) and fichajes_dt[j][0] != "Fin jornada":
-                j += 1
-                
-            if j < len(fichajes_dt):
-                tipo_siguiente, dt_siguiente = fichajes_dt[j]
-                total_segundos_acumulados += (dt_siguiente - dt_actual).total_seconds()
-                esta_activo = False
-                i = len(fichajes_dt)
-                break 
-            else:
-                esta_activo = True
-                hora_inicio_actividad_dt = dt_actual
-                i = len(fichajes_dt)
-                break
-                
-        i += 1
-        
-    # Si el contador está activo, calcular el tiempo hasta ahora
-    if esta_activo and hora_inicio_actividad_dt:
-        tiempo_actual = datetime.now()
-        tiempo_desde_inicio = (tiempo_actual - hora_inicio_actividad_dt).total_seconds()
-        total_segundos_acumulados += tiempo_desde_inicio
+    evaluation = evaluate_day(punches, now_timestamp())
+
+    hora_inicio_actividad_dt: Optional[datetime] = None
+    if evaluation.is_active and evaluation.start_ts is not None:
+        hora_inicio_actividad_dt = to_datetime(evaluation.start_ts)
         
-    return total_segundos_acumulados, esta_activo, hora_inicio_actividad_dt
\ No newline at end of file
+    return evaluation.worked_seconds, evaluation.is_active, hora_inicio_actividad_dt
+
+
+class LiveCounter:
+    """
+    In-memory snapshot of today's counter state. It is computed once from the day's
+    punches (on load or after a punch changes) and afterwards advanced with a
+    monotonic clock, so the per-second tick never touches the database and is
+    immune to wall-clock adjustments.
+    """
+
+    def __init__(self):
+        self.day: Optional[date] = None
+        self.base_seconds: float = 0.0
+        self.is_active: bool = False
+        self.state: int = OFF  # State of the day after the last valid punch
+        self.start_time: Optional[datetime] = None
+        self._monotonic_ref: float = 0.0
+
+    def load(self, punches: List[Tuple[str, int]]):
+        """Rebuilds the snapshot from today's punches."""
+        now = datetime.now()
+        evaluation = evaluate_day(punches, to_timestamp(now))
+        self.day = now.date()
+        self.base_seconds = evaluation.worked_seconds
+        self.is_active = evaluation.is_active
+        self.state = evaluation.state
+        self.start_time = to_datetime(evaluation.start_ts) if evaluation.start_ts is not None else None
+        # base_seconds counts up to the start of the current wall-clock second: moving the
+        # reference back by the fraction already elapsed makes the counter turn over
+        # exactly on wall-clock second boundaries, where the ticks are aligned
+        self._monotonic_ref = monotonic() - now.microsecond / 1_000_000
+
+    def elapsed_seconds(self) -> float:
+        """Worked seconds now: the snapshot plus the monotonic time elapsed while active."""
+        if self.is_active:
+            return self.base_seconds + (monotonic() - self._monotonic_ref)
+        return self.base_seconds
+
+    def needs_reload(self) -> bool:
+        """True once the calendar day differs from the snapshot's (midnight rollover)."""
+        return self.day != datetime.now().date()
+
+    def seconds_until_worked(self, target_seconds: float) -> Optional[float]:
+        """
+        Seconds until the counter reaches target_seconds (0 if it already has), or None
+        when it never will with the current snapshot (no target, or not working).
+        """
+        elapsed = self.elapsed_seconds()
+        if target_seconds <= 0 or elapsed >= target_seconds:
+            return 0.0 if target_seconds > 0 else None
+        return target_seconds - elapsed if self.is_active else None
+
+
+def seconds_to_boundary(resolution: int, now: Optional[datetime] = None) -> float:
+    """
+    Seconds until the next wall-clock multiple of resolution seconds (1 = the next
+    second, 60 = the next minute; any divisor of 60).
+    """
+    now = now or datetime.now()
+    return resolution - (now.second % resolution + now.microsecond / 1_000_000)
+
+
+def seconds_to_midnight(now: Optional[datetime] = None) -> float:
+    """Wall-clock seconds until the next local midnight."""
+    now = now or datetime.now()
+    return (datetime.combine(now.date() + timedelta(days=1), time.min) - now).total_seconds()
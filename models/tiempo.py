@@ -0,0 +1,79 @@
+# models/tiempo.py
+
+import re
+from datetime import date, datetime
+from typing import Optional
+
+# Punch timestamps are stored as integer "local epoch" seconds: the local wall-clock
+# date and time counted from 1970-01-01 00:00 as if it were UTC. No timezone or DST
+# conversion is involved, so ts // 86400 is the local day and ts % 86400 the local
+# time of day, and SQLite's date(ts, 'unixepoch') / time(ts, 'unixepoch') give back
+# the original fecha / hora strings.
+SECONDS_PER_DAY: int = 86400
+_EPOCH_ORDINAL: int = date(1970, 1, 1).toordinal()
+# 'HH:MM' or 'HH:MM:SS', nothing before or after
+_HOUR_RE = re.compile(r"([0-9]{2}):([0-9]{2})(?::([0-9]{2}))?")
+
+
+def day_number(day: date) -> int:
+    """Days since 1970-01-01 (the value of ts // 86400 for any punch on that day)."""
+    return day.toordinal() - _EPOCH_ORDINAL
+
+
+def day_start(date_str: str) -> int:
+    """Timestamp of 00:00:00 of a 'YYYY-MM-DD' date."""
+    return day_number(datetime.strptime(date_str, "%Y-%m-%d").date()) * SECONDS_PER_DAY
+
+
+def date_from_day_number(number: int) -> date:
+    """Inverse of day_number()."""
+    return date.fromordinal(number + _EPOCH_ORDINAL)
+
+
+def to_timestamp(value: datetime) -> int:
+    """Timestamp of a naive local datetime."""
+    return (day_number(value.date()) * SECONDS_PER_DAY
+            + value.hour * 3600 + value.minute * 60 + value.second)
+
+
+def now_timestamp() -> int:
+    """Timestamp of the current local time."""
+    return to_timestamp(datetime.now())
+
+
+def parse_timestamp(date_str: str, hour_str: str) -> int:
+    """Timestamp of a 'YYYY-MM-DD' date and an 'HH:MM[:SS]' hour (ValueError if invalid)."""
+    seconds: Optional[int] = parse_hour_seconds(hour_str)
+    if seconds is None:
+        raise ValueError(f"Hora no válida: {hour_str}")
+    return day_start(date_str) + seconds
+
+
+def parse_hour_seconds(hour_str: str) -> Optional[int]:
+    """Converts 'HH:MM:SS' or 'HH:MM' into seconds since midnight (None for anything else)."""
+    match = _HOUR_RE.fullmatch(hour_str)
+    if match is None:
+        return None
+    hours, minutes, secs = int(match[1]), int(match[2]), int(match[3] or 0)
+    if not (hours < 24 and minutes < 60 and secs < 60):
+        return None
+    return hours * 3600 + minutes * 60 + secs
+
+
+def format_date(ts: int) -> str:
+    """'YYYY-MM-DD' of a timestamp."""
+    return date_from_day_number(ts // SECONDS_PER_DAY).strftime("%Y-%m-%d")
+
+
+def format_hour(ts: int, with_seconds: bool = False) -> str:
+    """'HH:MM' (or 'HH:MM:SS') of a timestamp."""
+    seconds = ts % SECONDS_PER_DAY
+    if with_seconds:
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+
+def to_datetime(ts: int) -> datetime:
+    """Naive local datetime of a timestamp."""
+    return datetime.combine(date_from_day_number(ts // SECONDS_PER_DAY), datetime.min.time()).replace(
+        hour=ts % SECONDS_PER_DAY // 3600, minute=ts % 3600 // 60, second=ts % 60)